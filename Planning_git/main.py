@@ -3,9 +3,19 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, timedelta
 from io import BytesIO
+from pathlib import Path
 from github_storage import init_github_storage
+from schedulazione import assegna_programma
+
+# Moduli condivisi con le altre app (cartella del repository)
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:                 # lo script gira a ogni rerun: una sola voce
+    sys.path.insert(0, ROOT)
+from profilazione import profilatore
+from tempi_ciclo import tempi_ciclo
 
 # FILE DI CONFIGURAZIONE
 CONFIG_RESOURCES = 'config_resources.json'
@@ -65,8 +75,15 @@ def load_config(filename):
     
     return None
 
+def calcola_ore(df):
+    """Ore per riga con il tempo ciclo del reparto (default: tempo ciclo da colli/giorno e operatori)."""
+    motore = tempi_ciclo(st.session_state.tempi_ciclo_reparto, st.session_state.tempo_ciclo_collo)
+    reparti = df['REPARTO_ARTICOLO'] if 'REPARTO_ARTICOLO' in df.columns else None
+    return motore.ore(df['QTA_RESIDUA_PADRE'], reparti)
+
 
 st.set_page_config(layout='wide')
+prof = profilatore('Planning_git')
 
 # Inizializza session state
 if 'df' not in st.session_state:
@@ -103,9 +120,13 @@ with t1:
     st.subheader('Caricamento dati')
     path = st.file_uploader('Caricare "IMABPJ Cruscotto Programmazione Produzione.xlsx')
     if not path:
+        prof.chiudi(interrotto=True)
         st.stop()
 
+    prof.annota(file=path.name, byte=path.size)
+    prof.fase('load', 'cruscotto')
     st.session_state.df = pd.read_excel(path)
+    prof.annota(righe=len(st.session_state.df))
 
     # Carica tempi ciclo salvati all'avvio
     if st.session_state.tempi_ciclo_reparto is None:
@@ -187,6 +208,7 @@ with t1:
 
     # FILTRO ================================================================================================================================
 
+    prof.fase('preprocess', 'testate e filtri')
     # Crea copia completa per calcolo metriche producibilità
     df_completo = st.session_state.df.copy()
     df_completo['COMMESSA'] = df_completo['COMMESSA'].ffill()
@@ -225,6 +247,7 @@ with t1:
     if 'df_filtrato' not in st.session_state:
         st.session_state.df_filtrato = df
 
+    prof.fase('filter', 'commesse e lanci')
     st.divider()
 
     st.subheader('Selezione commesse e lanci')
@@ -252,7 +275,8 @@ with t1:
             st.session_state.df_filtrato = df
             st.toast('Filtro applicato alla tab Programmazione')
 
-    df['Ore_STD'] = df['QTA_RESIDUA_PADRE'] * st.session_state.tempo_ciclo_collo
+    prof.fase('aggregate', 'producibilità per lancio')
+    df['Ore_STD'] = calcola_ore(df)
     
     # Metriche Producibilità per Lancio
     st.divider()
@@ -292,10 +316,12 @@ with t1:
     else:
         st.info('Selezionare lanci per visualizzare le metriche di producibilità')
 
+    prof.fase('render', 'dettaglio colli')
     st.subheader('Dettaglio colli')
     df
     
     # Pulsante download
+    prof.fase('export', 'dettaglio colli')
     buffer = BytesIO()
     with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
         df.to_excel(writer, index=False, sheet_name='Dettaglio Colli')
@@ -306,6 +332,7 @@ with t1:
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+    prof.fase('render', 'metriche riassuntive')
     st.subheader('Metriche riassuntive')
     st.divider()
     ore_1, ore_2, ore_3, ore_4 = st.columns([1,1,1,1])
@@ -316,7 +343,7 @@ with t1:
     ore_2.metric('Ore totali necessarie', value = f'{ore_tot:.1f}')
     ore_2.write(f'Le ore necessarie sono calcolate considerando una produttività di {colli_gg} colli/giorno del reparto')
 
-    lead_time = ore_tot/(h_c*8)
+    lead_time = ore_tot/(h_c*7.5)
     ore_3.metric('Giorni necessari al completamento', value=f'{lead_time:.1f}')
     ore_3.write(f'I giorni necessari sono calcolati consideranto {h_c} persone')
 
@@ -332,26 +359,14 @@ with t2:
     # Verifica che i dati siano stati caricati
     if st.session_state.df is None or 'df_filtrato' not in st.session_state:
         st.warning('Caricare prima i dati nella tab "Overview"')
+        prof.chiudi(interrotto=True)
         st.stop()
     
+    prof.fase('aggregate', 'carico per reparto')
     df = st.session_state.df_filtrato.copy()
     
-    # Calcola ore necessarie usando i tempi ciclo per reparto se disponibili
-    if st.session_state.tempi_ciclo_reparto is not None and not st.session_state.tempi_ciclo_reparto.empty:
-        # Crea dizionario reparto -> tempo ciclo (converti da minuti a ore dividendo per 60)
-        tempi_ciclo_dict = dict(zip(
-            st.session_state.tempi_ciclo_reparto['Reparto'],
-            st.session_state.tempi_ciclo_reparto['Tempo Ciclo (min/collo)'] / 60
-        ))
-        
-        # Applica il tempo ciclo specifico per reparto
-        df['Tempo_Ciclo_Ore'] = df['REPARTO_ARTICOLO'].map(tempi_ciclo_dict)
-        # Usa default se reparto non trovato
-        df['Tempo_Ciclo_Ore'] = df['Tempo_Ciclo_Ore'].fillna(12.5 / 60)
-        df['Ore_Necessarie'] = df['QTA_RESIDUA_PADRE'] * df['Tempo_Ciclo_Ore']
-    else:
-        # Usa tempo ciclo standard se non configurato
-        df['Ore_Necessarie'] = df['QTA_RESIDUA_PADRE'] * st.session_state.tempo_ciclo_collo
+    # Calcola ore necessarie usando i tempi ciclo per reparto
+    df['Ore_Necessarie'] = calcola_ore(df)
     
     # Sezione 0: Analisi Carico di Lavoro
     st.subheader('Analisi Carico di Lavoro per Reparto')
@@ -515,6 +530,7 @@ with t2:
     st.divider()
     
     # Sezione 1: Tabella Risorse per Reparto/Giorno
+    prof.fase('render', 'risorse e priorità')
     st.subheader('Pianificazione Risorse per Reparto')
     st.write('Inserire il numero di operatori disponibili per ogni reparto in ogni giorno della settimana')
     
@@ -525,6 +541,7 @@ with t2:
         reparti = reparto_workload.index.tolist()
     else:
         st.error('Colonna REPARTO_ARTICOLO non trovata nel dataframe')
+        prof.chiudi(interrotto=True)
         st.stop()
     
     # Crea tabella risorse
@@ -619,6 +636,7 @@ with t2:
         save_config(edited_prio.to_dict('records'), CONFIG_PRIORITIES)
         
         # Prepara dati per schedulazione
+        prof.fase('schedule', 'programma di produzione')
         df_schedule = df.copy()
         
         # Aggiungi priorità al dataframe
@@ -639,75 +657,15 @@ with t2:
         # Ordina per priorità (NaN vanno alla fine)
         df_schedule = df_schedule.sort_values('Priorità', na_position='last').reset_index(drop=True)
         
-        # Calcola ore necessarie per ogni riga
-        df_schedule['Ore_Necessarie'] = df_schedule['QTA_RESIDUA_PADRE'] * st.session_state.tempo_ciclo_collo
-        
-        # Prepara dizionario capacità per reparto/giorno
-        capacita = {}
-        for _, row in edited_risorse.iterrows():
-            reparto = row['Reparto']
-            for giorno in giorni_settimana:
-                num_operatori = row[giorno]
-                ore_disponibili = num_operatori * 7.5  # 7.5 ore per operatore
-                capacita[(reparto, giorno)] = ore_disponibili
+        # Calcola ore necessarie per ogni riga (stessi tempi ciclo per reparto del carico)
+        df_schedule['Ore_Necessarie'] = calcola_ore(df_schedule)
         
-        # Algoritmo di assegnazione con SPLITTING
-        schedule_rows = []
-        
-        # Filtra i giorni disponibili in base al giorno di inizio selezionato
-        start_index = giorni_settimana.index(giorno_inizio)
-        giorni_disponibili = giorni_settimana[start_index:]
-        
-        # Traccia capacità residua
-        capacita_residua = capacita.copy()
-        
-        for idx, row in df_schedule.iterrows():
-            reparto = row['REPARTO_ARTICOLO']
-            ore_rimanenti = row['Ore_Necessarie']
-            
-            assegnato_almeno_una_volta = False
-            
-            # Cerca giorni con capacità (solo nei giorni disponibili)
-            for giorno in giorni_disponibili:
-                key = (reparto, giorno)
-                cap_disp = capacita_residua.get(key, 0)
-                
-                if cap_disp > 0 and ore_rimanenti > 0.01: # Tolleranza per float
-                    # Calcola quanto possiamo assegnare
-                    ore_da_assegnare = min(ore_rimanenti, cap_disp)
-                    
-                    # Crea nuova riga per l'assegnazione parziale
-                    new_row = row.copy()
-                    new_row['Giorno_Assegnato'] = giorno
-                    new_row['Ore_Assegnate'] = ore_da_assegnare
-                    new_row['Status'] = 'Assegnato'
-                    schedule_rows.append(new_row)
-                    
-                    # Aggiorna contatori
-                    capacita_residua[key] -= ore_da_assegnare
-                    ore_rimanenti -= ore_da_assegnare
-                    assegnato_almeno_una_volta = True
-                
-                if ore_rimanenti <= 0.01:
-                    break
-            
-            # Se rimangono ore non assegnate
-            if ore_rimanenti > 0.01:
-                unassigned_row = row.copy()
-                unassigned_row['Giorno_Assegnato'] = None
-                unassigned_row['Ore_Assegnate'] = 0
-                unassigned_row['Ore_Mancanti'] = ore_rimanenti
-                if assegnato_almeno_una_volta:
-                    unassigned_row['Status'] = 'Parziale'
-                else:
-                    unassigned_row['Status'] = 'Non Assegnato'
-                schedule_rows.append(unassigned_row)
-        
-        # Ricostruisci il DataFrame dai risultati splittati
-        df_schedule = pd.DataFrame(schedule_rows)
+        # Assegnazione con splitting sulla capacità residua per reparto/giorno
+        df_schedule = assegna_programma(df_schedule, edited_risorse, giorni_settimana, giorno_inizio)
         
         # Salva in session state
         st.session_state.programma_produzione = df_schedule
+        prof.fase('render', 'programma di produzione')
         
         # Mostra risultati
         st.success('Programma di produzione generato')
@@ -947,12 +905,4 @@ with t2:
     elif 'programma_produzione' in st.session_state and st.session_state.programma_produzione is not None:
         st.info('Programma già generato. Clicca "Genera Programma" per rigenerarlo con nuovi parametri.')
 
-
-
-
-
-
-
-
-
-
+prof.chiudi()
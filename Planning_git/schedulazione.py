@@ -0,0 +1,84 @@
+"""
+Schedulazione dei colli sui giorni della settimana
+==================================================
+Assegna le ore necessarie di ogni riga (già ordinate per priorità) alla
+capacità residua del suo reparto, giorno per giorno a partire dal giorno di
+inizio, spezzando una riga su più giorni quando serve. Le righe che non
+trovano capacità restano "Parziale" o "Non Assegnato" con le ore mancanti.
+
+Funzione separata dalla pagina Streamlit per poterla misurare nei benchmark.
+"""
+
+import pandas as pd
+
+ORE_TURNO = 7.5
+
+
+def assegna_programma(df_schedule, risorse, giorni_settimana, giorno_inizio, ore_turno=ORE_TURNO):
+    """
+    ``df_schedule``: righe con REPARTO_ARTICOLO e Ore_Necessarie, in ordine di priorità.
+    ``risorse``: una riga per Reparto con il numero di operatori per ogni giorno.
+    """
+    # Prepara dizionario capacità per reparto/giorno
+    capacita = {}
+    for _, row in risorse.iterrows():
+        reparto = row['Reparto']
+        for giorno in giorni_settimana:
+            num_operatori = row[giorno]
+            ore_disponibili = num_operatori * ore_turno  # ore per operatore
+            capacita[(reparto, giorno)] = ore_disponibili
+
+    # Algoritmo di assegnazione con SPLITTING
+    schedule_rows = []
+
+    # Filtra i giorni disponibili in base al giorno di inizio selezionato
+    start_index = giorni_settimana.index(giorno_inizio)
+    giorni_disponibili = giorni_settimana[start_index:]
+
+    # Traccia capacità residua
+    capacita_residua = capacita.copy()
+
+    for idx, row in df_schedule.iterrows():
+        reparto = row['REPARTO_ARTICOLO']
+        ore_rimanenti = row['Ore_Necessarie']
+
+        assegnato_almeno_una_volta = False
+
+        # Cerca giorni con capacità (solo nei giorni disponibili)
+        for giorno in giorni_disponibili:
+            key = (reparto, giorno)
+            cap_disp = capacita_residua.get(key, 0)
+
+            if cap_disp > 0 and ore_rimanenti > 0.01: # Tolleranza per float
+                # Calcola quanto possiamo assegnare
+                ore_da_assegnare = min(ore_rimanenti, cap_disp)
+
+                # Crea nuova riga per l'assegnazione parziale
+                new_row = row.copy()
+                new_row['Giorno_Assegnato'] = giorno
+                new_row['Ore_Assegnate'] = ore_da_assegnare
+                new_row['Status'] = 'Assegnato'
+                schedule_rows.append(new_row)
+
+                # Aggiorna contatori
+                capacita_residua[key] -= ore_da_assegnare
+                ore_rimanenti -= ore_da_assegnare
+                assegnato_almeno_una_volta = True
+
+            if ore_rimanenti <= 0.01:
+                break
+
+        # Se rimangono ore non assegnate
+        if ore_rimanenti > 0.01:
+            unassigned_row = row.copy()
+            unassigned_row['Giorno_Assegnato'] = None
+            unassigned_row['Ore_Assegnate'] = 0
+            unassigned_row['Ore_Mancanti'] = ore_rimanenti
+            if assegnato_almeno_una_volta:
+                unassigned_row['Status'] = 'Parziale'
+            else:
+                unassigned_row['Status'] = 'Non Assegnato'
+            schedule_rows.append(unassigned_row)
+
+    # Ricostruisci il DataFrame dai risultati splittati
+    return pd.DataFrame(schedule_rows)
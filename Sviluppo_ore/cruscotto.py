@@ -0,0 +1,43 @@
+"""
+Lettura del cruscotto di programmazione
+=======================================
+Il file "IMABPJ Cruscotto Programmazione Produzione.xlsx" ha le colonne di
+testata (commessa, lancio, stato, ...) compilate solo sulla prima riga del
+gruppo. Qui si completano in avanti e si tengono i colli di produzione
+interna ancora inevasi e producibili, sulle prime 15 colonne.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import pandas as pd
+
+COLONNE_TESTATA = ["COMMESSA", "ANNO", "WEEK", "LANCIO", "GEST", "STATO"]
+GEST_PRODUZIONE = "1) GRIGIO - PROD INT"
+STATO_PRODUCIBILE = "INEVASO - PRODUCIBILE"
+
+
+def filtra_cruscotto(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in COLONNE_TESTATA:
+        df[col] = df[col].ffill()
+
+    df = df[(df.GEST == GEST_PRODUZIONE)].reset_index(drop=True)
+
+    df['MONT_SMONT'] = df['MONT_SMONT'].ffill()
+
+    df = df[df.STATO == STATO_PRODUCIBILE].reset_index(drop=True)
+    df['QTA_PRODOTTA'] = df['QTA_PRODOTTA'].fillna(0)
+
+    return df[df.columns[:15]]
+
+
+def leggi_cruscotto(dati: bytes) -> pd.DataFrame:
+    """Excel del cruscotto (contenuto del file) → colli producibili."""
+    return filtra_cruscotto(pd.read_excel(BytesIO(dati)))
+
+
+def multifiltro(df: pd.DataFrame, campo: str, selected) -> pd.DataFrame:
+    """Righe in cui ``campo`` contiene almeno uno dei valori selezionati."""
+    return df[[any(elemento in check for elemento in selected) for check in df[campo].astype(str)]]
@@ -0,0 +1,69 @@
+"""
+Sweep dei tempi di attraversamento
+==================================
+Il reparto fa ``colli_gg`` colli al giorno con la squadra di riferimento di
+``H_RIF`` operatori (turni da ``ORE_TURNO`` ore): un collo richiede
+``ORE_TURNO * H_RIF / colli_gg`` ore uomo e con ``n`` operatori i giorni
+necessari sono
+
+    giorni = qta * H_RIF / (colli_gg * n)
+
+I colli dei reparti con un tempo ciclo configurato (``tempi_ciclo``) non
+dipendono da colli/giorno: entrano come ore uomo fisse, così la griglia
+coincide con le ore totali della pagina
+
+    giorni = (qta_default * ORE_TURNO * H_RIF / colli_gg + ore_fisse) / (ORE_TURNO * n)
+
+Invece di un solo punto (colli/giorno, operatori) la griglia intera viene
+calcolata in broadcasting NumPy sulle quantità già aggregate
+(``QTA_RESIDUA_PADRE``), anche per più gruppi insieme (es. commesse).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+H_RIF = 11                       # operatori a cui si riferisce la produttività colli/giorno
+ORE_TURNO = 8
+COLLI_GG = np.arange(350, 601)   # griglia colli/giorno
+OPERATORI = np.arange(5, 21)     # griglia operatori
+
+
+def ore_per_collo(colli_gg, h_rif: int = H_RIF) -> np.ndarray:
+    return ORE_TURNO * h_rif / np.asarray(colli_gg, dtype=np.float64)
+
+
+def giorni(qta, colli_gg=COLLI_GG, operatori=OPERATORI, h_rif: int = H_RIF,
+           ore_fisse=0.0) -> np.ndarray:
+    """
+    Giorni necessari su tutta la griglia: forma ``qta.shape + (colli_gg, operatori)``.
+    ``qta`` (colli al tempo ciclo di default) e ``ore_fisse`` (ore uomo dei
+    reparti configurati) possono essere scalari (totale) o vettori (un valore
+    per gruppo).
+    """
+    qta = np.asarray(qta, dtype=np.float64)[..., None, None]
+    fisse = np.asarray(ore_fisse, dtype=np.float64)[..., None, None]
+    g = np.asarray(colli_gg, dtype=np.float64)[:, None]
+    n = np.asarray(operatori, dtype=np.float64)[None, :]
+    return (qta * ore_per_collo(g, h_rif) + fisse) / (ORE_TURNO * n)
+
+
+def operatori_minimi(lead: np.ndarray, obiettivo: float,
+                     operatori=OPERATORI) -> np.ndarray:
+    """
+    Per ogni punto della griglia (tutti gli assi tranne l'ultimo) il minimo
+    numero di operatori con ``lead <= obiettivo``; NaN se non basta il massimo.
+    """
+    ok = lead <= obiettivo
+    primo = ok.argmax(axis=-1)
+    return np.where(ok.any(axis=-1), np.asarray(operatori)[primo], np.nan)
+
+
+def superficie(qta: float, colli_gg=COLLI_GG, operatori=OPERATORI,
+               h_rif: int = H_RIF, ore_fisse: float = 0.0) -> pd.DataFrame:
+    """Griglia in formato lungo (Colli/giorno, Operatori, Giorni) per i grafici."""
+    lead = giorni(qta, colli_gg, operatori, h_rif, ore_fisse)
+    g, n = np.meshgrid(colli_gg, operatori, indexing="ij")
+    return pd.DataFrame({"Colli/giorno": g.ravel(), "Operatori": n.ravel(),
+                         "Giorni": lead.ravel()})
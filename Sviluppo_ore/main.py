@@ -1,9 +1,27 @@
+import altair as alt
+import numpy as np
 import pandas as pd
 import streamlit as st
 from io import BytesIO
+import sys
+from pathlib import Path
+
+from cruscotto import leggi_cruscotto, multifiltro as filtra_selezione
+from lead_time import COLLI_GG, H_RIF, OPERATORI, giorni, operatori_minimi, ore_per_collo, superficie
+from snapshot import SnapshotStore, data_da_nome
+
+SNAPSHOT_DIR = Path(__file__).parent / 'snapshot_cruscotto'
+
+# Moduli condivisi con le altre app (cartella del repository)
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:                 # lo script gira a ogni rerun: una sola voce
+    sys.path.insert(0, ROOT)
+from profilazione import profilatore
+from tempi_ciclo import carica_config, tempi_ciclo
 
 
 st.set_page_config(layout='wide')
+prof = profilatore('Sviluppo_ore')
 
 head_sx, head_dx = st.columns([4,1])
 
@@ -20,27 +38,45 @@ st.divider()
 st.subheader('Caricamento dati')
 path = st.file_uploader('Caricare "IMABPJ Cruscotto Programmazione Produzione.xlsx')
 if not path:
+    prof.chiudi(interrotto=True)
     st.stop()
 
-df = pd.read_excel(path)
-
-
 colli_gg = 400
-h_c = 11
-tempo_ciclo_collo = 8/(colli_gg/h_c)
+h_c = H_RIF
+usa_tempi_reparto = True
 
 st.divider()
 st.write("Attivando l'opzione Modifica parametri è possibile modificare i valori di produttività e numero di operatori" )
 if st.toggle('Modifica parametri'):
     colli_gg = st.number_input('Colli/giorno', value=400, min_value=350, max_value=600, step=1)
-    h_c = st.number_input('Operatori fabbrica', value=11, min_value=5, max_value=20, step=1)
+    h_c = st.number_input('Operatori fabbrica', value=H_RIF, min_value=5, max_value=20, step=1)
+    usa_tempi_reparto = st.checkbox('Tempi ciclo per reparto', value=True,
+                                    help='Tempi di config_cycle_times.json (come Planning_git); i reparti non configurati usano la produttività colli/giorno')
+# ore uomo per collo: colli_gg è la produttività del reparto con la squadra di riferimento
+tempo_ciclo_collo = ore_per_collo(colli_gg)
+motore_ore = tempi_ciclo(carica_config() if usa_tempi_reparto else None, tempo_ciclo_collo)
 
 # FUNZIONI ==============================================================================================================================
 
+# Lettura e filtro del cruscotto una sola volta per file: i rerun (parametri, sweep) non rileggono l'Excel
+@st.cache_data(max_entries=2)
+def carica_cruscotto(dati):
+    return leggi_cruscotto(dati)
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore(SNAPSHOT_DIR)
+
+# Andamento ricalcolato solo quando cambiano gli snapshot in archivio (i nomi contengono l'impronta)
+@st.cache_data(max_entries=4)
+def andamento_backlog(file_archivio, chiavi):
+    return get_snapshot_store().andamento(chiavi=chiavi)
+
 def multifiltro(df, campo, selected ):
-    df = df[[any(elemento in check for elemento in selected) for check in df[campo].astype(str)]]
+    df = filtra_selezione(df, campo, selected)
     if len(df) == 0:
         st.warning('Nessun collo producibile')
+        prof.chiudi(interrotto=True)
         st.stop()
     return df
 
@@ -61,23 +97,11 @@ def scarica_excel(df, filename):
 
 # FILTRO ================================================================================================================================
 
-df['COMMESSA'] = df['COMMESSA'].ffill()
-df['ANNO'] = df['ANNO'].ffill()
-df['WEEK'] = df['WEEK'].ffill()
-df['LANCIO'] = df['LANCIO'].ffill()
-df['GEST'] = df['GEST'].ffill()
-df['STATO'] = df['STATO'].ffill()
-
-
-
-df = df[(df.GEST == '1) GRIGIO - PROD INT')].reset_index(drop=True)
-
-df['MONT_SMONT'] = df['MONT_SMONT'].ffill()
-
-df = df[df.STATO == 'INEVASO - PRODUCIBILE'].reset_index(drop=True)
-df['QTA_PRODOTTA'] = df['QTA_PRODOTTA'].fillna(0)
-
-df = df[df.columns[:15]]
+prof.annota(file=path.name, byte=path.size, colli_gg=colli_gg, operatori=h_c)
+prof.fase('load', 'cruscotto')
+df = carica_cruscotto(path.getvalue())
+prof.annota(righe=len(df))
+prof.fase('filter', 'commesse e lanci')
 
 st.divider()
 
@@ -98,17 +122,22 @@ with cx_fil:
 
     df = multifiltro(df, 'LANCIO', selected_lancio)
 
-df['Ore_STD'] = df['QTA_RESIDUA_PADRE'] * tempo_ciclo_collo
+prof.fase('aggregate', 'ore standard')
+df['Ore_STD'] = motore_ore.ore(df['QTA_RESIDUA_PADRE'], df.get('REPARTO_ARTICOLO'))
 
+prof.fase('render', 'dettaglio colli')
 st.subheader('Dettaglio colli')
 if len(df)!=0:
     df
 else:
     st.warning('Nessun collo producibile')
+    prof.chiudi(interrotto=True)
     st.stop()
+prof.fase('export', 'dettaglio colli')
 scarica_excel(df, 'Dettaglio_colli_producibili.xlsx')
 
 
+prof.fase('render', 'metriche e sweep')
 st.subheader('Metriche riassuntive')
 st.divider()
 ore_1, ore_2, ore_3, ore_4 = st.columns([1,1,1,1])
@@ -117,7 +146,8 @@ ore_1.metric('Totale colli producibili', value = df['QTA_RESIDUA_PADRE'].astype(
 
 ore_tot = df['Ore_STD'].sum()
 ore_2.metric('Ore totali necessarie', value = f'{ore_tot:.1f}')
-ore_2.write(f'Le ore necessarie sono calcolate considerando una produttività di {colli_gg} colli/giorno del reparto')
+ore_2.write(f'Le ore necessarie sono calcolate considerando una produttività di {colli_gg} colli/giorno del reparto'
+            + (' e i tempi ciclo per reparto configurati' if motore_ore.voci else ''))
 
 lead_time = ore_tot/(h_c*8)
 ore_3.metric('Giorni necessari al completamento', value=f'{lead_time:.1f}')
@@ -128,3 +158,106 @@ if lead_time < 1:
     ore_4.metric('Ore uomo residue della giornata', value=f'{ore_disp:.1f}')
 
 st.divider()
+
+
+# SWEEP ==================================================================================================================================
+
+@st.fragment
+def sweep_organico(df):
+    # Tutta la griglia colli/giorno × operatori in un colpo sulle quantità già aggregate;
+    # il fragment ricalcola solo questa sezione quando cambiano obiettivo o produttività
+    st.subheader('Sweep organico')
+    # stesse ore dei totali: i reparti con tempo ciclo configurato sono ore fisse,
+    # solo gli altri colli dipendono da colli/giorno
+    configurati = (motore_ore.configurati(df['REPARTO_ARTICOLO']) if 'REPARTO_ARTICOLO' in df
+                   else np.zeros(len(df), dtype=bool))
+    comm = pd.DataFrame({
+        'COMMESSA': df['COMMESSA'].to_numpy(),
+        'Colli': df['QTA_RESIDUA_PADRE'].to_numpy(),
+        'Colli_default': np.where(configurati, 0, df['QTA_RESIDUA_PADRE']),
+        'Ore_fisse': np.where(configurati, df['Ore_STD'], 0),
+    }).groupby('COMMESSA').sum()
+    qta_tot, fisse_tot = comm['Colli_default'].sum(), comm['Ore_fisse'].sum()
+    if configurati.any():
+        st.caption(f'{fisse_tot:.1f} ore dai tempi ciclo per reparto configurati, '
+                   'indipendenti da colli/giorno')
+
+    sw_sx, sw_dx = st.columns([1,3])
+    with sw_sx:
+        obiettivo = st.number_input('Giorni obiettivo', value=5.0, min_value=0.5, step=0.5)
+        colli_rif = st.slider('Colli/giorno per il dettaglio commesse', min_value=int(COLLI_GG[0]),
+                              max_value=int(COLLI_GG[-1]), value=colli_gg)
+
+    with sw_dx:
+        griglia = superficie(qta_tot, ore_fisse=fisse_tot)
+        heat = alt.Chart(griglia).mark_rect().encode(
+            x=alt.X('Operatori:O'),
+            y=alt.Y('Colli/giorno:Q', bin=alt.Bin(step=10)),
+            color=alt.Color('mean(Giorni):Q', scale=alt.Scale(scheme='redyellowgreen', reverse=True), title='Giorni'),
+            tooltip=['Operatori', 'Colli/giorno', alt.Tooltip('Giorni:Q', format='.1f')])
+        st.altair_chart(heat, use_container_width=True)
+
+    # operatori minimi per rispettare l'obiettivo, per ogni produttività
+    minimi = operatori_minimi(giorni(qta_tot, ore_fisse=fisse_tot), obiettivo)
+    st.line_chart(pd.DataFrame({'Operatori minimi': minimi}, index=pd.Index(COLLI_GG, name='Colli/giorno')))
+    if np.isnan(minimi).all():
+        st.warning(f'Obiettivo di {obiettivo:g} giorni non raggiungibile con {OPERATORI[-1]} operatori')
+
+    # dettaglio per commessa alla produttività scelta (broadcasting commesse × operatori)
+    i = int(np.searchsorted(COLLI_GG, colli_rif))
+    lead_comm = giorni(comm['Colli_default'].to_numpy(), COLLI_GG[i:i+1],
+                       ore_fisse=comm['Ore_fisse'].to_numpy())[:, 0, :]
+    dettaglio = pd.DataFrame({
+        'COMMESSA': comm.index,
+        'Colli': comm['Colli'].to_numpy().astype(int),
+        f'Giorni con {h_c} operatori': lead_comm[:, int(np.searchsorted(OPERATORI, h_c))].round(1),
+        'Operatori minimi': operatori_minimi(lead_comm, obiettivo),
+    })
+    st.dataframe(dettaglio, hide_index=True)
+
+
+st.divider()
+if st.toggle('Sweep organico (colli/giorno × operatori)'):
+    sweep_organico(df)
+
+
+# ANDAMENTO BACKLOG ======================================================================================================================
+
+prof.fase('load', 'snapshot')
+st.divider()
+st.subheader('Andamento backlog')
+st.write('Gli snapshot datati (data nel nome file, es. 2024-03-15) vengono letti una sola volta e conservati in archivio')
+snapshot_store = get_snapshot_store()
+nuovi_snapshot = st.file_uploader('Aggiungere snapshot del cruscotto', accept_multiple_files=True, key='snapshot')
+# i file restano nell'uploader a ogni rerun: ognuno si archivia una volta sola, e tra
+# più file con la stessa data vale l'ultimo (altrimenti si sostituirebbero a vicenda)
+archiviati = st.session_state.setdefault('snapshot_archiviati', {})
+per_data = {}
+for f in nuovi_snapshot or []:
+    giorno = data_da_nome(f.name)
+    if giorno in per_data:
+        st.caption(f'{per_data[giorno].name}: ignorato, stessa data di {f.name}')
+    per_data[giorno if giorno is not None else f.name] = f
+for f in per_data.values():
+    if f.file_id not in archiviati:
+        archiviati[f.file_id] = snapshot_store.aggiungi(f.name, f.getvalue())
+    giorno, esito = archiviati[f.file_id]
+    if giorno is None:
+        st.warning(f'{f.name}: {esito}')
+
+elenco_snapshot = snapshot_store.elenco()
+if not elenco_snapshot.empty:
+    chiave = st.radio('Raggruppa per', ['COMMESSA', 'LANCIO'], horizontal=True)
+    prof.fase('aggregate', 'andamento backlog')
+    andamento = andamento_backlog(tuple(elenco_snapshot['file']), ('COMMESSA', 'LANCIO', 'REPARTO_ARTICOLO'))
+    andamento['Ore_STD'] = motore_ore.ore(andamento['QTA_RESIDUA_PADRE'], andamento['REPARTO_ARTICOLO'])
+    trend = andamento.pivot_table(index='data', columns=chiave, values='Ore_STD', aggfunc='sum', fill_value=0)
+    trend.columns = trend.columns.astype(str)
+    prof.fase('render', 'andamento backlog')
+    st.area_chart(trend)
+    prof.fase('export', 'andamento backlog')
+    scarica_excel(andamento, 'Andamento_backlog.xlsx')
+    with st.expander('Snapshot in archivio'):
+        st.dataframe(elenco_snapshot, hide_index=True)
+
+prof.chiudi()
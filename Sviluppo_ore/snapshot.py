@@ -0,0 +1,105 @@
+"""
+Archivio degli snapshot del cruscotto
+=====================================
+Per seguire l'andamento del backlog giorno per giorno si caricano più
+cruscotti datati. Ogni Excel viene letto e filtrato una sola volta e salvato
+in Parquet (colonnare) nella cartella dell'archivio, con nome
+``AAAA-MM-GG_<impronta>.parquet``: ricaricare lo stesso file non rilegge
+l'Excel, e la serie resta disponibile anche senza ricaricare i file.
+
+La data dello snapshot è presa dal nome del file (``AAAA-MM-GG``,
+``AAAAMMGG`` o ``GG-MM-AAAA``, separatori ``-``, ``_`` o ``.``); un nuovo
+file con la stessa data sostituisce il precedente.
+
+L'andamento si calcola uno snapshot alla volta, leggendo dal Parquet solo le
+colonne di raggruppamento e la quantità e tenendo in memoria solo gli
+aggregati: la memoria non cresce con il numero di snapshot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cruscotto import leggi_cruscotto
+
+_DATE = [
+    (re.compile(r"(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})"), (1, 2, 3)),   # AAAA-MM-GG / AAAAMMGG
+    (re.compile(r"(\d{2})[-_.](\d{2})[-_.](20\d{2})"), (3, 2, 1)),     # GG-MM-AAAA
+]
+
+
+def data_da_nome(nome: str) -> date | None:
+    for regex, (a, m, g) in _DATE:
+        for trovato in regex.finditer(nome):
+            try:
+                return date(int(trovato.group(a)), int(trovato.group(m)), int(trovato.group(g)))
+            except ValueError:
+                continue
+    return None
+
+
+class SnapshotStore:
+    """Cartella di snapshot Parquet del cruscotto, uno per data."""
+
+    def __init__(self, cartella):
+        self.cartella = Path(cartella)
+        self.cartella.mkdir(parents=True, exist_ok=True)
+
+    def _file(self) -> list[Path]:
+        return sorted(self.cartella.glob("*.parquet"))
+
+    def aggiungi(self, nome: str, dati: bytes) -> tuple[date | None, str]:
+        """Archivia uno snapshot; restituisce (data, esito)."""
+        giorno = data_da_nome(nome)
+        if giorno is None:
+            return None, "data non trovata nel nome"
+        impronta = hashlib.sha1(dati).hexdigest()[:16]
+        dest = self.cartella / f"{giorno.isoformat()}_{impronta}.parquet"
+        if dest.exists():
+            return giorno, "in archivio"
+
+        df = leggi_cruscotto(dati)
+        # colonne miste (numeri e testo) come stringhe, per il Parquet
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].astype("string")
+        tmp = dest.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        sostituito = False
+        for vecchio in self.cartella.glob(f"{giorno.isoformat()}_*.parquet"):
+            vecchio.unlink()
+            sostituito = True
+        tmp.replace(dest)
+        return giorno, "sostituito" if sostituito else "aggiunto"
+
+    def rimuovi(self, giorno: date):
+        for f in self.cartella.glob(f"{giorno.isoformat()}_*.parquet"):
+            f.unlink()
+
+    def elenco(self) -> pd.DataFrame:
+        righe = [{"data": date.fromisoformat(f.name[:10]), "file": f.name} for f in self._file()]
+        return pd.DataFrame(righe, columns=["data", "file"])
+
+    def andamento(self, chiavi=("COMMESSA", "LANCIO"),
+                  valore: str = "QTA_RESIDUA_PADRE") -> pd.DataFrame:
+        """Σ ``valore`` per data e ``chiavi``, uno snapshot alla volta (chiavi
+        assenti in uno snapshot restano vuote)."""
+        chiavi = list(chiavi)
+        parti = []
+        for f in self._file():
+            presenti = set(pq.read_schema(f).names)
+            df = pd.read_parquet(f, columns=[c for c in chiavi if c in presenti] + [valore])
+            for c in chiavi:
+                if c not in presenti:
+                    df[c] = None
+            agg = df.groupby(chiavi, dropna=False, observed=True)[valore].sum().reset_index()
+            agg.insert(0, "data", pd.Timestamp(f.name[:10]))
+            parti.append(agg)
+        if not parti:
+            return pd.DataFrame(columns=["data"] + chiavi + [valore])
+        return pd.concat(parti, ignore_index=True)
@@ -0,0 +1,149 @@
+"""
+Espansione delle assegnazioni GanttPro
+======================================
+Dai task grezzi si costruisce prima un modello a intervalli compatto (una riga
+per task × risorsa) e da questo, in modo vettoriale, il frame giornaliero
+usato dall'app. Le colonne testuali ripetute su ogni riga sono categoriche,
+le ore float32: il frame che resta in ``st.session_state`` occupa una
+frazione della versione a stringhe Python.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from calendars import CalendarEngine, is_busday_by
+from ganttpro_client import _tid
+
+# Colonne descrittive (categoriche) comuni a intervalli e frame giornaliero
+KEY_COLS = ["risorsa", "resource_id", "tipo_risorsa", "progetto", "task", "task_id"]
+INTERVAL_COLS = KEY_COLS + ["start", "end", "ore_tot"]
+DAILY_COLS = ["date", "risorsa", "resource_id", "tipo_risorsa",
+              "progetto", "task", "task_id", "ore"]
+
+
+def _parse_dates(values: list) -> pd.DatetimeIndex:
+    """Date GanttPro (timestamp ms o stringa) → giorno (mezzanotte); NaT se illeggibile."""
+    out = pd.Series(pd.NaT, index=range(len(values)), dtype="datetime64[ns]")
+    is_num = np.array([isinstance(v, (int, float)) and not isinstance(v, bool)
+                       for v in values], dtype=bool)
+    if is_num.any():
+        nums = pd.to_numeric(pd.Series(values)[is_num], errors="coerce")
+        out[is_num] = pd.to_datetime(nums, unit="ms", errors="coerce").to_numpy()
+    if (~is_num).any():
+        strs = [v for v, n in zip(values, is_num) if not n]
+        try:
+            parsed = pd.to_datetime(pd.Series(strs), errors="coerce", format="mixed")
+            if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+                parsed = parsed.dt.tz_localize(None)
+            parsed = parsed.to_numpy()
+        except (ValueError, TypeError):
+            # Fusi orari misti: si ripiega sul parsing valore per valore
+            parsed = []
+            for v in strs:
+                try:
+                    parsed.append(pd.Timestamp(pd.Timestamp(v).date()))
+                except Exception:
+                    parsed.append(pd.NaT)
+            parsed = np.array(parsed, dtype="datetime64[ns]")
+        out[~is_num] = parsed
+    return pd.DatetimeIndex(out).normalize()
+
+
+def build_intervals(tasks: list, resource_catalog: dict) -> pd.DataFrame:
+    """
+    Modello a intervalli: una riga per ogni (task, risorsa assegnata).
+
+    Colonne output:
+        risorsa, resource_id, tipo_risorsa, progetto, task, task_id,
+        start, end, ore_tot
+    """
+    recs = []
+    raw_starts, raw_ends = [], []
+
+    for task in tasks:
+        pname     = task.get("_projectName", "?")
+        tname     = task.get("name", "?")
+        tid       = _tid(task)
+        resources = task.get("resources") or task.get("assignments") or []
+
+        raw_start = task.get("startDate") or task.get("start_date")
+        raw_end   = task.get("endDate")   or task.get("end_date")
+        if not raw_start or not raw_end:
+            continue
+
+        for r in resources:
+            if not isinstance(r, dict):
+                continue
+            rid         = str(r.get("resourceId") or r.get("id") or "")
+            res_val_min = r.get("resourceValue") or 0
+
+            # Risolvi nome dalla catalog
+            catalog_entry = resource_catalog.get(rid, {})
+            rname = (catalog_entry.get("name")
+                     or r.get("name") or r.get("resourceName")
+                     or f"Risorsa {rid}")
+            rtype = catalog_entry.get("type", "unknown")
+
+            recs.append((rname, rid, rtype, pname, tname, tid, res_val_min / 60))
+            raw_starts.append(raw_start)
+            raw_ends.append(raw_end)
+
+    iv = pd.DataFrame(recs, columns=KEY_COLS + ["ore_tot"])
+    # GanttPro può restituire timestamp (ms) o stringa ISO
+    iv["start"] = _parse_dates(raw_starts)
+    iv["end"]   = _parse_dates(raw_ends)
+    iv = iv[iv["start"].notna() & iv["end"].notna()].reset_index(drop=True)
+    iv["end"] = iv["end"].where(iv["end"] >= iv["start"], iv["start"])
+
+    for col in KEY_COLS:
+        iv[col] = iv[col].astype("category")
+    iv["ore_tot"] = iv["ore_tot"].astype("float32")
+    return iv[INTERVAL_COLS]
+
+
+def expand_daily(intervals: pd.DataFrame, weekmask: str,
+                 calendars: CalendarEngine | None = None) -> pd.DataFrame:
+    """
+    Distribuisce le ore di ogni intervallo equamente sui giorni lavorativi
+    tra start ed end (estremi inclusi). Un intervallo senza giorni lavorativi
+    finisce tutto sul giorno di inizio. Con ``calendars`` i giorni lavorativi
+    tengono conto di festività, chiusure e calendario della risorsa;
+    altrimenti vale solo ``weekmask``.
+
+    Colonne output:
+        date, risorsa, resource_id, tipo_risorsa,
+        progetto, task, task_id, ore
+    """
+    start = intervals["start"].to_numpy().astype("datetime64[D]")
+    end   = intervals["end"].to_numpy().astype("datetime64[D]")
+    span  = (end - start).astype(np.int64) + 1
+
+    # Una riga per ogni giorno di calendario di ogni intervallo, poi filtro busday
+    idx  = np.repeat(np.arange(len(intervals)), span)
+    offs = np.arange(len(idx)) - np.repeat(np.cumsum(span) - span, span)
+    days = start[idx] + offs
+    if calendars is None:
+        keep = np.is_busday(days, weekmask=weekmask)
+    else:
+        codes, cals = calendars.resource_calendars(intervals["risorsa"])
+        keep = is_busday_by(days, codes[idx], cals)
+
+    n_bdays = np.bincount(idx[keep], minlength=len(intervals))
+    keep |= (n_bdays == 0)[idx] & (offs == 0)
+    n_bdays = np.maximum(n_bdays, 1)
+
+    ore_day = np.round(intervals["ore_tot"].to_numpy(dtype=np.float64) / n_bdays, 3)
+    idx = idx[keep]
+
+    daily = intervals[KEY_COLS].iloc[idx].reset_index(drop=True)
+    daily.insert(0, "date", days[keep].astype("datetime64[ns]"))
+    daily["ore"] = ore_day[idx].astype("float32")
+    return daily[DAILY_COLS]
+
+
+def build_daily_assignments(tasks: list, resource_catalog: dict, weekmask: str,
+                            calendars: CalendarEngine | None = None) -> pd.DataFrame:
+    """Task grezzi → frame giornaliero (build_intervals + expand_daily)."""
+    return expand_daily(build_intervals(tasks, resource_catalog), weekmask, calendars)
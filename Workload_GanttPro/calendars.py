@@ -0,0 +1,213 @@
+"""
+Calendari di lavoro
+===================
+Festività aziendali, chiusure impianto e calendari per risorsa (part-time,
+turni, assenze) usati per distribuire le ore sui giorni effettivamente
+lavorativi.
+
+Ogni calendario distinto (giorni della settimana + giorni non lavorativi) è
+compilato una sola volta in un ``np.busdaycalendar`` e messo in cache per
+id: le funzioni numpy ``is_busday``/``busday_count`` restano vettoriali e
+vengono chiamate una volta per calendario, non per risorsa.
+
+Configurazione (``config_calendari.json``)::
+
+    {
+      "festivita_nazionali": true,
+      "festivita": ["2025-08-14"],
+      "chiusure":  [{"da": "2025-08-11", "a": "2025-08-22"}],
+      "risorse": {
+        "Mario Rossi": {"giorni": "Mon Tue Wed",
+                        "assenze": ["2025-03-03", {"da": "2025-07-01", "a": "2025-07-11"}]}
+      }
+    }
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from names import normalize_name
+
+DEFAULT_ID = "default"
+
+
+# ── Festività ─────────────────────────────────────────────────────────────────
+def _easter(year: int) -> date:
+    """Domenica di Pasqua (algoritmo di Meeus/Jones/Butcher)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def festivita_nazionali(years) -> list[date]:
+    """Festività nazionali italiane (Pasquetta compresa) per gli anni indicati."""
+    fixed = [(1, 1), (1, 6), (4, 25), (5, 1), (6, 2), (8, 15),
+             (11, 1), (12, 8), (12, 25), (12, 26)]
+    out = []
+    for y in years:
+        out.extend(date(y, m, d) for m, d in fixed)
+        out.append(_easter(y) + timedelta(days=1))
+    return out
+
+
+def _day(value, campo: str) -> date:
+    if not isinstance(value, str):
+        raise ValueError(f"{campo}: data attesa come testo \"AAAA-MM-GG\", trovato {value!r}")
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        raise ValueError(f"{campo}: data non valida {value!r}") from None
+    if pd.isna(ts):
+        raise ValueError(f"{campo}: data mancante")
+    return ts.date()
+
+
+def _days(entries, campo: str = "giorni") -> list[date]:
+    """Date singole ("AAAA-MM-GG") o periodi {"da", "a"} (estremi inclusi) → giorni."""
+    if entries is None:
+        return []
+    if not isinstance(entries, list):
+        raise ValueError(f"{campo}: attesa una lista, trovato {entries!r}")
+    out = []
+    for e in entries:
+        if isinstance(e, dict):
+            if "da" not in e:
+                raise ValueError(f"{campo}: periodo senza \"da\": {e!r}")
+            d0 = _day(e["da"], campo)
+            d1 = _day(e.get("a", e["da"]), campo)
+            out.extend(d0 + timedelta(days=k) for k in range((d1 - d0).days + 1))
+        else:
+            out.append(_day(e, campo))
+    return out
+
+
+@lru_cache(maxsize=256)
+def _compile(weekmask: str, holidays: tuple) -> np.busdaycalendar:
+    return np.busdaycalendar(weekmask=weekmask,
+                             holidays=np.array(holidays, dtype="datetime64[D]"))
+
+
+# ── Motore calendari ──────────────────────────────────────────────────────────
+class CalendarEngine:
+    """Calendario globale più eventuali calendari per risorsa (per nome)."""
+
+    def __init__(self, weekmask: str = "Mon Tue Wed Thu Fri", holidays=(),
+                 resources: dict | None = None):
+        self.weekmask = weekmask
+        self.holidays = tuple(sorted({str(d) for d in holidays}))
+        self._defs: dict[str, tuple[str, tuple]] = {DEFAULT_ID: (weekmask, self.holidays)}
+        self._by_resource: dict[str, str] = {}
+        for name, cfg in (resources or {}).items():
+            wm = cfg.get("giorni") or weekmask
+            days = tuple(sorted(set(self.holidays) | {str(d) for d in _days(cfg.get("assenze"))}))
+            cal_id = self._id(wm, days)
+            self._defs[cal_id] = (wm, days)
+            self._by_resource[normalize_name(name)] = cal_id
+
+    @staticmethod
+    def _id(weekmask: str, holidays: tuple) -> str:
+        raw = f"{weekmask}|{','.join(holidays)}".encode()
+        return hashlib.sha1(raw).hexdigest()[:12]
+
+    @classmethod
+    def from_config(cls, cfg: dict | None, weekmask: str, years) -> "CalendarEngine":
+        """
+        Motore dalla configurazione JSON; ``years`` delimita le festività nazionali.
+        Una configurazione con tipi sbagliati (es. ``"festivita": 5``) solleva
+        ``ValueError`` con il campo da correggere.
+        """
+        cfg = cfg or {}
+        if not isinstance(cfg, dict):
+            raise ValueError("la configurazione dei calendari deve essere un oggetto JSON")
+        holidays = _days(cfg.get("festivita"), "festivita") + _days(cfg.get("chiusure"), "chiusure")
+        nazionali = cfg.get("festivita_nazionali", True)
+        if not isinstance(nazionali, bool):
+            raise ValueError(f"festivita_nazionali: atteso true/false, trovato {nazionali!r}")
+        if nazionali:
+            holidays += festivita_nazionali(years)
+
+        risorse = cfg.get("risorse") or {}
+        if not isinstance(risorse, dict):
+            raise ValueError(f"risorse: atteso un oggetto {{nome: calendario}}, trovato {risorse!r}")
+        for name, r in risorse.items():
+            if not isinstance(r, dict):
+                raise ValueError(f"risorse.{name}: atteso un oggetto, trovato {r!r}")
+            giorni = r.get("giorni")
+            if giorni is not None:
+                if not isinstance(giorni, str):
+                    raise ValueError(f"risorse.{name}.giorni: atteso testo (es. \"Mon Tue Wed\")")
+                try:
+                    np.busdaycalendar(weekmask=giorni)
+                except ValueError:
+                    raise ValueError(f"risorse.{name}.giorni: giorni non validi {giorni!r}") from None
+            _days(r.get("assenze"), f"risorse.{name}.assenze")
+        return cls(weekmask, holidays, risorse)
+
+    @property
+    def signature(self) -> str:
+        """Firma del contenuto, da usare nelle chiavi di cache."""
+        items = sorted(self._by_resource.items())
+        return self._id(self.weekmask, self.holidays + tuple(f"{n}={c}" for n, c in items))
+
+    def calendar_id(self, resource: str) -> str:
+        return self._by_resource.get(normalize_name(resource), DEFAULT_ID)
+
+    def busdaycal(self, cal_id: str = DEFAULT_ID) -> np.busdaycalendar:
+        return _compile(*self._defs[cal_id])
+
+    def resource_calendars(self, resources) -> tuple[np.ndarray, list[np.busdaycalendar]]:
+        """
+        Per un array di nomi risorsa restituisce (codici, calendari): il
+        calendario della riga i è ``calendari[codici[i]]``. I nomi sono
+        risolti una volta per valore distinto (anche per le categoriche).
+        """
+        codes, uniques = pd.factorize(pd.Series(resources).astype(str))
+        cal_ids = [self.calendar_id(u) for u in uniques]
+        ids, cal_codes = np.unique(np.array(cal_ids or [DEFAULT_ID]), return_inverse=True)
+        return cal_codes[codes] if len(codes) else codes, [self.busdaycal(i) for i in ids]
+
+    def is_busday(self, days: np.ndarray, resources) -> np.ndarray:
+        """``np.is_busday`` riga per riga, ciascuna col calendario della sua risorsa."""
+        return is_busday_by(days, *self.resource_calendars(resources))
+
+    def busday_count(self, start: np.ndarray, end: np.ndarray, resources) -> np.ndarray:
+        """Giorni lavorativi in [start, end) riga per riga (calendario della risorsa)."""
+        return busday_count_by(start, end, *self.resource_calendars(resources))
+
+
+# ── Funzioni vettoriali per codice calendario ─────────────────────────────────
+def is_busday_by(days: np.ndarray, codes: np.ndarray, cals: list) -> np.ndarray:
+    """``np.is_busday`` con il calendario ``cals[codes[i]]`` per la riga i."""
+    if len(cals) == 1:
+        return np.is_busday(days, busdaycal=cals[0])
+    out = np.empty(len(days), dtype=bool)
+    for k, cal in enumerate(cals):
+        m = codes == k
+        out[m] = np.is_busday(days[m], busdaycal=cal)
+    return out
+
+
+def busday_count_by(start: np.ndarray, end: np.ndarray, codes: np.ndarray,
+                    cals: list) -> np.ndarray:
+    """``np.busday_count`` in [start, end) con il calendario ``cals[codes[i]]``."""
+    if len(cals) == 1:
+        return np.busday_count(start, end, busdaycal=cals[0])
+    out = np.empty(len(start), dtype=np.int64)
+    for k, cal in enumerate(cals):
+        m = codes == k
+        out[m] = np.busday_count(start[m], end[m], busdaycal=cal)
+    return out
@@ -0,0 +1,146 @@
+"""
+Client API GanttPro
+===================
+Chiamate REST e caricamento completo projects → resources → tasks.
+Non dipende da Streamlit, così può girare anche nel thread di refresh in
+background: gli avvisi vengono raccolti in ``errors`` e mostrati dall'app.
+Con un oggetto ``metrics.Metrics`` ogni chiamata registra latenza, byte
+ricevuti ed errori per endpoint.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+import requests
+
+from metrics import Metrics
+
+BASE_URL = "https://api.ganttpro.com/v1.0"
+
+
+# ── Helper: payload ───────────────────────────────────────────────────────────
+def _to_list(data) -> list:
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for k in ("items", "members", "data"):
+            if k in data:
+                return data[k]
+        return [data]
+    return []
+
+
+# ── Helper: ID ────────────────────────────────────────────────────────────────
+def _pid(p: dict):
+    for k in ("projectId", "id"):
+        v = p.get(k)
+        if v is not None:
+            return str(v)
+    return None
+
+
+def _rid(r: dict):
+    for k in ("resourceId", "id"):
+        v = r.get(k)
+        if v is not None:
+            return str(v)
+    return None
+
+
+def _tid(t: dict):
+    for k in ("taskId", "id"):
+        v = t.get(k)
+        if v is not None:
+            return str(v)
+    return None
+
+
+# ── Client ────────────────────────────────────────────────────────────────────
+class GanttProClient:
+    """Sessione HTTP verso GanttPro per una singola API key."""
+
+    def __init__(self, api_key: str, base_url: str = BASE_URL, timeout: float = 15,
+                 metrics: Metrics | None = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["X-API-KEY"] = api_key
+        self.errors: list[str] = []
+        self.metrics = metrics
+
+    def get(self, path: str, params: dict | None = None):
+        """GET su ``path``; in caso di errore registra l'avviso e restituisce None."""
+        t0, nbytes, ok = time.perf_counter(), 0, False
+        try:
+            r = self.session.get(f"{self.base_url}{path}",
+                                 params=params or {}, timeout=self.timeout)
+            nbytes = len(r.content or b"")
+            r.raise_for_status()
+            data = r.json()
+            ok = True
+            return data
+        except requests.exceptions.HTTPError:
+            self.errors.append(f"HTTP {r.status_code} su {path}: {r.text[:200]}")
+        except Exception as e:
+            self.errors.append(f"Errore {path}: {e}")
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_call(path, time.perf_counter() - t0, nbytes, error=not ok)
+        return None
+
+    def load_all(self, progress: Callable[[float, str], None] | None = None):
+        """Carica projects → resources per project → tasks per project.
+        Restituisce (projects_list, resource_catalog, tasks_list);
+        projects_list è None se l'elenco progetti non è raggiungibile.
+        resource_catalog: dict resourceId → {name, type, projects:[...]}
+        tasks_list: lista di task arricchiti con projectId e projectName
+        """
+        self.errors = []
+        t0 = time.perf_counter()
+        try:
+            return self._load_all(progress)
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_stage("fetch: load_all", time.perf_counter() - t0)
+
+    def _load_all(self, progress):
+        # 1. Progetti
+        raw = self.get("/projects")
+        if raw is None:
+            return None, {}, []
+        projects = _to_list(raw)
+
+        resource_catalog: dict[str, dict] = {}
+        all_tasks: list[dict] = []
+        n = len(projects)
+
+        for i, proj in enumerate(projects):
+            pid   = _pid(proj)
+            pname = proj.get("name", f"Progetto {pid}")
+            if progress is not None:
+                progress((i + 1) / n, f"Caricamento: {pname}")
+
+            # 2. Risorse del progetto
+            res_raw = self.get("/resources", params={"projectId": pid})
+            for res in _to_list(res_raw):
+                rid   = _rid(res)
+                rname = res.get("name") or res.get("resourceName") or f"Risorsa {rid}"
+                rtype = res.get("type", "unknown")
+                if rid:
+                    if rid not in resource_catalog:
+                        resource_catalog[rid] = {"name": rname, "type": rtype, "projects": []}
+                        if res.get("email"):
+                            resource_catalog[rid]["email"] = res["email"]
+                    if pname not in resource_catalog[rid]["projects"]:
+                        resource_catalog[rid]["projects"].append(pname)
+
+            # 3. Task del progetto
+            task_raw = self.get("/tasks", params={"projectId": pid})
+            for task in _to_list(task_raw):
+                task["_projectId"]   = pid
+                task["_projectName"] = pname
+                all_tasks.append(task)
+
+        return projects, resource_catalog, all_tasks
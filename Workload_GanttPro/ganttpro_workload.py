@@ -15,28 +15,86 @@ Avvio:
 from __future__ import annotations
 
 import streamlit as st
-import requests
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import date, timedelta
+import json
+import sqlite3
+import sys
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import Path
+
+from assignments import build_intervals, expand_daily
+from calendars import CalendarEngine
+from history import HistoryStore
+from levelling import level_resources
+from metrics import Metrics, to_jsonl
+from overlap import OverlapIndex
+from refresher import BackgroundRefresher
+from snapshot import SNAPSHOT_SUFFIX, read_snapshot, snapshot_bytes
+from workspaces import (history_source, key_fingerprint, merge_workspaces, parse_api_keys,
+                        workspaces_from_secrets)
+
+# Modulo di profilazione condiviso con le altre app (cartella del repository)
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:                 # lo script gira a ogni rerun: una sola voce
+    sys.path.insert(0, ROOT)
+from profilazione import profilatore
 
 
 # ── Costanti ─────────────────────────────────────────────────────────────────
-BASE_URL      = "https://api.ganttpro.com/v1.0"
+REFRESH_INTERVAL_S = 300     # refresh dati GanttPro in background (secondi)
+REFRESH_IDLE_S     = 3600    # senza sessioni che leggono i dati il refresh si ferma
+REFRESHER_MAX      = 8       # API key con un refresher attivo
 DAILY_CAP_H   = 8.0          # soglia overload (ore/giorno)
 WORK_DAYS     = "1111100"    # lun-ven (formato numpy busday)
+LOD_DAILY_MAX_DAYS  = 92     # fino a ~3 mesi: heatmap e barre giornaliere
+LOD_WEEKLY_MAX_DAYS = 548    # fino a ~18 mesi: settimanali, oltre: mensili
+GANTT_PAGE_SIZES    = [25, 50, 100, 200]   # righe (Commessa — Task) per pagina
+GANTT_SVG_MAX_BARS  = 300    # oltre questo n° di barre per pagina: tracce WebGL
+CONFLICTS_TOP_N     = 100    # righe mostrate nella classifica conflitti
+CONFIG_CALENDARI    = Path(__file__).parent / "config_calendari.json"
+HISTORY_DB          = Path(__file__).parent / "storico_carico.sqlite"
+CALENDAR_YEARS      = range(date.today().year - 5, date.today().year + 6)  # festività nazionali
+GANTT_SORT = {                # ordinamento righe Gantt: (colonne, ascending)
+    "Commessa, inizio":  (["progetto", "start"], [True, True]),
+    "Inizio":            (["start", "progetto"], [True, True]),
+    "Fine":              (["end", "progetto"], [True, True]),
+    "Ore (decrescente)": (["ore_tot"], [False]),
+    "Risorsa":           (["risorsa", "start"], [True, True]),
+}
 image_link ='https://github.com/alessandrobelluco/impj/blob/main/Workload_GanttPro/logo_impj.png?raw=True'
 
 #try:
 #API_KEY = st.secrets["api_key"]
     
 #except KeyError:
-API_KEY = st.sidebar.text_input("API Key", type="password")
-if not API_KEY:
-    st.sidebar.warning('Inserire API_KEY Gantt Pro')
-    st.stop()
+data_source = st.sidebar.radio("Sorgente dati", ["GanttPro API", "Snapshot"],
+                               horizontal=True)
+snapshot_file = None
+WORKSPACES: dict[str, str] = {}      # nome workspace → API key
+if data_source == "GanttPro API":
+    # Più workspace (una API key per business unit): dai secrets, sezione
+    # [workspaces], oppure inserite a mano come "nome=chiave" separate da virgola
+    configured = workspaces_from_secrets(st.secrets)
+    if configured:
+        sel_ws = st.sidebar.multiselect("Workspace", list(configured),
+                                        default=list(configured))
+        WORKSPACES = {n: configured[n] for n in sel_ws}
+    else:
+        WORKSPACES = parse_api_keys(st.sidebar.text_input(
+            "API Key", type="password",
+            help="Più workspace: nome=chiave separati da virgola"))
+    if not WORKSPACES:
+        st.sidebar.warning('Inserire API_KEY Gantt Pro')
+        st.stop()
+else:
+    snapshot_file = st.sidebar.file_uploader(f"Snapshot GanttPro ({SNAPSHOT_SUFFIX})")
+    if snapshot_file is None:
+        st.sidebar.warning('Caricare uno snapshot salvato in precedenza')
+        st.stop()
 
 st.set_page_config(
     page_title="GanttPro Workload",
@@ -44,6 +102,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+prof = profilatore("Workload_GanttPro")
 
 # ── Palette blu/grigio (niente colori vivaci tranne la heatmap) ───────────────
 PROJ_PALETTE = [
@@ -81,239 +140,321 @@ with st.sidebar:
         )
         daily_cap = None
     include_weekends = st.checkbox("Includi weekend nel calcolo", value=False)
+    with st.expander("Calendari"):
+        calendar_file = st.file_uploader(
+            "Calendari (JSON)", type="json",
+            help="Festività, chiusure e calendari per risorsa; "
+                 f"senza file si usa {CONFIG_CALENDARI.name} se presente")
 
     st.divider()
     load_btn = st.button("Carica tutti i dati", use_container_width=True, type="primary")
     if st.button("Svuota cache", use_container_width=True):
-        for k in ["raw_projects", "raw_resources", "raw_tasks", "df_assignments"]:
+        for k in ["df_assignments", "df_intervals", "resource_catalog", "source_key"]:
             st.session_state.pop(k, None)
+        prof.chiudi(interrotto=True)
         st.rerun()
 
 
 
-HEADERS = {"X-API-KEY": API_KEY}
 WEEKMASK = "Mon Tue Wed Thu Fri Sat Sun" if include_weekends else "Mon Tue Wed Thu Fri"
 
 
-# ── Helper: chiamate API ──────────────────────────────────────────────────────
-def _get(path: str, params: dict | None = None):
-    try:
-        r = requests.get(f"{BASE_URL}{path}", headers=HEADERS,
-                         params=params or {}, timeout=15)
-        r.raise_for_status()
-        return r.json()
-    except requests.exceptions.HTTPError:
-        st.warning(f"HTTP {r.status_code} su {path}: {r.text[:200]}")
-    except Exception as e:
-        st.warning(f"Errore {path}: {e}")
-    return None
-
-
-def _to_list(data) -> list:
-    if isinstance(data, list):
-        return data
-    if isinstance(data, dict):
-        for k in ("items", "members", "data"):
-            if k in data:
-                return data[k]
-        return [data]
-    return []
-
-
-# ── Helper: ID ────────────────────────────────────────────────────────────────
-def _pid(p: dict):
-    for k in ("projectId", "id"):
-        v = p.get(k)
-        if v is not None:
-            return str(v)
-    return None
-
-
-def _rid(r: dict):
-    for k in ("resourceId", "id"):
-        v = r.get(k)
-        if v is not None:
-            return str(v)
-    return None
-
-
-def _tid(t: dict):
-    for k in ("taskId", "id"):
-        v = t.get(k)
-        if v is not None:
-            return str(v)
-    return None
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_calendars(config_text: str, weekmask: str) -> CalendarEngine:
+    """Calendari compilati, condivisi tra le sessioni con la stessa configurazione."""
+    return CalendarEngine.from_config(json.loads(config_text or "{}"), weekmask, CALENDAR_YEARS)
 
 
-# ── Caricamento dati ──────────────────────────────────────────────────────────
-@st.cache_data(ttl=300, show_spinner=False)
-def load_all(api_key_hash: str):
-    """Carica projects → resources per project → tasks per project.
-    Restituisce (projects_list, resource_catalog, tasks_list).
-    resource_catalog: dict resourceId → {name, type, projects:[...]}
-    tasks_list: lista di task arricchiti con projectId e projectName
-    """
-    # 1. Progetti
-    raw = _get("/projects")
-    if raw is None:
-        return None, {}, []
-    projects = _to_list(raw)
-
-    resource_catalog: dict[str, dict] = {}
-    all_tasks: list[dict] = []
-
-    progress_bar = st.progress(0, text="Caricamento progetti...")
-    n = len(projects)
-
-    for i, proj in enumerate(projects):
-        pid  = _pid(proj)
-        pname = proj.get("name", f"Progetto {pid}")
-        progress_bar.progress((i + 1) / n, text=f"Caricamento: {pname}")
-
-        # 2. Risorse del progetto
-        res_raw = _get("/resources", params={"projectId": pid})
-        for res in _to_list(res_raw):
-            rid   = _rid(res)
-            rname = res.get("name") or res.get("resourceName") or f"Risorsa {rid}"
-            rtype = res.get("type", "unknown")
-            if rid:
-                if rid not in resource_catalog:
-                    resource_catalog[rid] = {"name": rname, "type": rtype, "projects": []}
-                if pname not in resource_catalog[rid]["projects"]:
-                    resource_catalog[rid]["projects"].append(pname)
-
-        # 3. Task del progetto
-        task_raw = _get("/tasks", params={"projectId": pid})
-        for task in _to_list(task_raw):
-            task["_projectId"]   = pid
-            task["_projectName"] = pname
-            all_tasks.append(task)
+if calendar_file is not None:
+    _calendar_text = calendar_file.getvalue().decode("utf-8")
+elif CONFIG_CALENDARI.exists():
+    _calendar_text = CONFIG_CALENDARI.read_text(encoding="utf-8")
+else:
+    _calendar_text = ""
+try:
+    CALENDARS = get_calendars(_calendar_text, WEEKMASK)
+except ValueError as e:
+    st.sidebar.error(f"Calendari non validi, uso solo le festività nazionali: {e}")
+    CALENDARS = get_calendars("", WEEKMASK)
 
-    progress_bar.empty()
-    return projects, resource_catalog, all_tasks
 
+# ── Caricamento dati ──────────────────────────────────────────────────────────
+@st.cache_resource(max_entries=REFRESHER_MAX, show_spinner=False,
+                   on_release=BackgroundRefresher.stop)
+def get_refresher(api_key: str) -> BackgroundRefresher:
+    """Un refresher in background per API key, condiviso tra le sessioni.
+    Le chiavi in eccesso escono dalla cache e il loro thread si ferma; quelle
+    che nessuna sessione legge smettono di interrogare GanttPro da sole."""
+    return BackgroundRefresher(api_key, interval_s=REFRESH_INTERVAL_S, idle_s=REFRESH_IDLE_S)
 
-# ── Espansione giornaliera ────────────────────────────────────────────────────
-def build_daily_assignments(tasks: list, resource_catalog: dict,
-                             weekmask: str) -> pd.DataFrame:
-    """
-    Per ogni task con risorse assegnate, distribuisce le ore equamente
-    sui giorni lavorativi compresi tra startDate e endDate.
 
-    Colonne output:
-        date, risorsa, resource_id, tipo_risorsa,
-        progetto, task, ore, task_id
-    """
-    rows = []
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_overlap_index(source_key, _intervals: pd.DataFrame, weekmask: str,
+                      _calendars: CalendarEngine) -> OverlapIndex:
+    """Interval tree per risorsa, condiviso tra le sessioni con gli stessi dati."""
+    return OverlapIndex(_intervals, weekmask=weekmask, calendars=_calendars)
 
-    for task in tasks:
-        pname     = task.get("_projectName", "?")
-        tname     = task.get("name", "?")
-        tid       = _tid(task)
-        duration  = task.get("duration", 0) or 0         # minuti
-        resources = task.get("resources") or task.get("assignments") or []
 
-        # Date
-        raw_start = task.get("startDate") or task.get("start_date")
-        raw_end   = task.get("endDate")   or task.get("end_date")
-        if not raw_start or not raw_end:
-            continue
+@st.cache_resource(show_spinner=False)
+def get_history() -> HistoryStore:
+    return HistoryStore(HISTORY_DB)
 
-        try:
-            # GanttPro può restituire timestamp (ms) o stringa ISO
-            if isinstance(raw_start, (int, float)):
-                d_start = pd.Timestamp(raw_start, unit="ms").date()
-                d_end   = pd.Timestamp(raw_end,   unit="ms").date()
-            else:
-                d_start = pd.to_datetime(raw_start).date()
-                d_end   = pd.to_datetime(raw_end).date()
-        except Exception:
-            continue
-
-        if d_end < d_start:
-            d_end = d_start
-
-        # Giorni lavorativi del task
-        bdays = np.busday_count(d_start, d_end + timedelta(days=1),
-                                weekmask=weekmask)
-        bdays = max(bdays, 1)
-
-        # Genera lista di date lavorative
-        all_days = pd.bdate_range(
-            start=d_start, end=d_end,
-            freq="C", weekmask=weekmask,
-        ).date.tolist()
-        if not all_days:
-            all_days = [d_start]
-
-        for r in resources:
-            if not isinstance(r, dict):
-                continue
-            rid         = str(r.get("resourceId") or r.get("id") or "")
-            res_val_min = r.get("resourceValue") or 0
-            ore_totali  = res_val_min / 60
-            ore_per_day = ore_totali / len(all_days)
-
-            # Risolvi nome dalla catalog
-            catalog_entry = resource_catalog.get(rid, {})
-            rname = (catalog_entry.get("name")
-                     or r.get("name") or r.get("resourceName")
-                     or f"Risorsa {rid}")
-            rtype = catalog_entry.get("type", "unknown")
-
-            for d in all_days:
-                rows.append({
-                    "date":         d,
-                    "risorsa":      rname,
-                    "resource_id":  rid,
-                    "tipo_risorsa": rtype,
-                    "progetto":     pname,
-                    "task":         tname,
-                    "task_id":      tid,
-                    "ore":          round(ore_per_day, 3),
-                })
-
-    if not rows:
-        return pd.DataFrame(columns=["date","risorsa","resource_id",
-                                     "tipo_risorsa","progetto","task","task_id","ore"])
-    df = pd.DataFrame(rows)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def record_history(source: str, fetched: tuple, _intervals: pd.DataFrame) -> int:
+    """
+    Accoda allo storico il dataset API identificato da ``fetched`` (istanti dei
+    fetch dei workspace) una sola volta, qualunque sia il numero di sessioni.
+    Le ore giornaliere si ricalcolano con il calendario del server e la
+    settimana lun-ven, non con quello caricato dall'utente, così gli
+    snapshot restano confrontabili tra loro.
+    """
+    server_text = CONFIG_CALENDARI.read_text(encoding="utf-8") if CONFIG_CALENDARI.exists() else ""
+    weekmask = "Mon Tue Wed Thu Fri"
+    daily = expand_daily(_intervals, weekmask, get_calendars(server_text, weekmask))
+    history = get_history()
+    data_id = history.append(_intervals, daily, source=source)
+    history.apply_retention()
+    return data_id
+
+
+@st.cache_data(show_spinner=False)
+def load_snapshot(data: bytes):
+    """Legge uno snapshot caricato (cache sul contenuto del file)."""
+    return read_snapshot(data)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def merge_loaded(versions: tuple, _loaded: dict):
+    """Unione dei workspace, rifatta solo quando cambia la versione di uno di
+    essi e non a ogni rerun (i task vengono copiati e rimappati)."""
+    return merge_workspaces(_loaded)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def export_snapshot(versions: tuple, _dataset) -> bytes:
+    """Serializza il dataset unito; cache per ((workspace, impronta chiave, versione), ...)."""
+    projects, resource_catalog, all_tasks = _dataset
+    return snapshot_bytes(projects, resource_catalog, all_tasks,
+                          meta={"source": "ganttpro-api",
+                                "workspaces": [ws for ws, *_ in versions]})
+
+
+# ── Livello di dettaglio temporale ────────────────────────────────────────────
+def _lod_freq(d_from, d_to) -> str:
+    """Granularità ("D", "W", "M") in base all'ampiezza dell'intervallo date."""
+    span = (pd.Timestamp(d_to) - pd.Timestamp(d_from)).days + 1
+    if span <= LOD_DAILY_MAX_DAYS:
+        return "D"
+    if span <= LOD_WEEKLY_MAX_DAYS:
+        return "W"
+    return "M"
+
+
+def _lod_bucket(dates: pd.Series, freq: str) -> pd.Series:
+    """Centro del bucket (giorno, settimana lun-dom, mese) di ogni data.
+    Il centro allinea celle e barre al periodo sull'asse temporale condiviso."""
+    if freq == "D":
+        return dates
+    per = dates.dt.to_period("W-SUN" if freq == "W" else "M")
+    return per.dt.start_time + (per.dt.end_time - per.dt.start_time) / 2
+
+
+def _lod_labels(centers, freq: str) -> np.ndarray:
+    """Etichette hover dei bucket, calcolate sui centri restituiti da _lod_bucket."""
+    centers = pd.DatetimeIndex(centers)
+    if freq == "D":
+        return np.asarray(centers.strftime("%Y-%m-%d"), dtype=str)
+    if freq == "W":
+        starts = centers.to_period("W-SUN").start_time
+        return np.asarray(starts.strftime("sett. %d/%m/%Y"), dtype=str)
+    return np.asarray(centers.strftime("%m/%Y"), dtype=str)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # CARICAMENTO
 # ══════════════════════════════════════════════════════════════════════════════
-if load_btn or "df_assignments" not in st.session_state:
-    with st.spinner("Connessione a GanttPro..."):
-        projects, resource_catalog, all_tasks = load_all(API_KEY[:8])
+# Con l'API i dati arrivano dai refresher in background (uno per workspace):
+# la sessione usa sempre l'ultimo dataset valido di ciascuno e rifà l'unione
+# e l'espansione quando ne compare una versione più recente, senza attendere
+# la rete.
+run_metrics = Metrics()          # tempi delle fasi di questo run dello script
+prof.fase("load", "dataset")
+refreshers = {ws: get_refresher(key) for ws, key in WORKSPACES.items()}
+# Storico per impronta delle API key (non per nome): stessa sorgente in scrittura e lettura
+HISTORY_SOURCE = history_source(WORKSPACES.values())
+def _wait_fetch(pending: list, done, text: str):
+    """Barra di avanzamento finché ``done(r)`` non è vero per ogni refresher."""
+    progress_bar = st.progress(0, text=text)
+    while not all(done(r) for r in pending):
+        frac = sum(r.progress[0] for r in pending) / len(pending)
+        msg = next((r.progress[1] for r in pending if r.progress[1]), "")
+        progress_bar.progress(min(frac, 1.0), text=msg or text)
+    progress_bar.empty()
+
+
+if refreshers:
+    if load_btn:
+        # Ricarica esplicita: si attende il nuovo fetch, altrimenti l'espansione
+        # verrebbe rifatta sugli stessi dati di prima
+        attempts = {r: r.attempts for r in refreshers.values()}
+        for r in refreshers.values():
+            r.refresh_now()
+        _wait_fetch(list(attempts), lambda r: r.wait_fetch(attempts[r], timeout=0.25),
+                    "Aggiornamento da GanttPro...")
+    pending = [r for r in refreshers.values() if not r.wait_ready(timeout=0)]
+    if pending:
+        # Primo avvio: non esiste ancora un dataset da servire
+        _wait_fetch(pending, lambda r: r.wait_ready(timeout=0.25), "Connessione a GanttPro...")
+
+    loaded, versions, fetched = {}, [], []
+    for ws, r in refreshers.items():
+        data, version, fetched_at = r.snapshot()
+        prefix = f"[{ws}] " if len(refreshers) > 1 else ""
+        for msg in r.warnings:
+            st.warning(prefix + msg)
+        if data is not None and data[0] is not None:
+            loaded[ws] = data
+            # la versione è un contatore del refresher: l'impronta della chiave
+            # distingue workspace con lo stesso nome in sessioni diverse
+            versions.append((ws, key_fingerprint(WORKSPACES[ws]), version))
+            fetched.append(fetched_at)
+        elif len(refreshers) > 1:
+            st.warning(f"{prefix}Progetti non disponibili, workspace escluso.")
+    versions = tuple(versions)
+    dataset = merge_loaded(versions, loaded) if loaded else None
+    source_key = ("api", versions, WEEKMASK, CALENDARS.signature)
+else:
+    dataset = None
+    # Firma della sorgente: cambiando snapshot o weekmask l'espansione va rifatta
+    source_key = (snapshot_file.file_id, WEEKMASK, CALENDARS.signature)
+
+if (load_btn or "df_assignments" not in st.session_state
+        or st.session_state.get("source_key") != source_key):
+    snapshot_meta = None
+    if snapshot_file is not None:
+        with st.spinner("Lettura snapshot..."):
+            try:
+                projects, resource_catalog, all_tasks, snapshot_meta = load_snapshot(
+                    snapshot_file.getvalue())
+            except ValueError as e:
+                st.error(f"Snapshot non valido: {e}")
+                prof.chiudi(interrotto=True)
+                st.stop()
+    elif dataset is not None:
+        projects, resource_catalog, all_tasks = dataset
+    else:
+        projects, resource_catalog, all_tasks = None, {}, []
 
     if projects is None:
         st.error("Impossibile caricare i progetti. Verifica la API Key.")
+        prof.chiudi(interrotto=True)
         st.stop()
 
     if not all_tasks:
         st.warning("Nessun task trovato.")
+        prof.chiudi(interrotto=True)
         st.stop()
 
+    prof.fase("preprocess", "espansione giornaliera")
+    expansion_metrics = Metrics()
     with st.spinner("Espansione giornaliera assegnazioni..."):
-        df = build_daily_assignments(all_tasks, resource_catalog, WEEKMASK)
+        with expansion_metrics.stage("espansione: build_intervals"):
+            df_intervals = build_intervals(all_tasks, resource_catalog)
+        with expansion_metrics.stage("espansione: expand_daily"):
+            df = expand_daily(df_intervals, WEEKMASK, CALENDARS)
+
+    # Storico: un punto al giorno per i dati API, solo se tutti i workspace
+    # selezionati hanno risposto (altrimenti la serie mescolerebbe insiemi diversi)
+    if snapshot_file is None and len(loaded) == len(WORKSPACES):
+        try:
+            record_history(HISTORY_SOURCE, tuple(fetched), df_intervals)
+        except (sqlite3.Error, ValueError) as e:      # DB o calendario del server
+            st.sidebar.warning(f"Storico non aggiornato: {e}")
 
+    # In sessione restano solo i frame compatti: i payload grezzi (task,
+    # progetti) sono già espansi e restano, una sola volta, nel refresher
+    # o nella cache dello snapshot.
     st.session_state["df_assignments"]   = df
+    st.session_state["df_intervals"]     = df_intervals
     st.session_state["resource_catalog"] = resource_catalog
-    st.session_state["projects"]         = projects
-    st.session_state["all_tasks"]        = all_tasks
+    st.session_state["snapshot_meta"]    = snapshot_meta
+    st.session_state["source_key"]       = source_key
+    st.session_state["expansion_metrics"] = expansion_metrics
+    del projects, all_tasks
 
 df: pd.DataFrame         = st.session_state.get("df_assignments", pd.DataFrame())
+df_intervals: pd.DataFrame = st.session_state.get("df_intervals", pd.DataFrame())
 resource_catalog: dict   = st.session_state.get("resource_catalog", {})
-projects: list           = st.session_state.get("projects", [])
-all_tasks: list          = st.session_state.get("all_tasks", [])
 
 if df.empty:
     st.info("Premi **🚀 Carica tutti i dati** per iniziare.")
+    prof.chiudi(interrotto=True)
     st.stop()
+run_metrics.lap("render: caricamento")
+prof.annota(sorgente="snapshot" if snapshot_file is not None else "api",
+            workspace=sorted(WORKSPACES), righe_giornaliere=len(df))
+
+
+# ── Sorgente dati (sidebar) ──────────────────────────────────────────────────
+def _fmt_age(seconds: float) -> str:
+    if seconds < 60:
+        return "meno di un minuto fa"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min fa"
+    return f"{seconds / 3600:.1f} h fa"
+
+
+def _session_memory_mb() -> float:
+    """Memoria dei DataFrame tenuti in st.session_state da questa sessione (MB)."""
+    return sum(
+        v.memory_usage(deep=True).sum()
+        for v in st.session_state.to_dict().values() if isinstance(v, pd.DataFrame)
+    ) / 2**20
+
+
+@st.fragment(run_every=30)
+def _freshness(refreshers: dict[str, BackgroundRefresher]):
+    """Età del dataset servito e stato del refresh in background, per workspace."""
+    multi = len(refreshers) > 1
+    for ws, refresher in refreshers.items():
+        label = f"{ws}: dati" if multi else "Dati GanttPro"
+        age = refresher.age_s()
+        st.caption(f"{label} aggiornati {_fmt_age(age)}" if age is not None
+                   else f"{label} non ancora disponibili")
+        if refresher.refreshing:
+            st.caption("Aggiornamento in background in corso...")
+        elif refresher.last_error:
+            st.caption(f"Ultimo aggiornamento non riuscito: {refresher.last_error}")
+        if multi and st.button(f"Aggiorna {ws}", key=f"refresh_ws_{ws}",
+                               use_container_width=True):
+            refresher.refresh_now()
+
+
+prof.fase("export", "snapshot")
+with st.sidebar:
+    snapshot_meta = st.session_state.get("snapshot_meta")
+    if snapshot_meta:
+        st.caption(
+            f"Snapshot del {snapshot_meta.get('created_at', '?')} · "
+            f"{snapshot_meta.get('n_projects', '?')} progetti, "
+            f"{snapshot_meta.get('n_tasks', '?')} task"
+        )
+    elif refreshers and dataset is not None:
+        _freshness(refreshers)
+        st.download_button(
+            "Scarica snapshot",
+            data=export_snapshot(versions, dataset),
+            file_name=f"ganttpro_snapshot_{datetime.now().strftime('%Y%m%d_%H%M')}{SNAPSHOT_SUFFIX}",
+            mime="application/gzip",
+            use_container_width=True,
+            help="Salva progetti, risorse e task correnti per riaprirli senza API",
+        )
+    st.caption(f"Memoria sessione: {_session_memory_mb():.1f} MB "
+               f"({len(df):,} righe giornaliere)".replace(",", "."))
 
 
+prof.fase("filter", "filtri globali")
 # ── Filtri globali (sidebar) ──────────────────────────────────────────────────
 with st.sidebar:
     st.divider()
@@ -347,6 +488,7 @@ mask = (
 )
 dff = df[mask].copy()
 
+prof.fase("aggregate", "overload")
 # ── Calcolo overload centralizzato ───────────────────────────────────────────
 # Interna  → valore giornaliero = ore; soglia = daily_cap
 # Fornitore → valore giornaliero = n° commesse attive; soglia = proj_cap
@@ -357,18 +499,24 @@ if is_internal:
     cap_label = f"{daily_cap} h/giorno"
     cap_unit  = "ore"
     # Serie (risorsa, date) → ore totali
-    daily_load = dff.groupby(["risorsa", "date"])["ore"].sum()
+    daily_load = dff.groupby(["risorsa", "date"], observed=True)["ore"].sum()
 else:
     cap_value = proj_cap
     cap_label = f"{proj_cap} task contemporanee"
     cap_unit  = "task"
     # Serie (risorsa, date) → n° task distinte
-    daily_load = dff.groupby(["risorsa", "date"])["task_id"].nunique()
+    daily_load = dff.groupby(["risorsa", "date"], observed=True)["task_id"].nunique()
 
 # Bool (risorsa, date) → True se in overload quel giorno
 overload_mask = daily_load > cap_value
 
+# Granularità di heatmap e barre: su orizzonti lunghi si aggrega per settimana
+# o mese, così il payload inviato al browser resta limitato.
+lod = _lod_freq(d_from, d_to)
+lod_name = {"D": "giorno", "W": "settimana", "M": "mese"}[lod]
 
+
+prof.fase("render", "metriche")
 # ── Header metriche ───────────────────────────────────────────────────────────
 h_sx, h_dx = st.columns([3,1])
 
@@ -381,7 +529,7 @@ c2.metric("Risorse",    len(dff["risorsa"].unique()))
 c3.metric("Task",       len(dff["task_id"].unique()))
 c4.metric("Ore totali", f"{dff['ore'].sum():.0f} h")
 
-overloaded = overload_mask.groupby(level=0).any().sum()
+overloaded = overload_mask.groupby(level=0, observed=True).any().sum()
 c5.metric("Risorse in overload", int(overloaded),
           help=f"Almeno un giorno con >{cap_label}")
 
@@ -398,38 +546,57 @@ x_range = [x_min - x_pad, x_max + x_pad]
 
 # Calcola il margine sinistro in base alla label Y più lunga tra i tre grafici.
 # Heatmap: nomi risorsa; Gantt: "Commessa — Task"; Bar: nessuna label Y lunga.
-_heatmap_labels = list(dff["risorsa"].unique())
-_gantt_labels   = [
-    f"{row['progetto']}  —  {row['task']}"
-    for _, row in dff.groupby(["progetto", "task"]).size().reset_index().iterrows()
-]
-_max_chars = max((len(s) for s in _heatmap_labels + _gantt_labels), default=20)
+_gantt_pairs = dff[["progetto", "task"]].drop_duplicates()
+_label_lens  = pd.concat([
+    dff["risorsa"].drop_duplicates().astype(str).str.len(),
+    _gantt_pairs["progetto"].astype(str).str.len()
+    + _gantt_pairs["task"].astype(str).str.len() + 5,     # "  —  "
+])
+_max_chars = int(_label_lens.max()) if len(_label_lens) else 20
 _L = max(160, int(_max_chars * 7.2))   # ~7.2 px per carattere (font ~12px)
 
 MARGIN = dict(l=_L, r=220, t=30, b=50)
-XAXIS  = dict(range=x_range, tickformat="%d %b", tickangle=-45)
+XAXIS  = dict(range=x_range, tickformat="%b %Y" if lod == "M" else "%d %b",
+              tickangle=-45)
 
 # Legenda ancorata fuori a destra (stessa posizione per Gantt e barre)
 LEGEND = dict(x=1.02, y=1, xanchor="left", yanchor="top", title="Progetto")
 
+run_metrics.lap("render: filtri e metriche")
+
+prof.fase("render", "heatmap")
 # ── Heatmap ───────────────────────────────────────────────────────────────
 heat_unit = "Ore/gg" if is_internal else "Task/gg"
 hover_fmt = ".1f" if is_internal else ".0f"
 
-if is_internal:
-    daily_agg_s = dff.groupby(["risorsa", "date"])["ore"].sum().reset_index()
-    daily_agg_s.rename(columns={"ore": "_val"}, inplace=True)
-else:
-    daily_agg_s = dff.groupby(["risorsa", "date"])["task_id"].nunique().reset_index()
-    daily_agg_s.rename(columns={"task_id": "_val"}, inplace=True)
+daily_agg_s = daily_load.rename("_val").reset_index()
 
-st.subheader(f"Carico giornaliero per risorsa ({heat_unit})")
+if lod == "D":
+    st.subheader(f"Carico giornaliero per risorsa ({heat_unit})")
+else:
+    st.subheader(f"Picco giornaliero per {lod_name} e risorsa ({heat_unit})")
+
+# Per bucket si conserva il giorno di picco (max) e il n° di giorni oltre soglia:
+# una cella è rossa se e solo se almeno un giorno del periodo è in overload.
+daily_agg_s["_bucket"] = _lod_bucket(daily_agg_s["date"], lod)
+daily_agg_s["_over"]   = daily_agg_s["_val"] > cap_value
+heat_agg_s = (
+    daily_agg_s.groupby(["risorsa", "_bucket"], observed=True)
+    .agg(_val=("_val", "max"), _over=("_over", "sum"))
+    .reset_index()
+)
 
-pivot_s = daily_agg_s.pivot_table(
-    index="risorsa", columns="date",
-    values="_val", aggfunc="sum", fill_value=0,
+pivot_s = heat_agg_s.pivot_table(
+    index="risorsa", columns="_bucket",
+    values="_val", aggfunc="max", fill_value=0, observed=True,
+)
+_row_order = daily_agg_s.groupby("risorsa", observed=True)["_val"].sum().sort_values(ascending=False).index
+pivot_s = pivot_s.loc[_row_order]
+pivot_over = (
+    heat_agg_s.pivot_table(index="risorsa", columns="_bucket",
+                           values="_over", aggfunc="sum", fill_value=0, observed=True)
+    .reindex(index=pivot_s.index, columns=pivot_s.columns, fill_value=0)
 )
-pivot_s = pivot_s.loc[pivot_s.sum(axis=1).sort_values(ascending=False).index]
 
 # Colorscale con cambio netto alla soglia:
 # sotto cap_value → verde, sopra cap_value → rosso.
@@ -442,8 +609,21 @@ _heat_colorscale = [
     [1.0,        "#7f0000"],   # rosso scuro (overload pesante)
 ]
 
+# Testo hover vettoriale: etichetta periodo + valore (+ giorni in overload)
+_heat_vals = pivot_s.to_numpy(dtype=float)
+_heat_text = np.char.add(
+    np.char.add(_lod_labels(pivot_s.columns, lod)[None, :], "<br>"),
+    np.char.mod(f"%{hover_fmt}", _heat_vals),
+)
+if lod != "D":
+    _heat_text = np.char.add(
+        np.char.add(_heat_text, " (picco)<br>Giorni oltre soglia: "),
+        np.char.mod("%d", pivot_over.to_numpy(dtype=int)),
+    )
+_heat_text = np.where(_heat_vals > 0, _heat_text, "")
+
 fig_heat_s = go.Figure(data=go.Heatmap(
-    z=pivot_s.values,
+    z=_heat_vals,
     x=pivot_s.columns.tolist(),
     y=pivot_s.index.tolist(),
     colorscale=_heat_colorscale,
@@ -456,8 +636,8 @@ fig_heat_s = go.Figure(data=go.Heatmap(
         thickness=15,
     ),
     hoverongaps=False,
-    text=[[f"{v:{hover_fmt}}" if v > 0 else "" for v in row] for row in pivot_s.values],
-    hovertemplate="<b>%{y}</b><br>%{x|%Y-%m-%d}<br>%{text}<extra></extra>",
+    text=_heat_text,
+    hovertemplate="<b>%{y}</b><br>%{text}<extra></extra>",
 ))
 fig_heat_s.update_layout(
     height=max(280, len(pivot_s) * 30 + 80),
@@ -466,46 +646,110 @@ fig_heat_s.update_layout(
 )
 st.plotly_chart(fig_heat_s, use_container_width=True)
 
+run_metrics.lap("render: heatmap")
+
+prof.fase("render", "gantt")
 # ── Gantt dettagliato per task ────────────────────────────────────────────
 st.subheader("Timeline task (dettaglio per task)")
 
 gantt_s = (
-    dff.groupby(["risorsa", "task", "progetto"])["date"]
-    .agg(start="min", end="max")
+    dff.groupby(["risorsa", "task", "progetto"], observed=True)
+    .agg(start=("date", "min"), end=("date", "max"), ore_tot=("ore", "sum"))
     .reset_index()
-)
-gantt_s["ore_tot"] = (
-    dff.groupby(["risorsa", "task", "progetto"])["ore"].sum().values
+    .astype({"risorsa": str, "task": str, "progetto": str})
 )
 gantt_s["end_excl"] = gantt_s["end"] + pd.Timedelta(days=1)
-gantt_s = gantt_s.sort_values(["progetto", "start"]).reset_index(drop=True)
 # Etichetta Y univoca: "Commessa — Task"
 gantt_s["_y_label"] = gantt_s["progetto"] + "  —  " + gantt_s["task"]
 
-fig_gantt_s = px.timeline(
-    gantt_s,
-    x_start="start", x_end="end_excl",
-    y="_y_label", color="progetto",
-    hover_name="task",
-    hover_data={"risorsa": True, "ore_tot": ":.1f", "start": True, "end": True, "end_excl": False, "_y_label": False},
-    labels={"_y_label": "Task", "risorsa": "Risorsa", "progetto": "Progetto", "ore_tot": "Ore"},
-    color_discrete_sequence=PROJ_PALETTE,
+# Paginazione lato server: si ordinano le righe (etichette Y) e si invia al
+# browser solo la pagina corrente.
+gantt_rows = gantt_s.groupby("_y_label").agg(
+    progetto=("progetto", "first"), risorsa=("risorsa", "min"),
+    start=("start", "min"), end=("end", "max"), ore_tot=("ore_tot", "sum"),
 )
-fig_gantt_s.update_yaxes(autorange="reversed")
+g_sort, g_size, g_page = st.columns([2, 1, 1])
+sort_by   = g_sort.selectbox("Ordina per", list(GANTT_SORT), key="gantt_sort")
+page_size = g_size.selectbox("Righe per pagina", GANTT_PAGE_SIZES, index=1,
+                             key="gantt_page_size")
+n_pages = max(1, -(-len(gantt_rows) // page_size))
+if st.session_state.get("gantt_page", 1) > n_pages:
+    st.session_state["gantt_page"] = 1
+page = g_page.number_input("Pagina", min_value=1, max_value=n_pages, step=1,
+                           key="gantt_page")
+
+_sort_cols, _sort_asc = GANTT_SORT[sort_by]
+page_rows = (
+    gantt_rows.sort_values(_sort_cols, ascending=_sort_asc, kind="stable")
+    .index[(page - 1) * page_size: page * page_size]
+)
+gantt_p = gantt_s[gantt_s["_y_label"].isin(page_rows)]
+st.caption(
+    f"Righe {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_rows)} "
+    f"di {len(gantt_rows)} · {len(gantt_p)} barre"
+)
+
+# Colori stabili tra le pagine: stesso ordine progetti delle barre del team
+_proj_colors = {
+    prog: PROJ_PALETTE[i % len(PROJ_PALETTE)]
+    for i, prog in enumerate(sorted(dff["progetto"].unique()))
+}
+
+if len(gantt_p) <= GANTT_SVG_MAX_BARS:
+    fig_gantt_s = px.timeline(
+        gantt_p,
+        x_start="start", x_end="end_excl",
+        y="_y_label", color="progetto",
+        hover_name="task",
+        hover_data={"risorsa": True, "ore_tot": ":.1f", "start": True, "end": True, "end_excl": False, "_y_label": False},
+        labels={"_y_label": "Task", "risorsa": "Risorsa", "progetto": "Progetto", "ore_tot": "Ore"},
+        color_discrete_map=_proj_colors,
+    )
+else:
+    # WebGL: ogni barra è un segmento spesso (inizio, centro, fine, gap) di uno
+    # Scattergl per progetto; il punto centrale rende l'hover leggibile.
+    fig_gantt_s = go.Figure()
+    for prog, g in gantt_p.groupby("progetto", sort=True, observed=True):
+        _fmt   = "%Y-%m-%d %H:%M"
+        _start = g["start"].dt.strftime(_fmt).to_numpy(dtype=object)
+        _mid   = (g["start"] + (g["end_excl"] - g["start"]) / 2).dt.strftime(_fmt).to_numpy(dtype=object)
+        _end   = g["end_excl"].dt.strftime(_fmt).to_numpy(dtype=object)
+        _lbl   = g["_y_label"].to_numpy(dtype=object)
+        _none  = np.full(len(g), None, dtype=object)
+        _hover = (
+            "<b>" + g["task"].astype(str) + "</b><br>Risorsa: " + g["risorsa"].astype(str)
+            + "<br>Ore: " + g["ore_tot"].round(1).astype(str)
+            + "<br>" + g["start"].dt.strftime("%Y-%m-%d") + " → " + g["end"].dt.strftime("%Y-%m-%d")
+        ).to_numpy(dtype=object)
+        fig_gantt_s.add_trace(go.Scattergl(
+            x=np.column_stack([_start, _mid, _end, _none]).ravel(),
+            y=np.column_stack([_lbl, _lbl, _lbl, _none]).ravel(),
+            text=np.column_stack([_hover, _hover, _hover, _none]).ravel(),
+            mode="lines",
+            line=dict(width=18, color=_proj_colors.get(prog, PROJ_PALETTE[0])),
+            name=str(prog),
+            connectgaps=False,
+            hovertemplate="%{text}<extra>" + str(prog) + "</extra>",
+        ))
+fig_gantt_s.update_yaxes(autorange="reversed", categoryorder="array",
+                         categoryarray=list(page_rows), title_text="Task")
 fig_gantt_s.update_layout(
-    height=max(280, len(gantt_s) * 28 + 100),
+    height=max(280, len(page_rows) * 28 + 100),
     margin=MARGIN,
     legend=LEGEND,
     xaxis=XAXIS,
 )
 st.plotly_chart(fig_gantt_s, use_container_width=True)
 
+run_metrics.lap("render: gantt")
+
+prof.fase("render", "barre team")
 # ── Barre andamento giornaliero del team ──────────────────────────────────
 if is_internal:
     bar_title  = "Ore totali team per giorno"
     bar_ylabel = "Ore"
     team_daily_s = (
-        dff.groupby(["date", "progetto"])["ore"]
+        dff.groupby(["date", "progetto"], observed=True)["ore"]
         .sum().reset_index()
         .rename(columns={"ore": "_y"})
     )
@@ -515,13 +759,23 @@ else:
     bar_title  = "Task assegnati per giorno"
     bar_ylabel = "N° Task"
     team_daily_s = (
-        dff.groupby(["date", "progetto"])["task_id"]
+        dff.groupby(["date", "progetto"], observed=True)["task_id"]
         .nunique().reset_index()
         .rename(columns={"task_id": "_y"})
     )
     bar_hover_fmt = ".0f"
     bar_hover_suf = " task"
 
+if lod != "D":
+    # Media per giorno lavorativo del periodo: la soglia team resta confrontabile
+    _bdays = pd.Series(pd.bdate_range(x_min, x_max, freq="C", weekmask=WEEKMASK,
+                                     holidays=list(CALENDARS.holidays)))
+    _bdays_per_bucket = _lod_bucket(_bdays, lod).value_counts()
+    team_daily_s["date"] = _lod_bucket(team_daily_s["date"], lod)
+    team_daily_s = team_daily_s.groupby(["date", "progetto"], observed=True)["_y"].sum().reset_index()
+    team_daily_s["_y"] /= team_daily_s["date"].map(_bdays_per_bucket).fillna(1).clip(lower=1)
+    bar_title += f" (media giornaliera per {lod_name})"
+
 st.subheader(bar_title)
 
 palette = PROJ_PALETTE
@@ -535,8 +789,9 @@ for i, prog in enumerate(progetti_ordinati):
         y=df_p["_y"],
         name=prog,
         marker_color=palette[i % len(palette)],
+        customdata=_lod_labels(df_p["date"], lod),
         hovertemplate=(
-            "%{x|%d %b}<br>" + prog +
+            "%{customdata}<br>" + prog +
             ": %{y:" + bar_hover_fmt + "}" + bar_hover_suf + "<extra></extra>"
         ),
     ))
@@ -557,3 +812,179 @@ fig_bar_s.update_layout(
     xaxis=XAXIS,
 )
 st.plotly_chart(fig_bar_s, use_container_width=True)
+
+
+run_metrics.lap("render: barre team")
+
+prof.fase("aggregate", "conflitti")
+# ── Conflitti tra progetti ───────────────────────────────────────────────
+st.subheader("Conflitti tra progetti")
+overlap_index = get_overlap_index(st.session_state.get("source_key"), df_intervals, WEEKMASK,
+                                  CALENDARS)
+_res_scope  = sel_risorse if sel_risorse else all_risorse
+_proj_scope = sel_progetti if sel_progetti else all_progetti
+
+cf_sx, cf_dx = st.columns([1, 2])
+with cf_sx:
+    q_res = st.selectbox("Task attivi per risorsa", _res_scope, key="overlap_res")
+    q_df = overlap_index.query(q_res, d_from, d_to)
+    q_df = q_df[q_df["progetto"].isin(_proj_scope)]
+    st.caption(f"{len(q_df)} task tra {d_from:%d/%m/%Y} e {d_to:%d/%m/%Y}, "
+               f"{q_df['progetto'].nunique()} progetti")
+    st.dataframe(q_df, use_container_width=True, hide_index=True,
+                 column_config={
+                     "start":  st.column_config.DateColumn("Inizio", format="YYYY-MM-DD"),
+                     "end":    st.column_config.DateColumn("Fine", format="YYYY-MM-DD"),
+                     "ore_gg": st.column_config.NumberColumn("Ore/gg", format="%.1f"),
+                 })
+with cf_dx:
+    conflitti = overlap_index.conflicts(d_from, d_to, resources=_res_scope,
+                                        projects=_proj_scope)
+    st.caption(f"{len(conflitti)} sovrapposizioni tra task di progetti diversi, "
+               f"ordinate per ore sovrapposte (giorni × ore/gg delle due task)")
+    st.dataframe(conflitti.head(CONFLICTS_TOP_N), use_container_width=True, hide_index=True,
+                 column_config={
+                     "inizio_overlap": st.column_config.DateColumn("Inizio overlap", format="YYYY-MM-DD"),
+                     "fine_overlap":   st.column_config.DateColumn("Fine overlap", format="YYYY-MM-DD"),
+                     "ore_overlap":    st.column_config.NumberColumn("Ore sovrapposte", format="%.1f"),
+                 })
+
+
+run_metrics.lap("render: conflitti")
+
+prof.fase("schedule", "livellamento")
+# ── Livellamento carico ──────────────────────────────────────────────────
+st.subheader("Proposte di livellamento")
+st.caption(
+    "Ridistribuisce le ore in eccesso nella finestra del task (più lo slack) e "
+    "le riassegna a risorse dello stesso tipo libere. Per i fornitori sposta o "
+    "riassegna task interi. Le proposte non modificano i dati GanttPro."
+)
+lv_sx, lv_dx = st.columns([1, 3])
+slack_days = lv_sx.number_input("Slack oltre la fine task (giorni lav.)",
+                                min_value=0, max_value=60, value=0, step=1)
+levelling_key = (st.session_state.get("source_key"), cap_value, is_internal, slack_days,
+                 d_from, d_to, tuple(sel_risorse), tuple(sel_progetti))
+if lv_sx.button("Calcola proposte", use_container_width=True):
+    with st.spinner("Livellamento in corso..."):
+        st.session_state["levelling"] = (
+            levelling_key,
+            *level_resources(dff, cap_value, "ore" if is_internal else "task",
+                             slack_days=slack_days, weekmask=WEEKMASK,
+                             calendars=CALENDARS),
+        )
+
+if st.session_state.get("levelling", (None,))[0] == levelling_key:
+    _, proposte, residuo = st.session_state["levelling"]
+    with lv_dx:
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Modifiche proposte", len(proposte))
+        m2.metric("Celle in overload", f"{len(residuo)}",
+                  delta=f"{len(residuo) - int(overload_mask.sum())}", delta_color="inverse")
+        m3.metric("Ore spostate" if is_internal else "Ore dei task spostati",
+                  f"{proposte['ore'].sum():.0f} h")
+    if proposte.empty:
+        st.info("Nessuna modifica possibile con i vincoli correnti.")
+    else:
+        st.dataframe(
+            proposte, use_container_width=True, hide_index=True,
+            column_config={
+                "da_giorno": st.column_config.DateColumn("Da giorno", format="YYYY-MM-DD"),
+                "a_giorno":  st.column_config.DateColumn("A giorno", format="YYYY-MM-DD"),
+                "a_risorsa": st.column_config.TextColumn("A risorsa"),
+                "ore":       st.column_config.NumberColumn("Ore", format="%.2f"),
+            },
+        )
+        buffer = BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            proposte.to_excel(writer, index=False, sheet_name="Proposte")
+            residuo.to_excel(writer, index=False, sheet_name="Overload residuo")
+        st.download_button(
+            "Scarica proposte in Excel",
+            data=buffer.getvalue(),
+            file_name=f"proposte_livellamento_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+
+run_metrics.lap("render: livellamento")
+
+prof.fase("render", "storico")
+# ── Storico previsioni ───────────────────────────────────────────────────
+# Solo con i dati API: lo storico si riempie a ogni nuovo dataset (uno al giorno)
+if snapshot_file is None:
+    st.subheader("Storico previsioni")
+    history = get_history()
+    hist_source = HISTORY_SOURCE
+    n_snap = len(history.snapshots(hist_source))
+    if n_snap < 2:
+        st.info("Lo storico si costruisce un giorno alla volta: servono almeno "
+                "due snapshot per confrontare le previsioni.")
+    else:
+        st_sx, st_dx = st.columns([1, 2])
+        with st_sx:
+            h_res = st.selectbox("Risorsa", _res_scope, key="history_res")
+            h_week = st.date_input("Settimana", value=max(d_from, min(date.today(), d_to)),
+                                   key="history_week")
+            fh = history.forecast_history(h_res, h_week, source=hist_source)
+            st.caption(f"Ore previste per {h_res} nella settimana del "
+                       f"{pd.Timestamp(h_week).to_period('W-SUN').start_time:%d/%m/%Y} "
+                       f"secondo ciascuno degli {n_snap} snapshot")
+        fig_hist = go.Figure(go.Scatter(
+            x=fh["taken_on"], y=fh["ore"], mode="lines+markers",
+            line=dict(color=PROJ_PALETTE[1], shape="hv"),
+            hovertemplate="Snapshot %{x|%d/%m/%Y}<br>%{y:.1f} h<extra></extra>",
+        ))
+        fig_hist.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10),
+                               xaxis_title="Snapshot", yaxis_title="Ore previste")
+        st_dx.plotly_chart(fig_hist, use_container_width=True)
+
+        wow, snap_prec, snap_ultimo = history.week_over_week(
+            hist_source, weeks_from=d_from, weeks_to=d_to)
+        wow = wow[wow["risorsa"].isin(_res_scope) & (wow["delta"] != 0)]
+        wow = wow.reindex(wow["delta"].abs().sort_values(ascending=False).index)
+        st.caption(f"Variazioni settimanali tra lo snapshot del {snap_prec:%d/%m/%Y} "
+                   f"e quello del {snap_ultimo:%d/%m/%Y}")
+        st.dataframe(wow, use_container_width=True, hide_index=True,
+                     column_config={
+                         "settimana":  st.column_config.DateColumn("Settimana", format="YYYY-MM-DD"),
+                         "ore_prec":   st.column_config.NumberColumn("Ore (prec.)", format="%.1f"),
+                         "ore_ultimo": st.column_config.NumberColumn("Ore (ultimo)", format="%.1f"),
+                         "delta":      st.column_config.NumberColumn("Delta", format="%+.1f"),
+                     })
+run_metrics.lap("render: storico")
+
+
+prof.fase("render", "diagnostica")
+# ── Diagnostica (sidebar) ────────────────────────────────────────────────
+with st.sidebar:
+    with st.expander("Diagnostica"):
+        diag_records = []
+        for ws, refresher in refreshers.items():
+            fetch_metrics = refresher.metrics
+            if fetch_metrics is None:
+                continue
+            st.caption(f"Ultimo fetch {ws}" if len(refreshers) > 1 else "Ultimo fetch GanttPro")
+            st.dataframe(fetch_metrics.endpoints_frame(), hide_index=True,
+                         use_container_width=True)
+            diag_records += fetch_metrics.records(workspace=ws)
+
+        stage_metrics = [m for m in (
+            *(r.metrics for r in refreshers.values()),
+            st.session_state.get("expansion_metrics"), run_metrics) if m is not None]
+        st.caption("Fasi (secondi)")
+        st.dataframe(pd.concat([m.stages_frame() for m in stage_metrics], ignore_index=True),
+                     hide_index=True, use_container_width=True)
+        expansion_metrics = st.session_state.get("expansion_metrics")
+        if expansion_metrics is not None:
+            diag_records += expansion_metrics.records()
+        diag_records += run_metrics.records(righe_giornaliere=len(df))
+        st.download_button(
+            "Esporta metriche (JSONL)",
+            data=to_jsonl(diag_records),
+            file_name=f"ganttpro_metriche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+            mime="application/x-ndjson",
+            use_container_width=True,
+        )
+
+prof.chiudi()
@@ -0,0 +1,263 @@
+"""
+Storico del carico
+==================
+Ogni dataset GanttPro espanso viene accodato a un archivio SQLite locale,
+così si può vedere come è cambiata nel tempo la previsione di carico di una
+risorsa (progetti slittati, task riassegnati).
+
+Per ogni snapshot (uno al giorno: un nuovo refresh nello stesso giorno
+sostituisce il precedente) si salvano:
+
+- il modello a intervalli compatto (``assignments.build_intervals``);
+- le ore previste per risorsa e settimana, già aggregate dal frame
+  giornaliero, per le query "ore della risorsa R nella settimana W viste da
+  ciascuno snapshot".
+
+Testi ripetuti (risorse, progetti, task) sono codificati in un dizionario di
+interi; date e settimane sono numeri di giorno. Uno snapshot identico al
+precedente non duplica i dati: punta allo stesso dataset (impronta del
+contenuto). La retention tiene gli snapshot giornalieri recenti e uno per
+settimana fino a un anno.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+RETENTION_DAILY_DAYS = 90     # snapshot giornalieri conservati
+RETENTION_MAX_DAYS   = 365    # oltre: eliminati; in mezzo: uno per settimana
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dim (
+    id    INTEGER PRIMARY KEY,
+    kind  TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (kind, value)
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    data_id INTEGER PRIMARY KEY,
+    digest  TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    source   TEXT NOT NULL,
+    taken_on INTEGER NOT NULL,            -- giorno (giorni dal 1970-01-01)
+    data_id  INTEGER NOT NULL REFERENCES datasets(data_id),
+    PRIMARY KEY (source, taken_on)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS intervals (
+    data_id  INTEGER NOT NULL,
+    risorsa  INTEGER NOT NULL,
+    progetto INTEGER NOT NULL,
+    task     INTEGER NOT NULL,
+    task_id  INTEGER NOT NULL,
+    start    INTEGER NOT NULL,
+    end      INTEGER NOT NULL,
+    ore_tot  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_intervals ON intervals (data_id, risorsa);
+CREATE TABLE IF NOT EXISTS weekly (
+    data_id INTEGER NOT NULL,
+    risorsa INTEGER NOT NULL,
+    week    INTEGER NOT NULL,             -- lunedì della settimana (giorno)
+    ore     REAL NOT NULL,
+    PRIMARY KEY (risorsa, week, data_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_weekly ON weekly (data_id);
+"""
+
+
+def _day(d) -> int:
+    return int(np.datetime64(pd.Timestamp(d).date(), "D").astype(np.int64))
+
+
+def _from_day(n) -> pd.Series:
+    return pd.to_datetime(pd.Series(n, dtype="int64"), unit="D")
+
+
+class HistoryStore:
+    """Archivio SQLite degli snapshot di carico."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connessione con commit a fine blocco (rollback se errore) e chiusura."""
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ── Dizionario ────────────────────────────────────────────────────────────
+    def _codes(self, con, kind: str, values: pd.Series) -> np.ndarray:
+        """Valori testuali → id interi del dizionario (inserendo i nuovi)."""
+        codes, uniques = pd.factorize(values.astype(str))
+        uniques = list(uniques)
+        con.executemany("INSERT OR IGNORE INTO dim (kind, value) VALUES (?, ?)",
+                        [(kind, u) for u in uniques])
+        ids = dict(con.execute("SELECT value, id FROM dim WHERE kind = ?", (kind,)).fetchall())
+        return np.array([ids[u] for u in uniques], dtype=np.int64)[codes] if uniques else codes
+
+    def _dim_id(self, con, kind: str, value: str):
+        row = con.execute("SELECT id FROM dim WHERE kind = ? AND value = ?",
+                          (kind, str(value))).fetchone()
+        return row[0] if row else None
+
+    # ── Scrittura ─────────────────────────────────────────────────────────────
+    def append(self, intervals: pd.DataFrame, daily: pd.DataFrame,
+               source: str = "ganttpro", taken_on=None) -> int:
+        """
+        Accoda lo snapshot del giorno ``taken_on`` (default: oggi) per ``source``.
+        Restituisce l'id del dataset salvato (riusato se il contenuto non cambia).
+        """
+        taken = _day(taken_on or date.today())
+        week = daily["date"].dt.to_period("W-SUN").dt.start_time
+        weekly = (daily.assign(_w=week)
+                  .groupby(["risorsa", "_w"], observed=True)["ore"].sum()
+                  .reset_index())
+
+        h = hashlib.sha1()
+        h.update(pd.util.hash_pandas_object(
+            intervals.astype({c: str for c in ["risorsa", "progetto", "task", "task_id"]}),
+            index=False).to_numpy().tobytes())
+        h.update(pd.util.hash_pandas_object(weekly.astype({"risorsa": str}),
+                                            index=False).to_numpy().tobytes())
+        digest = h.hexdigest()
+
+        with self._connect() as con:
+            row = con.execute("SELECT data_id FROM datasets WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                data_id = row[0]
+            else:
+                data_id = con.execute("INSERT INTO datasets (digest) VALUES (?)",
+                                      (digest,)).lastrowid
+                iv = pd.DataFrame({
+                    "risorsa":  self._codes(con, "risorsa", intervals["risorsa"]),
+                    "progetto": self._codes(con, "progetto", intervals["progetto"]),
+                    "task":     self._codes(con, "task", intervals["task"]),
+                    "task_id":  self._codes(con, "task_id", intervals["task_id"]),
+                    "start":    intervals["start"].to_numpy().astype("datetime64[D]").astype(np.int64),
+                    "end":      intervals["end"].to_numpy().astype("datetime64[D]").astype(np.int64),
+                    "ore_tot":  intervals["ore_tot"].to_numpy(dtype=np.float64).round(3),
+                })
+                con.executemany(
+                    "INSERT INTO intervals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((data_id, *r) for r in iv.itertuples(index=False, name=None)))
+                wk = zip(self._codes(con, "risorsa", weekly["risorsa"]).tolist(),
+                         weekly["_w"].to_numpy().astype("datetime64[D]").astype(np.int64).tolist(),
+                         weekly["ore"].to_numpy(dtype=np.float64).round(2).tolist())
+                con.executemany("INSERT INTO weekly VALUES (?, ?, ?, ?)",
+                                ((data_id, r, w, o) for r, w, o in wk))
+            con.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                        (source, taken, data_id))
+        return data_id
+
+    def apply_retention(self, today=None, daily_days: int = RETENTION_DAILY_DAYS,
+                        max_days: int = RETENTION_MAX_DAYS) -> int:
+        """
+        Elimina gli snapshot oltre ``max_days`` e, tra ``daily_days`` e
+        ``max_days``, tiene solo il primo di ogni settimana. Restituisce il
+        numero di snapshot eliminati.
+        """
+        t = _day(today or date.today())
+        with self._connect() as con:
+            n = con.execute("DELETE FROM snapshots WHERE taken_on < ?", (t - max_days,)).rowcount
+            # 1970-01-01 era giovedì: (giorno + 3) // 7 numera le settimane lun-dom
+            n += con.execute("""
+                DELETE FROM snapshots WHERE taken_on < ? AND EXISTS (
+                    SELECT 1 FROM snapshots s2
+                    WHERE s2.source = snapshots.source
+                      AND (s2.taken_on + 3) / 7 = (snapshots.taken_on + 3) / 7
+                      AND s2.taken_on < snapshots.taken_on)
+            """, (t - daily_days,)).rowcount
+            con.execute("DELETE FROM datasets WHERE data_id NOT IN (SELECT data_id FROM snapshots)")
+            con.execute("DELETE FROM intervals WHERE data_id NOT IN (SELECT data_id FROM datasets)")
+            con.execute("DELETE FROM weekly WHERE data_id NOT IN (SELECT data_id FROM datasets)")
+        if n:
+            with self._connect() as con:
+                con.isolation_level = None          # VACUUM fuori transazione
+                con.execute("VACUUM")
+        return n
+
+    # ── Lettura ───────────────────────────────────────────────────────────────
+    def snapshots(self, source: str | None = None) -> pd.DataFrame:
+        """Elenco snapshot (source, taken_on, data_id), dal più recente."""
+        with self._connect() as con:
+            out = pd.read_sql_query(
+                "SELECT source, taken_on, data_id FROM snapshots "
+                "WHERE ? IS NULL OR source = ? ORDER BY taken_on DESC",
+                con, params=(source, source))
+        out["taken_on"] = _from_day(out["taken_on"])
+        return out
+
+    def resources(self) -> list[str]:
+        with self._connect() as con:
+            rows = con.execute("SELECT value FROM dim WHERE kind = 'risorsa' ORDER BY value")
+            return [r[0] for r in rows]
+
+    def forecast_history(self, risorsa: str, week, source: str | None = None) -> pd.DataFrame:
+        """Ore previste per ``risorsa`` nella settimana di ``week`` viste da ogni snapshot."""
+        w = _day(pd.Timestamp(week).to_period("W-SUN").start_time)
+        with self._connect() as con:
+            rid = self._dim_id(con, "risorsa", risorsa)
+            out = pd.read_sql_query("""
+                SELECT s.source, s.taken_on, COALESCE(w.ore, 0) AS ore
+                FROM snapshots s
+                LEFT JOIN weekly w ON w.data_id = s.data_id AND w.risorsa = ? AND w.week = ?
+                WHERE ? IS NULL OR s.source = ?
+                ORDER BY s.taken_on
+            """, con, params=(rid if rid is not None else -1, w, source, source))
+        out["taken_on"] = _from_day(out["taken_on"])
+        return out
+
+    def week_over_week(self, source: str, lag_days: int = 7,
+                       weeks_from=None, weeks_to=None):
+        """
+        Confronto tra l'ultimo snapshot e quello di circa ``lag_days`` giorni
+        prima (il più recente non successivo): ore per risorsa e settimana nei
+        due snapshot e differenza.
+
+        Restituisce (confronto, data snapshot precedente, data ultimo snapshot);
+        le date sono None se lo storico ha meno di due snapshot.
+        """
+        snaps = self.snapshots(source)
+        cols = ["risorsa", "settimana", "ore_prec", "ore_ultimo", "delta"]
+        if len(snaps) < 2:
+            return pd.DataFrame(columns=cols), None, None
+        last = snaps.iloc[0]
+        older = snaps[snaps["taken_on"] <= last["taken_on"] - timedelta(days=lag_days)]
+        prev = older.iloc[0] if len(older) else snaps.iloc[1]
+
+        # le settimane sono salvate col lunedì: quella che contiene weeks_from parte prima
+        w0 = _day(pd.Timestamp(weeks_from).to_period("W-SUN").start_time) \
+            if weeks_from is not None else -(1 << 40)
+        w1 = _day(weeks_to) if weeks_to is not None else 1 << 40
+        with self._connect() as con:
+            rows = pd.read_sql_query("""
+                SELECT d.value AS risorsa, w.week, w.data_id, w.ore
+                FROM weekly w JOIN dim d ON d.id = w.risorsa
+                WHERE w.data_id IN (?, ?) AND w.week BETWEEN ? AND ?
+            """, con, params=(int(prev["data_id"]), int(last["data_id"]), w0, w1))
+        if rows.empty:
+            return pd.DataFrame(columns=cols), prev["taken_on"], last["taken_on"]
+        piv = rows.pivot_table(index=["risorsa", "week"], columns="data_id",
+                               values="ore", aggfunc="sum", fill_value=0)
+        out = pd.DataFrame({
+            "ore_prec":   piv.get(int(prev["data_id"]), 0),
+            "ore_ultimo": piv.get(int(last["data_id"]), 0),
+        }).reset_index()
+        out["settimana"] = _from_day(out["week"])
+        out["delta"] = (out["ore_ultimo"] - out["ore_prec"]).round(2)
+        out = out[cols].sort_values(["risorsa", "settimana"]).reset_index(drop=True)
+        return out, prev["taken_on"], last["taken_on"]
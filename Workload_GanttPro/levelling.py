@@ -0,0 +1,244 @@
+"""
+Livellamento del carico (load levelling)
+========================================
+Propone come rientrare nella soglia per le risorse in overload:
+
+- modalità "ore" (risorse interne, soglia ``daily_cap``): le ore in eccesso di
+  un giorno vengono ridistribuite sugli altri giorni del task con capacità
+  libera (più ``slack_days`` giorni lavorativi oltre la fine) e, se non basta,
+  riassegnate a risorse dello stesso ``tipo_risorsa`` libere quel giorno;
+- modalità "task" (fornitori, soglia ``proj_cap``): un task viene fatto
+  slittare in avanti entro lo slack oppure riassegnato per intero a una
+  risorsa dello stesso tipo che lo può assorbire, sempre su giorni
+  lavorativi del calendario della risorsa di arrivo.
+
+Il carico è una matrice risorse × giorni (numpy); le celle in overload sono
+gestite con una coda di priorità, dalla più critica. Nulla viene modificato:
+il risultato è l'elenco delle modifiche proposte.
+"""
+
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from calendars import CalendarEngine, is_busday_by
+
+EPS = 1e-6
+
+PROPOSAL_COLS = ["azione", "progetto", "task", "task_id", "risorsa",
+                 "da_giorno", "a_risorsa", "a_giorno", "ore"]
+
+
+def _day_axis(dates: np.ndarray, cal: np.busdaycalendar, slack_days: int) -> np.ndarray:
+    """Giorni lavorativi dal primo all'ultimo giorno (+ slack), più eventuali
+    giorni non lavorativi presenti nel frame (task solo nel weekend)."""
+    d_min, d_max = dates.min(), dates.max()
+    d_end = np.busday_offset(d_max, slack_days, roll="forward", busdaycal=cal)
+    bdays = np.arange(d_min, d_end + 1, dtype="datetime64[D]")
+    bdays = bdays[np.is_busday(bdays, busdaycal=cal)]
+    return np.union1d(bdays, dates)
+
+
+def _fill(free: np.ndarray, amount: float) -> np.ndarray:
+    """Ripartisce ``amount`` sulle posizioni di ``free`` partendo dalla più libera."""
+    order = np.argsort(-free, kind="stable")
+    f = free[order]
+    alloc_sorted = np.clip(amount - (np.cumsum(f) - f), 0, f)
+    alloc = np.empty_like(free)
+    alloc[order] = alloc_sorted
+    return alloc
+
+
+def level_resources(daily: pd.DataFrame, cap: float, mode: str = "ore",
+                    slack_days: int = 0,
+                    weekmask: str = "Mon Tue Wed Thu Fri",
+                    calendars: CalendarEngine | None = None):
+    """
+    Calcola le proposte di livellamento sul frame giornaliero ``daily``
+    (colonne di ``assignments.DAILY_COLS``). Con ``calendars`` le ore non
+    vengono mai spostate su festività, chiusure o assenze della risorsa.
+
+    Restituisce (proposte, residuo):
+        proposte: una riga per spostamento, colonne PROPOSAL_COLS
+        residuo:  celle ancora oltre soglia (risorsa, date, carico, soglia)
+    """
+    if daily.empty:
+        return (pd.DataFrame(columns=PROPOSAL_COLS),
+                pd.DataFrame(columns=["risorsa", "date", "carico", "soglia"]))
+
+    # ── Codifica intera di risorse, giorni e assegnazioni (task × risorsa) ──
+    calendars = calendars or CalendarEngine(weekmask)
+    r_idx, r_ids = pd.factorize(daily["resource_id"].astype(str))
+    dates = daily["date"].to_numpy().astype("datetime64[D]")
+    axis = _day_axis(np.unique(dates), calendars.busdaycal(), slack_days)
+    d_idx = np.searchsorted(axis, dates)
+    a_idx, _ = pd.factorize(pd.MultiIndex.from_arrays(
+        [daily["task_id"].astype(str), r_idx]))
+    n_r, n_d, n_a = len(r_ids), len(axis), a_idx.max() + 1
+
+    first = daily.drop_duplicates("resource_id")
+    r_name = first.set_index(first["resource_id"].astype(str))["risorsa"].astype(str).reindex(r_ids).to_numpy()
+    r_type = first.set_index(first["resource_id"].astype(str))["tipo_risorsa"].astype(str).reindex(r_ids).to_numpy()
+    same_type = {t: np.flatnonzero(r_type == t) for t in np.unique(r_type)}
+
+    # Giorni disponibili per risorsa (calendario personale)
+    codes, cals = calendars.resource_calendars(r_name)
+    avail = is_busday_by(np.tile(axis, n_r), np.repeat(codes, n_d), cals).reshape(n_r, n_d)
+
+    a_first = np.full(n_a, n_d, dtype=np.int64)
+    a_last  = np.zeros(n_a, dtype=np.int64)
+    np.minimum.at(a_first, a_idx, d_idx)
+    np.maximum.at(a_last, a_idx, d_idx)
+
+    # Giorni effettivi di ogni assegnazione (con il numero di righe per giorno):
+    # in modalità task si sposta solo il carico di questi giorni
+    a_order = np.argsort(a_idx, kind="stable")
+    a_bounds = np.searchsorted(a_idx[a_order], np.arange(n_a + 1))
+
+    def _occupied(a) -> tuple[np.ndarray, np.ndarray]:
+        return np.unique(d_idx[a_order[a_bounds[a]:a_bounds[a + 1]]], return_counts=True)
+
+    hours = daily["ore"].to_numpy(dtype=np.float64).copy()
+    weight = hours if mode == "ore" else np.ones(len(daily))
+
+    load = np.zeros((n_r, n_d))
+    np.add.at(load, (r_idx, d_idx), weight)
+
+    # Righe ordinate per cella (risorsa, giorno) → ricerca candidati in O(log n)
+    cell_key = r_idx.astype(np.int64) * n_d + d_idx
+    by_cell = np.argsort(cell_key, kind="stable")
+    sorted_keys = cell_key[by_cell]
+
+    moves: list[tuple] = []
+    moved = np.zeros(n_a, dtype=bool)
+
+    def _log(kind, row, r_to, d_from, d_to, amount):
+        moves.append((kind, int(row), int(r_to), int(d_from), int(d_to), float(amount)))
+
+    heap = [(-(load[r, d] - cap), int(r), int(d)) for r, d in zip(*np.nonzero(load > cap + EPS))]
+    heapq.heapify(heap)
+
+    while heap:
+        _, r, d = heapq.heappop(heap)
+        excess = load[r, d] - cap
+        if excess <= EPS:
+            continue
+        lo, hi = np.searchsorted(sorted_keys, [r * n_d + d, r * n_d + d + 1])
+        rows = by_cell[lo:hi]
+        rows = rows[~moved[a_idx[rows]]]
+        # Prima i task con la finestra più ampia (più flessibili)
+        span = a_last[a_idx[rows]] - a_first[a_idx[rows]]
+        rows = rows[np.argsort(-span, kind="stable")] if mode == "ore" else rows[np.argsort(span, kind="stable")]
+        peers = same_type[r_type[r]]
+        peers = peers[peers != r]
+
+        if mode == "ore":
+            # 1) ridistribuzione nella finestra del task (+ slack)
+            for row in rows:
+                if excess <= EPS:
+                    break
+                a = a_idx[row]
+                window = np.arange(a_first[a], min(a_last[a] + slack_days, n_d - 1) + 1)
+                free = np.clip(cap - load[r, window], 0, None) * avail[r, window]
+                free[window == d] = 0
+                take = min(excess, hours[row], free.sum())
+                if take <= EPS:
+                    continue
+                alloc = _fill(free, take)
+                load[r, window] += alloc
+                load[r, d] -= take
+                hours[row] -= take
+                excess -= take
+                for d_to, amount in zip(window[alloc > EPS], alloc[alloc > EPS]):
+                    _log("Ridistribuzione" if d_to <= a_last[a] else "Slittamento",
+                         row, r, d, d_to, amount)
+
+            # 2) riassegnazione a risorse dello stesso tipo libere quel giorno
+            for row in rows:
+                if excess <= EPS or len(peers) == 0:
+                    break
+                free = np.clip(cap - load[peers, d], 0, None) * avail[peers, d]
+                take = min(excess, hours[row], free.sum())
+                if take <= EPS:
+                    continue
+                alloc = _fill(free, take)
+                load[peers, d] += alloc
+                load[r, d] -= take
+                hours[row] -= take
+                excess -= take
+                for r_to, amount in zip(peers[alloc > EPS], alloc[alloc > EPS]):
+                    _log("Riassegnazione", row, r_to, d, d, amount)
+        else:
+            # Modalità task: si sposta l'intera assegnazione, dalla più corta,
+            # solo su giorni disponibili nel calendario della risorsa di arrivo
+            for row in rows:
+                if excess <= EPS:
+                    break
+                a = a_idx[row]
+                s = a_first[a]
+                days, count = _occupied(a)
+                done = False
+                # 1) slittamento minimo che libera il giorno d, entro lo slack
+                for k in range(d - s + 1, slack_days + 1):
+                    new = days + k
+                    if new[-1] >= n_d:
+                        break
+                    if not avail[r, new].all():
+                        continue
+                    delta = np.zeros(n_d)
+                    np.add.at(delta, new, count)
+                    np.subtract.at(delta, days, count)
+                    up = delta > 0
+                    if np.all(load[r, up] + delta[up] <= cap + EPS):
+                        load[r] += delta
+                        _log("Slittamento", row, r, s, s + k, 0.0)
+                        done = True
+                        break
+                # 2) riassegnazione alla risorsa dello stesso tipo più scarica
+                if not done and len(peers):
+                    peak = (load[np.ix_(peers, days)] + count).max(axis=1)
+                    peak[~avail[np.ix_(peers, days)].all(axis=1)] = np.inf
+                    best = np.argmin(peak)
+                    if peak[best] <= cap + EPS:
+                        load[r, days] -= count
+                        load[peers[best], days] += count
+                        _log("Riassegnazione", row, peers[best], s, s, 0.0)
+                        done = True
+                if done:
+                    moved[a] = True
+                    excess = load[r, d] - cap
+
+    # ── Output ─────────────────────────────────────────────────────────────────
+    if moves:
+        mv = np.array(moves, dtype=object)
+        rows = mv[:, 1].astype(np.int64)
+        src = daily.iloc[rows]
+        proposals = pd.DataFrame({
+            "azione":    mv[:, 0],
+            "progetto":  src["progetto"].astype(str).to_numpy(),
+            "task":      src["task"].astype(str).to_numpy(),
+            "task_id":   src["task_id"].astype(str).to_numpy(),
+            "risorsa":   r_name[r_idx[rows]],
+            "da_giorno": pd.to_datetime(axis[mv[:, 3].astype(np.int64)]),
+            "a_risorsa": r_name[mv[:, 2].astype(np.int64)],
+            "a_giorno":  pd.to_datetime(axis[mv[:, 4].astype(np.int64)]),
+            "ore":       mv[:, 5].astype(np.float64).round(3),
+        })
+        if mode != "ore":
+            # Spostamento dell'intera assegnazione: ore totali del task
+            tot = pd.Series(daily["ore"].to_numpy(dtype=np.float64)).groupby(a_idx).sum()
+            proposals["ore"] = tot.reindex(a_idx[rows]).to_numpy().round(3)
+    else:
+        proposals = pd.DataFrame(columns=PROPOSAL_COLS)
+
+    r_res, d_res = np.nonzero(load > cap + EPS)
+    residual = pd.DataFrame({
+        "risorsa": r_name[r_res],
+        "date":    pd.to_datetime(axis[d_res]),
+        "carico":  load[r_res, d_res].round(3),
+        "soglia":  cap,
+    }).sort_values(["risorsa", "date"]).reset_index(drop=True)
+    return proposals, residual
@@ -0,0 +1,147 @@
+"""
+Metriche di diagnostica
+=======================
+Contatori per endpoint GanttPro (chiamate, errori, latenza, dimensione delle
+risposte, istogramma delle latenze) e tempi delle fasi dell'app (fetch,
+espansione, sezioni della pagina). Thread-safe: il client gira nel thread
+del refresher mentre l'app legge i valori.
+
+Le metriche si esportano in JSON lines (una riga per endpoint e per fase)
+per confrontare le prestazioni tra versioni e nel tempo.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# Limiti superiori (ms) dei bucket dell'istogramma latenze; l'ultimo è aperto
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _bucket_label(i: int) -> str:
+    if i < len(LATENCY_BUCKETS_MS):
+        return f"<={LATENCY_BUCKETS_MS[i]}ms"
+    return f">{LATENCY_BUCKETS_MS[-1]}ms"
+
+
+class Metrics:
+    """Raccolta di metriche per endpoint e per fase."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict] = {}
+        self._stages: dict[str, dict] = {}
+        self._lap = time.perf_counter()
+        self.started_at = datetime.now()
+
+    # ── Endpoint ──────────────────────────────────────────────────────────────
+    def record_call(self, endpoint: str, seconds: float, nbytes: int = 0,
+                    error: bool = False):
+        ms = seconds * 1000
+        b = next((i for i, lim in enumerate(LATENCY_BUCKETS_MS) if ms <= lim),
+                 len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            e = self._endpoints.setdefault(endpoint, {
+                "chiamate": 0, "errori": 0, "ms_tot": 0.0, "ms_max": 0.0,
+                "bytes_tot": 0, "hist": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            })
+            e["chiamate"] += 1
+            e["errori"]   += int(error)
+            e["ms_tot"]   += ms
+            e["ms_max"]    = max(e["ms_max"], ms)
+            e["bytes_tot"] += nbytes
+            e["hist"][b]  += 1
+
+    def endpoints_frame(self) -> pd.DataFrame:
+        """Una riga per endpoint: chiamate, errori, latenza media/max/p95, KB."""
+        with self._lock:
+            items = [(k, dict(v, hist=list(v["hist"]))) for k, v in self._endpoints.items()]
+        rows = []
+        for name, e in sorted(items):
+            n = e["chiamate"]
+            rows.append({
+                "endpoint":  name,
+                "chiamate":  n,
+                "errori":    e["errori"],
+                "ms_medio":  round(e["ms_tot"] / n, 1) if n else 0.0,
+                "ms_p95":    self._p95(e["hist"], e["ms_max"]),
+                "ms_max":    round(e["ms_max"], 1),
+                "kb_totali": round(e["bytes_tot"] / 1024, 1),
+                "s_totali":  round(e["ms_tot"] / 1000, 2),
+            })
+        return pd.DataFrame(rows, columns=["endpoint", "chiamate", "errori", "ms_medio",
+                                           "ms_p95", "ms_max", "kb_totali", "s_totali"])
+
+    @staticmethod
+    def _p95(hist: list[int], ms_max: float) -> float:
+        """95° percentile stimato dall'istogramma (limite superiore del bucket)."""
+        n = sum(hist)
+        if not n:
+            return 0.0
+        target, acc = 0.95 * n, 0
+        for i, c in enumerate(hist):
+            acc += c
+            if acc >= target:
+                return float(min(LATENCY_BUCKETS_MS[i], ms_max)) if i < len(LATENCY_BUCKETS_MS) \
+                    else round(ms_max, 1)
+        return round(ms_max, 1)
+
+    # ── Fasi ──────────────────────────────────────────────────────────────────
+    def record_stage(self, name: str, seconds: float):
+        with self._lock:
+            s = self._stages.setdefault(name, {"volte": 0, "s_tot": 0.0, "s_ultimo": 0.0})
+            s["volte"]   += 1
+            s["s_tot"]   += seconds
+            s["s_ultimo"] = seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Misura la durata del blocco come fase ``name``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - t0)
+
+    def lap(self, name: str):
+        """Registra come fase ``name`` il tempo dall'ultimo ``lap`` (o dalla creazione).
+        Comodo per misurare sezioni consecutive di uno script Streamlit."""
+        now = time.perf_counter()
+        self.record_stage(name, now - self._lap)
+        self._lap = now
+
+    def stages_frame(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"fase": k, "volte": v["volte"], "s_ultimo": round(v["s_ultimo"], 3),
+                     "s_totali": round(v["s_tot"], 3)} for k, v in self._stages.items()]
+        return pd.DataFrame(rows, columns=["fase", "volte", "s_ultimo", "s_totali"])
+
+    # ── Export ────────────────────────────────────────────────────────────────
+    def records(self, **context) -> list[dict]:
+        """Record esportabili (endpoint e fasi) con il contesto indicato."""
+        ts = datetime.now().isoformat(timespec="seconds")
+        base = {"ts": ts, "started_at": self.started_at.isoformat(timespec="seconds"), **context}
+        with self._lock:
+            endpoints = {k: dict(v, hist=list(v["hist"])) for k, v in self._endpoints.items()}
+            stages = {k: dict(v) for k, v in self._stages.items()}
+        out = []
+        for name, e in sorted(endpoints.items()):
+            out.append({**base, "kind": "endpoint", "endpoint": name,
+                        "chiamate": e["chiamate"], "errori": e["errori"],
+                        "ms_tot": round(e["ms_tot"], 1), "ms_max": round(e["ms_max"], 1),
+                        "bytes_tot": e["bytes_tot"],
+                        "hist": {_bucket_label(i): c for i, c in enumerate(e["hist"])}})
+        for name, s in stages.items():
+            out.append({**base, "kind": "stage", "fase": name, "volte": s["volte"],
+                        "s_ultimo": round(s["s_ultimo"], 4), "s_tot": round(s["s_tot"], 4)})
+        return out
+
+
+def to_jsonl(records: list[dict]) -> str:
+    return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
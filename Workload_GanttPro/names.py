@@ -0,0 +1,17 @@
+"""
+Nomi delle risorse
+==================
+Normalizzazione dei nomi usata sia per riconoscere la stessa risorsa in più
+workspace sia per associare i calendari per risorsa della configurazione.
+"""
+
+from __future__ import annotations
+
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """Minuscole, senza accenti né spazi doppi: "  Rossi  Nicolò" → "rossi nicolo"."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
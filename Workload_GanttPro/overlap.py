@@ -0,0 +1,178 @@
+"""
+Indice degli overlap tra progetti
+=================================
+Per ogni risorsa gli intervalli task (start/end dal modello a intervalli di
+``assignments.build_intervals``) sono indicizzati in un interval tree
+implicito: array ordinati per inizio con il massimo "end" del sottoalbero
+memorizzato nei nodi interni (schema di cgranges/IITree). Una query
+"quali task si sovrappongono alla finestra W per la risorsa R" costa
+O(log n + k) invece di filtrare il frame giornaliero espanso.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from calendars import CalendarEngine, busday_count_by
+
+CONFLICT_COLS = ["risorsa", "progetto_a", "task_a", "progetto_b", "task_b",
+                 "inizio_overlap", "fine_overlap", "giorni_overlap", "ore_overlap"]
+
+
+class _ImplicitIntervalTree:
+    """Interval tree implicito su intervalli semiaperti [start, end) interi."""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        order = np.argsort(starts, kind="stable")
+        self.order = order
+        self.st = starts[order].tolist()
+        self.en = ends[order].tolist()
+        n = len(self.st)
+        mx = list(self.en)
+
+        # Costruzione bottom-up dei massimi (livello 0 = nodi pari = foglie)
+        last_i, last, k = 0, 0, 1
+        for i in range(0, n, 2):
+            last_i, last = i, self.en[i]
+        while (1 << k) <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                el = mx[i - x]
+                er = mx[i + x] if i + x < n else last
+                mx[i] = max(self.en[i], el, er)
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and mx[last_i] > last:
+                last = mx[last_i]
+            k += 1
+        self.mx = mx
+        self.max_level = k - 1
+        self.n = n
+
+    def query(self, start: int, end: int) -> list[int]:
+        """Posizioni (nell'ordine originale) degli intervalli che intersecano [start, end)."""
+        st, en, mx, n = self.st, self.en, self.mx, self.n
+        out: list[int] = []
+        if n == 0:
+            return out
+        stack = [(self.max_level, (1 << self.max_level) - 1, 0)]
+        while stack:
+            k, x, w = stack.pop()
+            if k <= 3:
+                # Sottoalbero piccolo: scansione lineare
+                i0 = x >> k << k
+                i1 = min(i0 + (1 << (k + 1)) - 1, n)
+                i = i0
+                while i < i1 and st[i] < end:
+                    if start < en[i]:
+                        out.append(i)
+                    i += 1
+            elif w == 0:
+                y = x - (1 << (k - 1))
+                stack.append((k, x, 1))
+                if y >= n or mx[y] > start:
+                    stack.append((k - 1, y, 0))
+            elif x < n and st[x] < end:
+                if start < en[x]:
+                    out.append(x)
+                stack.append((k - 1, x + (1 << (k - 1)), 0))
+        return self.order[out].tolist()
+
+
+class OverlapIndex:
+    """Interval tree per risorsa costruito sul modello a intervalli."""
+
+    def __init__(self, intervals: pd.DataFrame, weekmask: str = "Mon Tue Wed Thu Fri",
+                 calendars: CalendarEngine | None = None):
+        self.weekmask = weekmask
+        iv = intervals.reset_index(drop=True)
+        self.calendars = calendars or CalendarEngine(weekmask)
+        self.risorsa  = iv["risorsa"].astype(str).to_numpy()
+        self.progetto = iv["progetto"].astype(str).to_numpy()
+        self.task     = iv["task"].astype(str).to_numpy()
+        self.start    = iv["start"].to_numpy().astype("datetime64[D]")
+        self.end      = iv["end"].to_numpy().astype("datetime64[D]")
+        # Calendario (festività, part-time, assenze) di ogni intervallo
+        self.cal_codes, self.cals = self.calendars.resource_calendars(iv["risorsa"])
+        n_bdays = busday_count_by(self.start, self.end + 1, self.cal_codes, self.cals)
+        self.ore_day = iv["ore_tot"].to_numpy(dtype=np.float64) / np.maximum(n_bdays, 1)
+
+        day0 = self.start.astype(np.int64)
+        day1 = self.end.astype(np.int64) + 1              # fine esclusa
+        self._trees: dict[str, tuple[np.ndarray, _ImplicitIntervalTree]] = {}
+        for res, rows in pd.Series(np.arange(len(iv))).groupby(self.risorsa):
+            rows = rows.to_numpy()
+            self._trees[res] = (rows, _ImplicitIntervalTree(day0[rows], day1[rows]))
+
+    @property
+    def resources(self) -> list[str]:
+        return sorted(self._trees)
+
+    def _rows(self, resource: str, w_start, w_end) -> np.ndarray:
+        if resource not in self._trees:
+            return np.empty(0, dtype=np.int64)
+        rows, tree = self._trees[resource]
+        a = np.datetime64(pd.Timestamp(w_start).date(), "D").astype(np.int64)
+        b = np.datetime64(pd.Timestamp(w_end).date(), "D").astype(np.int64) + 1
+        return rows[tree.query(int(a), int(b))]
+
+    def query(self, resource: str, w_start, w_end) -> pd.DataFrame:
+        """Task della risorsa che intersecano la finestra [w_start, w_end]."""
+        rows = self._rows(resource, w_start, w_end)
+        return pd.DataFrame({
+            "progetto": self.progetto[rows],
+            "task":     self.task[rows],
+            "start":    pd.to_datetime(self.start[rows]),
+            "end":      pd.to_datetime(self.end[rows]),
+            "ore_gg":   self.ore_day[rows].round(2),
+        }).sort_values(["start", "progetto"]).reset_index(drop=True)
+
+    def conflicts(self, w_start, w_end, resources=None, projects=None) -> pd.DataFrame:
+        """
+        Coppie di task di progetti diversi sovrapposti sulla stessa risorsa
+        nella finestra, ordinate per ore sovrapposte (giorni × ore/giorno delle
+        due task) decrescenti.
+        """
+        w0 = np.datetime64(pd.Timestamp(w_start).date(), "D")
+        w1 = np.datetime64(pd.Timestamp(w_end).date(), "D")
+        proj_ok = None if projects is None else np.isin(self.progetto, list(projects))
+
+        pair_a: list[int] = []
+        pair_b: list[int] = []
+        for res in (self.resources if resources is None else resources):
+            rows = self._rows(res, w0, w1)
+            if proj_ok is not None:
+                rows = rows[proj_ok[rows]]
+            if len(rows) < 2:
+                continue
+            _, tree = self._trees[res]
+            allowed = set(rows.tolist())
+            for i in rows:
+                s = max(self.start[i], w0).astype(np.int64)
+                e = min(self.end[i], w1).astype(np.int64) + 1
+                for j in self._trees[res][0][tree.query(int(s), int(e))]:
+                    if j > i and j in allowed and self.progetto[j] != self.progetto[i]:
+                        pair_a.append(i)
+                        pair_b.append(j)
+
+        if not pair_a:
+            return pd.DataFrame(columns=CONFLICT_COLS)
+        a = np.array(pair_a)
+        b = np.array(pair_b)
+        o0 = np.maximum(np.maximum(self.start[a], self.start[b]), w0)
+        o1 = np.minimum(np.minimum(self.end[a], self.end[b]), w1)
+        days = busday_count_by(o0, o1 + 1, self.cal_codes[a], self.cals)
+        out = pd.DataFrame({
+            "risorsa":        self.risorsa[a],
+            "progetto_a":     self.progetto[a],
+            "task_a":         self.task[a],
+            "progetto_b":     self.progetto[b],
+            "task_b":         self.task[b],
+            "inizio_overlap": pd.to_datetime(o0),
+            "fine_overlap":   pd.to_datetime(o1),
+            "giorni_overlap": days,
+            "ore_overlap":    (days * (self.ore_day[a] + self.ore_day[b])).round(1),
+        })
+        out = out[out["giorni_overlap"] > 0]
+        return out.sort_values(["ore_overlap", "giorni_overlap"],
+                               ascending=False).reset_index(drop=True)
@@ -0,0 +1,146 @@
+"""
+Refresh in background (stale-while-revalidate)
+==============================================
+Un thread per API key ricarica periodicamente i dati GanttPro e sostituisce
+il dataset servito solo a fetch completato: le sessioni leggono sempre
+l'ultimo dataset valido senza attendere la rete.
+
+Il thread smette di interrogare GanttPro quando nessuna sessione legge i
+dati da ``idle_s`` secondi (riparte al primo ``snapshot()`` successivo) o
+quando il refresher viene fermato con ``stop()``, es. all'uscita dalla
+cache dell'app.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+from ganttpro_client import GanttProClient
+from metrics import Metrics
+
+
+class BackgroundRefresher:
+    """Mantiene l'ultimo dataset valido di ``GanttProClient.load_all``.
+
+    Il dataset è una tupla (projects, resource_catalog, tasks) sostituita in
+    blocco sotto lock; ``version`` cresce a ogni sostituzione e permette alle
+    sessioni di accorgersi che c'è un dataset più recente. ``metrics`` sono
+    le metriche dell'ultimo fetch concluso (riuscito o no).
+    """
+
+    def __init__(self, api_key: str, interval_s: float = 300, idle_s: float = 3600,
+                 client_factory: Callable[..., GanttProClient] = GanttProClient):
+        self._api_key = api_key
+        self._client_factory = client_factory
+        self.interval_s = interval_s
+        self.idle_s = idle_s
+
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)   # fine di ogni tentativo di fetch
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_use = time.time()
+        self._ready = threading.Event()      # primo tentativo concluso (ok o ko)
+        self._thread: threading.Thread | None = None
+
+        self._data = None
+        self._fetched_at: float | None = None
+        self.version = 0
+        self.attempts = 0                    # tentativi di fetch conclusi (ok o ko)
+        self.refreshing = False
+        self.progress = (0.0, "")
+        self.last_error: str | None = None
+        self.warnings: list[str] = []
+        self.metrics: Metrics | None = None
+
+        self._start()
+
+    # ── Stato ────────────────────────────────────────────────────────────────
+    def snapshot(self):
+        """(dataset, version, fetched_at) coerenti tra loro; dataset None se mai caricato.
+        Conta come utilizzo: riavvia il polling se era fermo per inattività."""
+        self._last_use = time.time()
+        with self._lock:
+            data = self._data, self.version, self._fetched_at
+        if data[0] is not None and not self._stop.is_set():
+            self._start()                    # no-op se il thread è già attivo
+        return data
+
+    def age_s(self) -> float | None:
+        """Secondi trascorsi dall'ultimo fetch riuscito."""
+        with self._lock:
+            return None if self._fetched_at is None else time.time() - self._fetched_at
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Attende la conclusione del primo fetch (serve solo al primo avvio)."""
+        return self._ready.wait(timeout)
+
+    def wait_fetch(self, after: int, timeout: float | None = None) -> bool:
+        """Attende la fine di un tentativo di fetch successivo al n° ``after``."""
+        with self._done:
+            return self._done.wait_for(lambda: self.attempts > after, timeout)
+
+    # ── Controllo ────────────────────────────────────────────────────────────
+    def refresh_now(self):
+        """Richiede un fetch immediato senza attendere l'intervallo."""
+        self._last_use = time.time()
+        if self._thread is None or not self._thread.is_alive():
+            self._ready.clear()
+            self._start()
+        else:
+            self._wake.set()
+
+    def stop(self):
+        """Ferma il polling in modo definitivo (il fetch in corso termina)."""
+        self._stop.set()
+        self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True,
+                                            name="ganttpro-refresher")
+            self._thread.start()
+
+    def _set_progress(self, frac: float, text: str):
+        self.progress = (frac, text)
+
+    def _loop(self):
+        while True:
+            self.refreshing = True
+            self.progress = (0.0, "Caricamento progetti...")
+            metrics = Metrics()
+            client = self._client_factory(self._api_key, metrics=metrics)
+            try:
+                projects, resource_catalog, all_tasks = client.load_all(self._set_progress)
+                error = None if projects is not None else "Impossibile caricare i progetti"
+            except Exception as e:
+                projects, error = None, f"Errore aggiornamento: {e}"
+
+            with self._lock:
+                if error is None:
+                    self._data = (projects, resource_catalog, all_tasks)
+                    self._fetched_at = time.time()
+                    self.version += 1
+                self.last_error = error
+                self.warnings = list(client.errors)
+                self.metrics = metrics
+                has_data = self._data is not None
+                self.attempts += 1
+                self._done.notify_all()
+            self.refreshing = False
+            self._ready.set()
+
+            # Senza alcun dataset valido (es. API key errata) non si riprova da
+            # soli: il thread riparte con refresh_now().
+            if not has_data or self._stop.is_set():
+                return
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            # Fermato, o nessuna sessione legge più i dati: niente altre chiamate
+            if self._stop.is_set() or time.time() - self._last_use > self.idle_s:
+                return
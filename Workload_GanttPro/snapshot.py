@@ -0,0 +1,115 @@
+"""
+Snapshot offline dei dati GanttPro
+==================================
+Salva e ricarica quanto restituito da ``load_all`` (progetti, catalogo risorse,
+task) in un unico file JSON-lines compresso gzip, così un'analisi può essere
+riprodotta senza API key né rete (avvio rapido, baseline settimanali
+condivise, benchmark di ``build_daily_assignments``).
+
+Formato (una riga JSON per record, la prima è sempre il metadato):
+    {"_type": "meta", "format": "ganttpro-snapshot", "version": 1, ...}
+    {"_type": "project",  "data": {...}}
+    {"_type": "resource", "id": "<resourceId>", "data": {...}}
+    {"_type": "task",     "data": {...}}
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+
+SNAPSHOT_FORMAT  = "ganttpro-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX  = ".jsonl.gz"
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def write_snapshot(projects: list, resource_catalog: dict, tasks: list,
+                   dest, meta: dict | None = None) -> dict:
+    """Scrive lo snapshot su ``dest`` (percorso o file binario aperto).
+    Restituisce il record di metadati scritto in testa al file."""
+    header = {
+        "_type":       "meta",
+        "format":      SNAPSHOT_FORMAT,
+        "version":     SNAPSHOT_VERSION,
+        "created_at":  datetime.now().isoformat(timespec="seconds"),
+        "n_projects":  len(projects),
+        "n_resources": len(resource_catalog),
+        "n_tasks":     len(tasks),
+        **(meta or {}),
+    }
+    if isinstance(dest, (str, Path)):
+        fh = gzip.open(dest, "wb", compresslevel=6)
+    else:
+        fh = gzip.GzipFile(fileobj=dest, mode="wb", compresslevel=6)
+    with fh:
+        fh.write(_dumps(header))
+        for p in projects:
+            fh.write(_dumps({"_type": "project", "data": p}))
+        for rid, entry in resource_catalog.items():
+            fh.write(_dumps({"_type": "resource", "id": rid, "data": entry}))
+        for t in tasks:
+            fh.write(_dumps({"_type": "task", "data": t}))
+    return header
+
+
+def snapshot_bytes(projects: list, resource_catalog: dict, tasks: list,
+                   meta: dict | None = None) -> bytes:
+    """Come ``write_snapshot`` ma restituisce i byte (per ``st.download_button``)."""
+    buf = io.BytesIO()
+    write_snapshot(projects, resource_catalog, tasks, buf, meta=meta)
+    return buf.getvalue()
+
+
+def read_snapshot(src):
+    """Legge uno snapshot da percorso, byte o file binario aperto.
+    Restituisce (projects, resource_catalog, tasks, meta).
+    Solleva ValueError se il file non è uno snapshot valido."""
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    if isinstance(src, (str, Path)):
+        fh = gzip.open(src, "rb")
+    else:
+        fh = gzip.GzipFile(fileobj=src, mode="rb")
+
+    projects: list = []
+    resource_catalog: dict = {}
+    tasks: list = []
+    try:
+        with fh:
+            first = fh.readline()
+            try:
+                meta = json.loads(first) if first else {}
+            except json.JSONDecodeError:
+                meta = {}
+            if not isinstance(meta, dict):      # JSON valido ma non un oggetto, es. [1, 2]
+                meta = {}
+            if meta.get("_type") != "meta" or meta.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError("Il file non è uno snapshot GanttPro")
+            if not isinstance(meta.get("version", 0), int):
+                raise ValueError("Versione snapshot non valida")
+            if meta.get("version", 0) > SNAPSHOT_VERSION:
+                raise ValueError(f"Versione snapshot {meta.get('version')} non supportata")
+
+            for n, line in enumerate(fh, start=2):
+                rec = json.loads(line)
+                if not isinstance(rec, dict):
+                    raise ValueError(f"Riga {n} dello snapshot non valida")
+                kind = rec.get("_type")
+                if kind == "task":
+                    tasks.append(rec["data"])
+                elif kind == "project":
+                    projects.append(rec["data"])
+                elif kind == "resource":
+                    resource_catalog[rec["id"]] = rec["data"]
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        raise ValueError(f"Snapshot illeggibile: {e}") from e
+    except KeyError as e:
+        raise ValueError(f"Snapshot incompleto: campo {e} mancante") from e
+    return projects, resource_catalog, tasks, meta
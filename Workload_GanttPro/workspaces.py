@@ -0,0 +1,152 @@
+"""
+Più workspace GanttPro
+======================
+Configurazione di più API key (una per business unit) e unione dei dataset
+in un unico catalogo risorse. Ogni workspace ha il proprio refresher in
+background, quindi il proprio fetch e la propria cache; qui si fa solo il
+merge, che non tocca i dati condivisi dei refresher.
+
+Una risorsa presente in più workspace viene riconosciuta per email, se
+disponibile, altrimenti per nome normalizzato (minuscole, senza accenti né
+spazi doppi). Il nome vale solo tra workspace diversi: due risorse distinte
+con lo stesso nome nello stesso workspace restano separate.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+
+from ganttpro_client import _tid
+from names import normalize_name
+
+
+# Token che sembra una chiave (base64/esadecimale lunga) e non un nome di workspace
+_KEY_LIKE = re.compile(r"[A-Za-z0-9+/_\-]{20,}")
+
+
+def _is_label(name: str, key: str) -> bool:
+    """``nome=chiave`` solo se ``nome`` è un'etichetta plausibile: altrimenti
+    l'"=" fa parte della chiave (es. padding base64 "abc...=")."""
+    return bool(name) and bool(key) and "=" not in key and not _KEY_LIKE.fullmatch(name)
+
+
+def parse_api_keys(text: str) -> dict[str, str]:
+    """
+    ``"chiave"`` o ``"nome=chiave"`` separati da virgola o a capo → {nome: chiave}.
+    Le chiavi che contengono "=" valgono per intero (nome "Workspace N"): per
+    dare loro un nome si usa la sezione ``[workspaces]`` dei secrets.
+    """
+    workspaces: dict[str, str] = {}
+    for item in re.split(r"[,\n]", text or ""):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, key = (part.strip() for part in item.partition("="))
+        if not _is_label(name, key):
+            name, key = f"Workspace {len(workspaces) + 1}", item
+        workspaces[name] = key
+    return {n: k for n, k in workspaces.items() if k}
+
+
+def workspaces_from_secrets(secrets) -> dict[str, str]:
+    """Sezione ``[workspaces]`` dei secrets Streamlit (nome = "api_key"), se presente."""
+    try:
+        cfg = secrets.get("workspaces")
+    except Exception:                       # nessun secrets.toml
+        return {}
+    return {str(n): str(k) for n, k in dict(cfg or {}).items() if k}
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Impronta non segreta di una API key: identifica il workspace nello storico."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+def history_source(api_keys) -> str:
+    """Sorgente dello storico per un insieme di API key, indipendente dai nomi
+    dati ai workspace (le chiavi inserite a mano si chiamano tutte "Workspace N")."""
+    return "+".join(sorted(key_fingerprint(k) for k in api_keys))
+
+
+def resource_key(entry: dict) -> str:
+    """Identità di una risorsa tra workspace: email o nome normalizzato."""
+    email = (entry.get("email") or "").strip().casefold()
+    return f"email:{email}" if email else f"name:{normalize_name(entry.get('name', ''))}"
+
+
+def resource_keys(ws: str, resource_catalog: dict) -> dict[str, str]:
+    """
+    resourceId → chiave nel catalogo unificato per un workspace. Un nome
+    condiviso da più risorse senza email dello stesso workspace non identifica
+    nessuna di loro: quelle risorse restano distinte (``ws:resourceId``).
+    """
+    keys = {rid: resource_key(entry) for rid, entry in resource_catalog.items()}
+    count = Counter(keys.values())
+    return {rid: key if key.startswith("email:") or count[key] == 1 else f"{ws}:{rid}"
+            for rid, key in keys.items()}
+
+
+def merge_workspaces(datasets: dict[str, tuple]):
+    """
+    Unisce {workspace: (projects, resource_catalog, tasks)} in un solo dataset
+    (projects, resource_catalog, tasks) con la stessa forma di ``load_all``.
+    Con un solo workspace i dati sono restituiti così come sono.
+    """
+    if len(datasets) == 1:
+        return next(iter(datasets.values()))
+
+    # Progetti con lo stesso nome in workspace diversi: suffisso "[workspace]"
+    seen: dict[str, set] = {}
+    for ws, (projects, _, tasks) in datasets.items():
+        for t in tasks:
+            seen.setdefault(t.get("_projectName", "?"), set()).add(ws)
+    dup = {p for p, wss in seen.items() if len(wss) > 1}
+
+    def _pname(pname, ws):
+        return f"{pname} [{ws}]" if pname in dup else pname
+
+    all_projects: list = []
+    catalog: dict[str, dict] = {}
+    alias: dict[tuple, str] = {}
+    for ws, (projects, resource_catalog, _) in datasets.items():
+        all_projects.extend(projects)
+        keys = resource_keys(ws, resource_catalog)
+        for rid, entry in resource_catalog.items():
+            key = keys[rid]
+            alias[(ws, rid)] = key
+            merged = catalog.setdefault(key, {
+                "name": entry.get("name"), "type": entry.get("type", "unknown"),
+                "projects": [], "workspaces": [],
+            })
+            if entry.get("email") and not merged.get("email"):
+                merged["email"] = entry["email"]
+            for p in entry.get("projects", []):
+                if _pname(p, ws) not in merged["projects"]:
+                    merged["projects"].append(_pname(p, ws))
+            if ws not in merged["workspaces"]:
+                merged["workspaces"].append(ws)
+
+    # Task copiati (i dati dei refresher sono condivisi): ID resi univoci per
+    # workspace e risorse rimappate sulle chiavi del catalogo unificato
+    all_tasks: list = []
+    for ws, (_, _, tasks) in datasets.items():
+        for t in tasks:
+            t2 = dict(t)
+            t2["_workspace"] = ws
+            t2["_projectName"] = _pname(t.get("_projectName", "?"), ws)
+            tid = _tid(t)
+            if tid is not None:
+                t2["taskId"] = f"{ws}:{tid}"
+            resources = []
+            for r in t.get("resources") or t.get("assignments") or []:
+                if isinstance(r, dict):
+                    rid = str(r.get("resourceId") or r.get("id") or "")
+                    r = {**r, "resourceId": alias.get((ws, rid), f"{ws}:{rid}")}
+                resources.append(r)
+            t2["resources"] = resources
+            t2.pop("assignments", None)
+            all_tasks.append(t2)
+
+    return all_projects, catalog, all_tasks
@@ -0,0 +1 @@
+"""Benchmark su dati sintetici delle app del repository (``python -m benchmarks``)."""
@@ -0,0 +1,164 @@
+"""
+Generatori di dati sintetici
+============================
+Dati con la forma dei file reali, a scala configurabile e riproducibili
+(seme fisso):
+
+- cruscotto di programmazione (Sviluppo_ore, Planning_git), con le colonne
+  di testata compilate solo sulla prima riga del gruppo come nell'Excel vero;
+- BOM mensile multilivello e CSV dei mancanti (pianificazione), con codici
+  che si incrociano davvero;
+- task GanttPro con risorse assegnate e catalogo risorse (Workload_GanttPro).
+"""
+
+from __future__ import annotations
+
+import io
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+GEST = ["1) GRIGIO - PROD INT", "3) AZZURRO - ACQ", "2) VERDE - CL"]
+STATI = ["INEVASO - PRODUCIBILE", "INEVASO - NON PRODUCIBILE", "EVASO"]
+REPARTI = [f"E{i:02d}" for i in range(24)]
+GIORNI_SETTIMANA = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato']
+
+
+def _rng(seed: int) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+
+# ── Cruscotto ─────────────────────────────────────────────────────────────────
+def cruscotto(n: int, seed: int = 0, righe_gruppo: int = 8) -> pd.DataFrame:
+    """Cruscotto grezzo di ``n`` righe (testate solo a inizio gruppo)."""
+    rng = _rng(seed)
+    gruppo = np.arange(n) // righe_gruppo
+    inizio = np.r_[True, gruppo[1:] != gruppo[:-1]]
+    n_gruppi = int(gruppo[-1]) + 1 if n else 0
+
+    def testata(valori):
+        col = pd.Series(np.asarray(valori, dtype=object)[gruppo])
+        return col.where(inizio, None)
+
+    commesse = rng.integers(1000, 1000 + max(1, n // 500), n_gruppi)
+    return pd.DataFrame({
+        "COMMESSA":          testata([f"C{c}" for c in commesse]),
+        "ANNO":              testata(np.full(n_gruppi, 2026)),
+        "WEEK":              testata(rng.integers(1, 53, n_gruppi)),
+        "LANCIO":            testata(rng.integers(100, 100 + max(1, n // 2000) + 5, n_gruppi)),
+        "GEST":              testata(rng.choice(GEST, n_gruppi, p=[0.7, 0.2, 0.1])),
+        "STATO":             testata(rng.choice(STATI, n_gruppi, p=[0.6, 0.3, 0.1])),
+        "MONT_SMONT":        pd.Series(np.where(inizio, "M", None)),
+        "REPARTO_ARTICOLO":  rng.choice(REPARTI, n),
+        "ARTICOLO":          [f"3N{i:08d}" for i in rng.integers(0, 10 * n + 1, n)],
+        "DESCRIZIONE":       "collo",
+        "QTA_PADRE":         rng.integers(1, 50, n),
+        "QTA_RESIDUA_PADRE": rng.integers(1, 30, n),
+        "QTA_PRODOTTA":      np.where(rng.random(n) < 0.5, np.nan, rng.integers(0, 10, n)),
+        "DATA_CONSEGNA":     pd.Timestamp("2026-01-05") + pd.to_timedelta(rng.integers(0, 200, n), unit="D"),
+        "NOTE":              None,
+        "EXTRA_1":           0,
+        "EXTRA_2":           "",
+    })
+
+
+def excel_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False)
+    return buf.getvalue()
+
+
+def risorse_reparti(operatori: int = 4) -> pd.DataFrame:
+    """Operatori per reparto e giorno, come la tabella Risorse di Planning_git."""
+    return pd.DataFrame({"Reparto": REPARTI, **{g: operatori for g in GIORNI_SETTIMANA}})
+
+
+# ── BOM e mancanti ────────────────────────────────────────────────────────────
+def _codici_componenti(n: int) -> np.ndarray:
+    return np.array([f"CP{i:07d}" for i in range(max(1, n))], dtype=object)
+
+
+def bom(n: int, seed: int = 0, mese: int = 1) -> pd.DataFrame:
+    """
+    BOM mensile di ``n`` righe: colli 3N con componenti e, per un decimo
+    delle righe, semilavorati (a loro volta colli) come componenti.
+    """
+    rng = _rng(seed)
+    n_colli = max(1, n // 10)
+    colli = np.array([f"3N{i:07d}" for i in range(n_colli)], dtype=object)
+    semi = np.array([f"SL{i:06d}" for i in range(max(1, n_colli // 10))], dtype=object)
+    componenti = _codici_componenti(max(1, n // 3))
+
+    padre = np.where(rng.random(n) < 0.9, colli[rng.integers(0, len(colli), n)],
+                     semi[rng.integers(0, len(semi), n)])
+    figlio = componenti[rng.integers(0, len(componenti), n)]
+    # un decimo delle righe dei colli punta a un semilavorato (secondo livello)
+    verso_semi = (rng.random(n) < 0.1) & np.char.startswith(padre.astype(str), "3N")
+    figlio = np.where(verso_semi, semi[rng.integers(0, len(semi), n)], figlio)
+    reparto = rng.integers(0, len(REPARTI), n)
+    df = pd.DataFrame({
+        "COLLO": padre, "FILIO": figlio,
+        "COD_REPARTO": np.asarray(REPARTI, dtype=object)[reparto],
+        "DES_REPARTO": [f"Reparto {r}" for r in reparto],
+        "QUANTI": rng.integers(1, 8, n).astype(float),
+        "QTA_PADRE": 1.0,
+    })
+    df["mese"] = mese
+    df["periodo"] = 202600 + mese
+    df["CI"] = df["QUANTI"] / df["QTA_PADRE"]
+    return df
+
+
+def mancanti_csv(n_articoli: int, n_lanci: int = 150, densita: float = 0.02,
+                 seed: int = 0, n_bom: int | None = None) -> bytes:
+    """
+    CSV dei mancanti (riga di titolo, 14 colonne descrittive, una colonna per
+    lancio). I codici sono colli e componenti della ``bom(n_bom)``.
+    """
+    rng = _rng(seed)
+    n_bom = n_bom or n_articoli
+    n_colli = max(1, n_bom // 10)
+    comp = _codici_componenti(max(1, n_bom // 3))
+    codici = np.where(np.arange(n_articoli) % 4 == 0,
+                      [f"3N {i % n_colli:07d}" for i in range(n_articoli)],
+                      comp[rng.integers(0, len(comp), n_articoli)])
+    vals = np.where(rng.random((n_articoli, n_lanci)) < densita,
+                    rng.integers(1, 50, (n_articoli, n_lanci)), 0)
+    df = pd.DataFrame(vals, columns=[f"L{j:03d}" for j in range(n_lanci)])
+    df.insert(0, "Fabbisogni Totale", vals.sum(1))
+    for i in reversed(range(11)):
+        df.insert(0, f"X{i}", "x")
+    df.insert(0, "Descrizione", "articolo")
+    df.insert(0, "Articolo", codici)
+    df.insert(0, "Ragione sociale", [f"Fornitore {i % 37}" for i in range(n_articoli)])
+    buf = io.StringIO()
+    buf.write("Report mancanti;;\n")
+    df.to_csv(buf, sep=";", index=False)
+    return buf.getvalue().encode()
+
+
+# ── GanttPro ──────────────────────────────────────────────────────────────────
+def ganttpro(n: int, seed: int = 0, n_risorse: int = 60, n_progetti: int = 20):
+    """(task, catalogo risorse) con circa ``n`` assegnazioni task × risorsa."""
+    rng = _rng(seed)
+    catalogo = {str(r): {"name": f"Risorsa {r}", "type": "user" if r % 4 else "material",
+                         "projects": []} for r in range(n_risorse)}
+    base = date(2026, 1, 1)
+    n_task = max(1, n // 2)
+    inizio = rng.integers(0, 365, n_task)
+    durata = rng.integers(0, 10, n_task)
+    n_ass = rng.integers(1, 4, n_task)
+    task = []
+    for i in range(n_task):
+        s = base + timedelta(days=int(inizio[i]))
+        e = s + timedelta(days=int(durata[i]))
+        task.append({
+            "id": i, "name": f"Task {i}", "_projectName": f"Progetto {i % n_progetti}",
+            "startDate": f"{s.isoformat()} 08:00", "endDate": f"{e.isoformat()} 17:00",
+            "resources": [{"resourceId": int(r), "resourceValue": int(v)}
+                          for r, v in zip(rng.integers(0, n_risorse, n_ass[i]),
+                                          rng.integers(60, 4800, n_ass[i]))],
+        })
+    return task, catalogo
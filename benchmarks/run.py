@@ -0,0 +1,267 @@
+"""
+Benchmark delle fasi principali delle quattro app
+=================================================
+    python -m benchmarks [--scala 1k 10k ...] [--solo app/fase ...]
+                         [--out benchmarks/risultati.jsonl]
+                         [--soglie benchmarks/soglie.json]
+                         [--tolleranza 0.25] [--storico 5]
+
+Per ogni scala (righe dei dati sintetici, 1k → 1M) genera i dati, misura
+ogni fase (tempo minimo e mediano su più ripetizioni) e aggiunge una riga
+JSON per fase al file dei risultati, con commit git e versione di Python
+per confrontare le esecuzioni nel tempo.
+
+Ogni fase è confrontata con le esecuzioni precedenti sulla stessa macchina
+(le ultime ``--storico`` righe di ``risultati.jsonl`` con stessa scala, fase
+e versioni di Python e pandas): se il tempo minimo supera la loro mediana di
+oltre ``--tolleranza`` (più ``MARGINE_S`` contro il rumore delle fasi da pochi
+millisecondi) è una regressione e il comando esce con codice 1, così può
+girare in un job notturno.
+
+Le soglie assolute di ``soglie.json`` (secondi, per scala e ``app/fase``)
+restano un limite grossolano per le fasi senza storico, es. in CI.
+
+I moduli delle app si importano con la cartella dell'app in testa a
+``sys.path``, come fa Streamlit; i moduli con lo stesso nome in app diverse
+(es. ``snapshot``) vengono scaricati tra un'app e l'altra.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks import generatori as gen
+
+ROOT = Path(__file__).resolve().parent.parent
+OUT_DEFAULT = Path(__file__).parent / "risultati.jsonl"
+SOGLIE_DEFAULT = Path(__file__).parent / "soglie.json"
+MAX_RIGHE_EXCEL = 200_000          # oltre, la scrittura dell'xlsx sintetico domina il benchmark
+TOLLERANZA = 0.25                  # rallentamento ammesso rispetto alla mediana storica
+STORICO = 5                        # esecuzioni precedenti nella mediana
+MARGINE_S = 0.01                   # secondi di rumore ammessi oltre la tolleranza
+
+
+def scala(testo: str) -> int:
+    """'1k' → 1000, '1M' → 1_000_000, '2500' → 2500."""
+    t = testo.strip().lower()
+    molt = {"k": 1_000, "m": 1_000_000}.get(t[-1:], 1)
+    return int(float(t[:-1] if molt > 1 else t) * molt)
+
+
+@contextmanager
+def app(nome: str):
+    """Moduli dell'app ``nome`` importabili per nome semplice, poi scaricati."""
+    cartella = str(ROOT / nome)
+    prima = set(sys.modules)
+    sys.path.insert(0, cartella)
+    sys.path.insert(1, str(ROOT))
+    try:
+        yield importlib.import_module
+    finally:
+        sys.path.remove(cartella)
+        sys.path.remove(str(ROOT))
+        for mod in set(sys.modules) - prima:
+            if (getattr(sys.modules[mod], "__file__", None) or "").startswith(cartella):
+                del sys.modules[mod]
+
+
+def _righe(esito) -> int:
+    """Righe prodotte da una fase, per riconoscere a colpo d'occhio i risultati vuoti."""
+    for attr in ("esplosione", "con_mancanti"):
+        if hasattr(esito, attr):
+            return len(getattr(esito, attr))
+    return len(esito)
+
+
+def misura(fn, ripetizioni: int) -> tuple[list[float], object]:
+    tempi, esito = [], None
+    for _ in range(ripetizioni):
+        t0 = time.perf_counter()
+        esito = fn()
+        tempi.append(time.perf_counter() - t0)
+    return tempi, esito
+
+
+# ── Fasi per app ──────────────────────────────────────────────────────────────
+# Ogni app restituisce {fase: funzione senza argomenti}, con i dati già generati.
+def fasi_sviluppo_ore(n: int, imp) -> dict:
+    cruscotto = imp("cruscotto")
+    grezzo = gen.cruscotto(n)
+    filtrato = cruscotto.filtra_cruscotto(grezzo)
+    selezione = list(filtrato.COMMESSA.unique()[::2])
+    fasi = {}
+    if n <= MAX_RIGHE_EXCEL:
+        xlsx = gen.excel_bytes(grezzo)
+        fasi["excel_ingest"] = lambda: cruscotto.leggi_cruscotto(xlsx)
+    fasi["ffill_filtro"] = lambda: cruscotto.filtra_cruscotto(grezzo)
+    fasi["multifiltro"] = lambda: cruscotto.multifiltro(filtrato, "COMMESSA", selezione)
+    return fasi
+
+
+def fasi_planning_git(n: int, imp) -> dict:
+    schedulazione = imp("schedulazione")
+    tempi_ciclo = imp("tempi_ciclo")
+    df = gen.cruscotto(n)
+    # stesso filtro della pagina: testate completate, produzione interna producibile
+    df[["COMMESSA", "LANCIO", "GEST", "STATO"]] = df[["COMMESSA", "LANCIO", "GEST", "STATO"]].ffill()
+    df = df[(df.GEST == gen.GEST[0]) & (df.STATO == gen.STATI[0])].reset_index(drop=True)
+    df["Ore_Necessarie"] = tempi_ciclo.tempi_ciclo(None, 7.5 * 11 / 400).ore(
+        df["QTA_RESIDUA_PADRE"], df["REPARTO_ARTICOLO"])
+    risorse = gen.risorse_reparti()
+    return {"scheduler": lambda: schedulazione.assegna_programma(
+        df, risorse, gen.GIORNI_SETTIMANA, gen.GIORNI_SETTIMANA[0])}
+
+
+def fasi_pianificazione(n: int, imp) -> dict:
+    ingestione = imp("ingestione")
+    bom_grafo = imp("bom_grafo")
+    pipeline = imp("pipeline")
+    bom = gen.bom(n)
+    reparti = bom[["COLLO", "COD_REPARTO", "DES_REPARTO"]].drop_duplicates()
+    csv = gen.mancanti_csv(max(100, n // 10), n_bom=n)
+    mancanti = ingestione.leggi_mancanti(csv)
+    grafo = bom_grafo.BomGraph(bom)
+    return {
+        "mancanti_ingest": lambda: ingestione.leggi_mancanti(csv),
+        "bom_grafo":       lambda: bom_grafo.BomGraph(bom),
+        "matching_merge":  lambda: pipeline.elabora(grafo, reparti, mancanti),
+    }
+
+
+def fasi_workload_ganttpro(n: int, imp) -> dict:
+    assignments = imp("assignments")
+    task, catalogo = gen.ganttpro(n)
+    return {"build_daily_assignments":
+            lambda: assignments.build_daily_assignments(task, catalogo, "1111100")}
+
+
+APPS = {
+    "Sviluppo_ore":     fasi_sviluppo_ore,
+    "Planning_git":     fasi_planning_git,
+    "pianificazione":   fasi_pianificazione,
+    "Workload_GanttPro": fasi_workload_ganttpro,
+}
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def esegui(scale: list[int], solo: list[str] | None, ripetizioni: int) -> list[dict]:
+    base = {"ts": datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+            "python": platform.python_version(), "pandas": pd.__version__}
+    risultati = []
+    for n in scale:
+        for nome, fasi_app in APPS.items():
+            if solo and not any(s == nome or s.startswith(nome + "/") for s in solo):
+                continue
+            with app(nome) as imp:
+                t0 = time.perf_counter()
+                fasi = fasi_app(n, imp)
+                print(f"[{n}] {nome}: dati pronti in {time.perf_counter() - t0:.1f} s")
+                for fase, fn in fasi.items():
+                    chiave = f"{nome}/{fase}"
+                    if solo and nome not in solo and chiave not in solo:
+                        continue
+                    # una ripetizione basta quando la fase dura già parecchio
+                    tempi, esito = misura(fn, 1)
+                    if tempi[0] < 1.0 and ripetizioni > 1:
+                        altri, esito = misura(fn, ripetizioni - 1)
+                        tempi += altri
+                    righe = _righe(esito)
+                    r = {**base, "scala": n, "fase": chiave, "secondi_min": round(min(tempi), 4),
+                         "secondi_mediana": round(statistics.median(tempi), 4),
+                         "ripetizioni": len(tempi), "righe_out": righe}
+                    print(f"  {chiave:<45} {r['secondi_min']:>9.3f} s  ({len(tempi)}×, {righe} righe)")
+                    risultati.append(r)
+    return risultati
+
+
+def leggi_storico(file: Path) -> list[dict]:
+    """Righe dei risultati precedenti (le righe illeggibili sono saltate)."""
+    if not file.exists():
+        return []
+    righe = []
+    for riga in file.read_text(encoding="utf-8").splitlines():
+        try:
+            righe.append(json.loads(riga))
+        except ValueError:
+            continue
+    return righe
+
+
+def confronta_storico(risultati: list[dict], storico: list[dict], tolleranza: float = TOLLERANZA,
+                      ultimi: int = STORICO) -> list[str]:
+    """Fasi più lente della mediana delle ultime ``ultimi`` esecuzioni comparabili."""
+    precedenti: dict[tuple, list[float]] = {}
+    for r in storico:
+        chiave = (r.get("scala"), r.get("fase"), r.get("python"), r.get("pandas"))
+        if isinstance(r.get("secondi_min"), (int, float)):
+            precedenti.setdefault(chiave, []).append(r["secondi_min"])
+    sforate = []
+    for r in risultati:
+        tempi = precedenti.get((r["scala"], r["fase"], r["python"], r["pandas"]), [])[-ultimi:]
+        if not tempi:
+            continue
+        base = statistics.median(tempi)
+        if r["secondi_min"] > base * (1 + tolleranza) + MARGINE_S:
+            sforate.append(f"{r['fase']} @ {r['scala']}: {r['secondi_min']:.3f} s, "
+                           f"mediana delle ultime {len(tempi)} {base:.3f} s "
+                           f"(+{r['secondi_min'] / base - 1:.0%})")
+    return sforate
+
+
+def confronta(risultati: list[dict], soglie: dict) -> list[str]:
+    """Fasi oltre la soglia della loro scala."""
+    sforate = []
+    for r in risultati:
+        limite = soglie.get(str(r["scala"]), {}).get(r["fase"])
+        if limite is not None and r["secondi_min"] > limite:
+            sforate.append(f"{r['fase']} @ {r['scala']}: {r['secondi_min']:.3f} s > {limite} s")
+    return sforate
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark delle app su dati sintetici")
+    parser.add_argument("--scala", nargs="+", default=["1k", "10k"],
+                        help="righe dei dati sintetici (es. 1k 10k 100k 1M)")
+    parser.add_argument("--solo", nargs="+", help="app o app/fase da eseguire")
+    parser.add_argument("--ripetizioni", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=OUT_DEFAULT)
+    parser.add_argument("--soglie", type=Path, default=SOGLIE_DEFAULT)
+    parser.add_argument("--tolleranza", type=float, default=TOLLERANZA,
+                        help="rallentamento ammesso rispetto allo storico (0.25 = +25%%)")
+    parser.add_argument("--storico", type=int, default=STORICO,
+                        help="esecuzioni precedenti nella mediana di confronto")
+    args = parser.parse_args(argv)
+
+    storico = leggi_storico(args.out)
+    risultati = esegui([scala(s) for s in args.scala], args.solo, args.ripetizioni)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for r in risultati:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print(f"Risultati aggiunti a {args.out}")
+
+    soglie = json.loads(args.soglie.read_text()) if args.soglie.exists() else {}
+    sforate = (confronta_storico(risultati, storico, args.tolleranza, args.storico)
+               + confronta(risultati, soglie))
+    for s in sforate:
+        print(f"REGRESSIONE {s}", file=sys.stderr)
+    return 1 if sforate else 0
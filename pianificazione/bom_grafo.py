@@ -0,0 +1,126 @@
+"""
+Esplosione BOM multilivello
+===========================
+La BOM concatenata è un grafo orientato COLLO → FILIO (peso ``CI``): un
+FILIO può essere a sua volta COLLO di un semilavorato. Un componente che
+manca due livelli sotto blocca comunque il collo 3N in cima.
+
+Gli articoli sono codificati in interi e gli archi tenuti in forma CSR
+(indptr/indices/pesi ordinati per padre). In ordine topologico, dai colli
+verso i componenti, ogni nodo eredita dai padri la mappa memoizzata
+{collo: CI cumulato}: il CI lungo un cammino è il prodotto dei CI degli
+archi, cammini diversi verso lo stesso collo si sommano. Il risultato è una
+tabella sparsa (collo, componente, CI cumulato, livello) calcolata una
+volta per versione della BOM; i mancanti del giorno sono solo una lookup.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from matching import contiene_codici, normalizza_codici
+
+ESPLOSIONE_COLS = ["COLLO", "FILIO", "CI", "LIVELLO"]
+
+
+class BomGraph:
+    """Grafo COLLO → FILIO con raggiungibilità transitiva precalcolata.
+    ``bom`` ha le colonne COLLO, FILIO, CI e periodo (come ``BomStore.bom``)."""
+
+    def __init__(self, bom: pd.DataFrame):
+        # Un arco per coppia (COLLO, FILIO): vale la BOM del periodo (AAAAMM)
+        # più recente; il mese a due cifre metterebbe dicembre dopo un gennaio
+        # più recente
+        archi = (bom.dropna(subset=["COLLO", "FILIO"])
+                 .sort_values("periodo", kind="stable")
+                 .drop_duplicates(["COLLO", "FILIO"], keep="last"))
+        codici, articoli = pd.factorize(
+            pd.concat([archi["COLLO"], archi["FILIO"]], ignore_index=True).astype(str))
+        n_archi = len(archi)
+        padre, figlio = codici[:n_archi], codici[n_archi:]
+        peso = archi["CI"].to_numpy(dtype=np.float64)
+
+        self.articoli = pd.Index(articoli)
+        n = len(self.articoli)
+
+        # CSR per padre
+        ordine = np.argsort(padre, kind="stable")
+        self.indices = figlio[ordine]
+        self.pesi = peso[ordine]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(self.indptr, padre + 1, 1)
+        self.indptr = np.cumsum(self.indptr)
+
+        self.cicli = 0
+        self.esplosione = self._esplodi(n, np.unique(padre))
+
+    def _esplodi(self, n: int, colli: np.ndarray) -> pd.DataFrame:
+        indptr, indices, pesi = self.indptr, self.indices, self.pesi
+        grado = np.bincount(indices, minlength=n)
+
+        # memo[v] = {collo: [CI cumulato, livello minimo]}
+        memo: list[dict | None] = [None] * n
+        for c in colli:
+            memo[c] = {int(c): [1.0, 0]}
+
+        coda = deque(np.flatnonzero(grado == 0).tolist())
+        visitati = 0
+        while coda:
+            v = coda.popleft()
+            visitati += 1
+            mv = memo[v]
+            for k in range(indptr[v], indptr[v + 1]):
+                f, w = int(indices[k]), pesi[k]
+                if mv:
+                    mf = memo[f]
+                    if mf is None:
+                        mf = memo[f] = {}
+                    for radice, (ci, liv) in mv.items():
+                        cur = mf.get(radice)
+                        if cur is None:
+                            mf[radice] = [ci * w, liv + 1]
+                        else:
+                            cur[0] += ci * w
+                            cur[1] = min(cur[1], liv + 1)
+                grado[f] -= 1
+                if grado[f] == 0:
+                    coda.append(f)
+        # Nodi in un ciclo non entrano mai in coda: restano con ciò che hanno
+        self.cicli = n - visitati
+
+        radici, foglie, ci, livelli = [], [], [], []
+        for v, mv in enumerate(memo):
+            if not mv:
+                continue
+            for radice, (c, liv) in mv.items():
+                if radice != v:
+                    radici.append(radice)
+                    foglie.append(v)
+                    ci.append(c)
+                    livelli.append(liv)
+        art = self.articoli.to_numpy()
+        out = pd.DataFrame({
+            "COLLO":   art[np.array(radici, dtype=np.int64)],
+            "FILIO":   art[np.array(foglie, dtype=np.int64)],
+            "CI":      np.array(ci, dtype=np.float64),
+            "LIVELLO": np.array(livelli, dtype=np.int64),
+        }, columns=ESPLOSIONE_COLS)
+        out["FILIO_NORM"] = normalizza_codici(out["FILIO"]).to_numpy()
+        return out
+
+    def bloccati_da(self, codici, esatto: bool = False) -> pd.DataFrame:
+        """
+        Colli (a qualunque livello sopra) che contengono uno dei componenti
+        ``codici``, con CI cumulato e livello del componente.
+        """
+        esp = self.esplosione
+        if esatto:
+            mask = esp["FILIO_NORM"].isin(set(normalizza_codici(list(codici))))
+        else:
+            filii = pd.Series(esp["FILIO"].unique())
+            trovati = set(filii[contiene_codici(filii, codici)])
+            mask = esp["FILIO"].isin(trovati)
+        return esp.loc[mask, ESPLOSIONE_COLS].reset_index(drop=True)
@@ -0,0 +1,327 @@
+"""
+Archivio BOM
+============
+Le BOM mensili cambiano una volta al mese, i mancanti ogni giorno. Invece di
+ricaricare e concatenare tutti gli Excel a ogni sessione, le BOM vengono
+salvate una volta in un archivio SQLite locale:
+
+- una riga per riga di BOM, con ``CI`` (QUANTI / QTA_PADRE) già calcolato e
+  il mese preso dalle prime due cifre del nome file;
+- indici su COLLO e FILIO per le ricerche dei mancanti;
+- la tabella COLLO → reparto già pronta.
+
+L'archivio tiene una BOM per mese: un file già presente con lo stesso
+contenuto viene saltato, un file nuovo o modificato sostituisce le righe del
+suo mese (anche se caricate con un altro nome). Tra più file dello stesso
+mese caricati insieme vale l'ultimo. Il run giornaliero legge solo il CSV
+dei mancanti e interroga l'archivio.
+
+Ogni file ha anche un periodo AAAAMM, che ordina le BOM per recenza (il
+mese da solo metterebbe dicembre dopo il gennaio successivo): l'anno si
+legge dal nome se segue il mese (``01_2026_...``), altrimenti è quello che
+porta il mese più vicino alla data di caricamento (una BOM di gennaio
+caricata a fine dicembre è del gennaio successivo).
+
+La lettura degli Excel (CPU-bound, file indipendenti) avviene in un pool di
+processi con numero di worker limitato, leggendo solo le colonne BOM con
+tipi espliciti; la scrittura nell'archivio resta seriale. I processi partono
+con ``spawn``: il server Streamlit ha più thread e un ``fork`` può bloccarsi.
+Ogni BOM viene scritta appena letta, così in memoria ce n'è una alla volta.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from matching import contiene_codici, normalizza_codici
+
+BOM_COLS = ["COLLO", "FILIO", "COD_REPARTO", "DES_REPARTO", "QUANTI", "QTA_PADRE"]
+BOM_DTYPES = {"COLLO": str, "FILIO": str, "COD_REPARTO": str, "DES_REPARTO": str,
+              "QUANTI": "float64", "QTA_PADRE": "float64"}
+MAX_WORKERS = 4               # processi per la lettura parallela degli Excel
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_bom (
+    file        TEXT PRIMARY KEY,
+    mese        INTEGER,
+    digest      TEXT NOT NULL,
+    righe       INTEGER NOT NULL,
+    caricato_il TEXT NOT NULL,
+    periodo     INTEGER
+);
+CREATE TABLE IF NOT EXISTS bom (
+    file        TEXT NOT NULL,
+    mese        INTEGER,
+    COLLO       TEXT,
+    FILIO       TEXT,
+    COD_REPARTO,
+    DES_REPARTO,
+    QUANTI      REAL,
+    QTA_PADRE   REAL,
+    CI          REAL,
+    FILIO_NORM  TEXT,
+    COLLO_NORM  TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_bom_filio ON bom (FILIO);
+CREATE INDEX IF NOT EXISTS ix_bom_collo ON bom (COLLO);
+CREATE INDEX IF NOT EXISTS ix_bom_filio_norm ON bom (FILIO_NORM);
+CREATE INDEX IF NOT EXISTS ix_bom_file ON bom (file);
+CREATE TABLE IF NOT EXISTS reparti (
+    COLLO       TEXT,
+    COD_REPARTO,
+    DES_REPARTO
+);
+CREATE INDEX IF NOT EXISTS ix_reparti_collo ON reparti (COLLO);
+"""
+
+
+def mese_file(nome: str) -> int:
+    """Mese di una BOM: le prime due cifre del nome file."""
+    mese = str(nome)[:2]
+    if not mese.isdigit():
+        raise ValueError(f"{nome}: il nome del file deve iniziare con il mese (due cifre)")
+    return int(mese)
+
+
+def periodo_file(nome: str, caricato: date) -> int:
+    """Periodo AAAAMM di una BOM: anno dal nome (``MM_AAAA...``) o dalla data di caricamento."""
+    mese = mese_file(nome)
+    anno = re.match(r"\d{2}[ _\-.]?((?:19|20)\d{2})(?!\d)", str(nome))
+    if anno:
+        return int(anno.group(1)) * 100 + mese
+    # anno con il mese più vicino al caricamento (da 6 mesi prima a 5 dopo)
+    scarto = (mese - caricato.month + 6) % 12 - 6
+    mesi = caricato.year * 12 + caricato.month - 1 + scarto
+    return (mesi // 12) * 100 + mesi % 12 + 1
+
+
+def leggi_file_bom(nome: str, contenuto: bytes) -> tuple[pd.DataFrame, float]:
+    """
+    Excel BOM mensile → (colonne BOM_COLS + mese + CI, secondi di lettura).
+    Il mese sono le prime due cifre del nome file. Funzione di modulo, così
+    può girare in un processo del pool.
+    """
+    t0 = time.perf_counter()
+    try:
+        df = pd.read_excel(BytesIO(contenuto), usecols=BOM_COLS, dtype=BOM_DTYPES)
+    except ValueError as e:
+        raise ValueError(f"{nome}: colonne BOM non trovate ({e})") from None
+    df = df[BOM_COLS]
+    df["mese"] = mese_file(nome)
+    df["CI"] = df["QUANTI"] / df["QTA_PADRE"]
+    return df, time.perf_counter() - t0
+
+
+def leggi_file_paralleli(file: dict[str, bytes], max_workers: int = MAX_WORKERS,
+                         progress: Callable[[float, str], None] | None = None):
+    """
+    Legge più Excel BOM {nome: contenuto} in parallelo e li restituisce man
+    mano che sono pronti come (nome, frame, secondi). Con un solo file, o se
+    il pool di processi non è disponibile, la lettura è seriale.
+    """
+    n = len(file)
+    workers = max(1, min(n, max_workers, os.cpu_count() or 1))
+    fatti = set()
+
+    def _avanza(nome):
+        fatti.add(nome)
+        if progress is not None:
+            progress(len(fatti) / n, f"Letto {nome} ({len(fatti)}/{n})")
+
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futuri = {pool.submit(leggi_file_bom, nome, dati): nome
+                          for nome, dati in file.items()}
+                for fut in as_completed(futuri):
+                    df, secondi = fut.result()
+                    _avanza(futuri[fut])
+                    yield futuri[fut], df, secondi
+            return
+        except (BrokenProcessPool, OSError):
+            pass                              # ambiente senza processi: lettura seriale
+    for nome, dati in file.items():
+        if nome in fatti:
+            continue
+        df, secondi = leggi_file_bom(nome, dati)
+        _avanza(nome)
+        yield nome, df, secondi
+
+
+class BomStore:
+    """Archivio SQLite delle BOM mensili."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+            colonne = {r[1] for r in con.execute("PRAGMA table_info(file_bom)")}
+            if "periodo" not in colonne:          # archivio creato prima del periodo
+                con.execute("ALTER TABLE file_bom ADD COLUMN periodo INTEGER")
+                con.executemany("UPDATE file_bom SET periodo = ? WHERE file = ?", [
+                    (periodo_file(f, datetime.fromisoformat(c).date()), f)
+                    for f, c in con.execute("SELECT file, caricato_il FROM file_bom").fetchall()])
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ── Aggiornamento ─────────────────────────────────────────────────────────
+    def aggiorna(self, files, progress: Callable[[float, str], None] | None = None,
+                 max_workers: int = MAX_WORKERS) -> list[tuple[str, str, float]]:
+        """
+        Carica i file nuovi o modificati (lettura in parallelo), ognuno al posto
+        delle righe del suo mese; restituisce [(file, esito, secondi di lettura)]
+        nell'ordine dei file caricati. ``files`` sono file caricati con
+        Streamlit o percorsi.
+        """
+        esiti: dict[str, tuple[str, str, float]] = {}
+        da_leggere: dict[str, bytes] = {}
+        digests: dict[str, str] = {}
+        with self._connect() as con:
+            noti = {file: (mese, digest) for file, mese, digest
+                    in con.execute("SELECT file, mese, digest FROM file_bom")}
+        # un solo file per mese: l'ultimo caricato
+        ultimi: dict[int, tuple[str, bytes]] = {}
+        nomi = []
+        for f in files:
+            if isinstance(f, (str, Path)):
+                nome, contenuto = Path(f).name, Path(f).read_bytes()
+            else:
+                nome, contenuto = f.name, f.getvalue()
+            nomi.append(nome)
+            mese = mese_file(nome)
+            if mese in ultimi:
+                scartato = ultimi[mese][0]
+                esiti[scartato] = (scartato, f"ignorato (stesso mese di {nome})", 0.0)
+            ultimi[mese] = nome, contenuto
+        for mese, (nome, contenuto) in ultimi.items():
+            digest = hashlib.sha1(contenuto).hexdigest()
+            if noti.get(nome) == (mese, digest):
+                esiti[nome] = (nome, "invariato", 0.0)
+                continue
+            da_leggere[nome] = contenuto
+            digests[nome] = digest
+
+        # Letti in parallelo e scritti man mano che sono pronti: le letture
+        # ordinano per file, non per rowid
+        for nome, df, secondi in leggi_file_paralleli(da_leggere, max_workers, progress):
+            mese = mese_file(nome)
+            df.insert(0, "file", nome)
+            df["FILIO_NORM"] = normalizza_codici(df["FILIO"]).to_numpy()
+            df["COLLO_NORM"] = normalizza_codici(df["COLLO"]).to_numpy()
+            sostituiti = [f for f, (m, _) in noti.items() if f == nome or m == mese]
+            with self._connect() as con:
+                con.executemany("DELETE FROM bom WHERE file = ?", ((f,) for f in {*sostituiti, nome}))
+                con.executemany("DELETE FROM file_bom WHERE file = ?", ((f,) for f in sostituiti))
+                df.to_sql("bom", con, if_exists="append", index=False, chunksize=10_000)
+                adesso = datetime.now()
+                con.execute("INSERT OR REPLACE INTO file_bom "
+                            "(file, mese, digest, righe, caricato_il, periodo) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (nome, mese, digests[nome], len(df),
+                             adesso.isoformat(timespec="seconds"),
+                             periodo_file(nome, adesso.date())))
+            altri = [f for f in sostituiti if f != nome]
+            esito = (f"sostituisce {', '.join(altri)}" if altri
+                     else "sostituito" if sostituiti else "aggiunto")
+            esiti[nome] = (nome, esito, secondi)
+
+        if da_leggere:
+            with self._connect() as con:
+                self._ricostruisci_reparti(con)
+        return [esiti[nome] for nome in nomi if nome in esiti]
+
+    def rimuovi(self, file: str):
+        """Toglie dall'archivio le righe del file (cioè del suo mese)."""
+        with self._connect() as con:
+            con.execute("DELETE FROM bom WHERE file = ?", (file,))
+            con.execute("DELETE FROM file_bom WHERE file = ?", (file,))
+            self._ricostruisci_reparti(con)
+
+    @staticmethod
+    def _ricostruisci_reparti(con):
+        con.execute("DELETE FROM reparti")
+        con.execute("""
+            INSERT INTO reparti
+            SELECT COLLO, COD_REPARTO, DES_REPARTO
+            FROM (SELECT *, ROW_NUMBER() OVER (ORDER BY file, rowid) AS pos FROM bom)
+            GROUP BY COLLO, COD_REPARTO, DES_REPARTO ORDER BY MIN(pos)
+        """)
+
+    # ── Lettura ───────────────────────────────────────────────────────────────
+    def file(self) -> pd.DataFrame:
+        with self._connect() as con:
+            return pd.read_sql_query(
+                "SELECT file, mese, periodo, righe, caricato_il FROM file_bom "
+                "ORDER BY periodo, file", con)
+
+    @property
+    def versione(self) -> str:
+        """Impronta dei file in archivio: cambia a ogni aggiunta, sostituzione o rimozione."""
+        with self._connect() as con:
+            righe = con.execute("SELECT file, digest FROM file_bom ORDER BY file").fetchall()
+        return hashlib.sha1(repr(righe).encode()).hexdigest()
+
+    @property
+    def vuoto(self) -> bool:
+        with self._connect() as con:
+            return con.execute("SELECT 1 FROM bom LIMIT 1").fetchone() is None
+
+    def reparti(self) -> pd.DataFrame:
+        """COLLO → COD_REPARTO, DES_REPARTO (righe distinte, come ``drop_duplicates``)."""
+        with self._connect() as con:
+            return pd.read_sql_query("SELECT COLLO, COD_REPARTO, DES_REPARTO FROM reparti "
+                                     "ORDER BY rowid", con)
+
+    def bom(self) -> pd.DataFrame:
+        """Tutta la BOM (come la concatenazione dei file mensili, in ordine di nome),
+        con il periodo AAAAMM del file di ogni riga."""
+        colonne = ", ".join(f"b.{c}" for c in BOM_COLS)
+        with self._connect() as con:
+            return pd.read_sql_query(f"SELECT {colonne}, b.mese, b.CI, f.periodo FROM bom b "
+                                     "JOIN file_bom f ON f.file = b.file "
+                                     "ORDER BY b.file, b.rowid", con)
+
+    def _righe(self, colonna: str, valori) -> pd.DataFrame:
+        """Righe con ``colonna`` in ``valori``, tramite tabella temporanea e indice."""
+        with self._connect() as con:
+            con.execute("CREATE TEMP TABLE chiavi (k TEXT PRIMARY KEY)")
+            con.executemany("INSERT OR IGNORE INTO chiavi VALUES (?)",
+                            ((str(v),) for v in valori))
+            return pd.read_sql_query(f"""
+                SELECT {', '.join(BOM_COLS)}, mese, CI FROM bom
+                WHERE {colonna} IN (SELECT k FROM chiavi) ORDER BY rowid
+            """, con)
+
+    def righe_componenti(self, codici, esatto: bool = False) -> pd.DataFrame:
+        """
+        Righe BOM dei componenti ``codici``: con ``esatto`` confronto sui codici
+        normalizzati (indice FILIO_NORM), altrimenti FILIO che contiene uno
+        dei codici (stesso criterio di ``matching.contiene_codici``).
+        """
+        if esatto:
+            return self._righe("FILIO_NORM", normalizza_codici(list(codici)))
+        with self._connect() as con:
+            filii = pd.read_sql_query("SELECT DISTINCT FILIO FROM bom", con)["FILIO"]
+        return self._righe("FILIO", filii[contiene_codici(filii, codici)])
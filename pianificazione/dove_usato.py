@@ -0,0 +1,78 @@
+"""
+Indice dove-usato
+=================
+"Se il componente X arriva in ritardo, quali colli 3N, lanci e reparti sono
+colpiti?" Invece di rifare tutta l'elaborazione e filtrare la tabella dei
+colli con mancanti, l'esplosione della BOM (``bom_grafo``) viene invertita
+una volta per versione dell'archivio in un indice componente → colli:
+
+- componenti e colli codificati in interi, CSR per componente
+  (indptr / colli / CI cumulato / livello);
+- reparto di ogni collo come indice intero nella tabella dei reparti.
+
+Una ricerca è ``get_indexer`` sui codici normalizzati più uno slicing dei
+vettori: migliaia di componenti per chiamata senza cicli Python per riga.
+I lanci si aggiungono dopo, unendo i colli trovati ai mancanti del giorno.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from matching import normalizza_codici
+
+IMPIEGHI_COLS = ["Componente", "COLLO", "CI", "LIVELLO", "COD_REPARTO", "DES_REPARTO"]
+
+
+class IndiceImpieghi:
+    """Indice inverso componente → colli (a qualunque livello) → reparto."""
+
+    def __init__(self, esplosione: pd.DataFrame, reparti: pd.DataFrame):
+        comp, self.componenti = pd.factorize(normalizza_codici(esplosione["FILIO"]))
+        collo, colli = pd.factorize(esplosione["COLLO"].astype(str))
+        self.colli = np.asarray(colli, dtype=object)
+
+        ordine = np.argsort(comp, kind="stable")
+        self.collo_idx = collo[ordine]
+        self.ci = esplosione["CI"].to_numpy(dtype=np.float64)[ordine]
+        self.livello = esplosione["LIVELLO"].to_numpy(dtype=np.int64)[ordine]
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(comp, minlength=len(self.componenti)))])
+
+        # Reparto per collo (il primo in archivio), allineato ai codici dei colli;
+        # l'ultima posizione è il reparto ignoto
+        primo = reparti.assign(COLLO=reparti["COLLO"].astype(str)) \
+                       .drop_duplicates("COLLO").set_index("COLLO")
+        self.cod_reparto = np.append(primo["COD_REPARTO"].to_numpy(dtype=object), None)
+        self.des_reparto = np.append(primo["DES_REPARTO"].to_numpy(dtype=object), None)
+        self.reparto_idx = primo.index.get_indexer(self.colli)
+
+    def __len__(self) -> int:
+        return len(self.componenti)
+
+    def cerca(self, codici) -> pd.DataFrame:
+        """
+        Colli che usano i componenti ``codici`` (confronto sui codici
+        normalizzati), con CI cumulato, livello e reparto del collo.
+        I codici non presenti nella BOM non danno righe.
+        """
+        richiesti = normalizza_codici(list(codici)).unique()
+        pos = self.componenti.get_indexer(richiesti)
+        trovati = pos[pos >= 0]
+        inizio, fine = self.indptr[trovati], self.indptr[trovati + 1]
+        n = fine - inizio
+        # Indici piatti di tutti i segmenti CSR richiesti
+        righe = np.repeat(inizio - np.concatenate([[0], np.cumsum(n)[:-1]]), n) \
+            + np.arange(n.sum())
+
+        collo = self.collo_idx[righe]
+        rep = self.reparto_idx[collo]             # -1 → ultima posizione: reparto ignoto
+        return pd.DataFrame({
+            "Componente":  np.repeat(richiesti[pos >= 0], n),
+            "COLLO":       self.colli[collo],
+            "CI":          self.ci[righe],
+            "LIVELLO":     self.livello[righe],
+            "COD_REPARTO": self.cod_reparto[rep],
+            "DES_REPARTO": self.des_reparto[rep],
+        }, columns=IMPIEGHI_COLS)
@@ -0,0 +1,158 @@
+"""
+Lettura del file Mancanti
+=========================
+Il CSV dei mancanti ha una riga per articolo e una colonna per lancio (dalla
+15ª in poi), quasi tutte a zero. Invece di leggere tutto e fare ``melt``, il
+file viene letto a blocchi con tipi espliciti (motore CSV di pyarrow se
+disponibile, altrimenti pandas a chunk) e da ogni blocco si tengono solo le
+celle diverse da zero: la memoria occupata dipende dai mancanti effettivi,
+non da articoli × lanci.
+
+Le quantità possono avere la virgola decimale (es. "1,5", export italiano);
+i file con il punto passano dalla lettura come testo. Una cella che non è un
+numero blocca la lettura con la riga e il lancio: non viene mai scartata.
+
+Il risultato ha la stessa forma del vecchio ``melt`` filtrato:
+Ragione sociale, Articolo, Descrizione, variable (lancio), value.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:                          # pragma: no cover - pyarrow arriva con streamlit
+    pa = pa_csv = None
+
+ID_COLS = ["Ragione sociale", "Articolo", "Descrizione"]
+PRIMA_COLONNA_LANCI = 14                     # colonne[14:] = lanci
+COLONNE_ESCLUSE = {"Fabbisogni Totale"}
+CHUNK_RIGHE = 20_000
+OUT_COLS = ID_COLS + ["variable", "value"]
+
+
+def _sorgente(file):
+    """File caricato con Streamlit (o bytes) → buffer riposizionabile; percorso → invariato."""
+    if hasattr(file, "getvalue"):
+        return BytesIO(file.getvalue())
+    if isinstance(file, (bytes, bytearray)):
+        return BytesIO(file)
+    return file
+
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return src
+
+
+# ── Lettura a blocchi ─────────────────────────────────────────────────────────
+def _blocchi_pyarrow(src, header, lanci, sep, skiprows, encoding):
+    """Blocchi (id: DataFrame, valori: ndarray righe × lanci) col lettore streaming di pyarrow."""
+    reader = pa_csv.open_csv(
+        _rewind(src),
+        read_options=pa_csv.ReadOptions(column_names=list(header), skip_rows=skiprows + 1,
+                                        encoding=encoding, block_size=1 << 22),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=ID_COLS + lanci,
+            decimal_point=",",
+            column_types={**{c: pa.string() for c in ID_COLS},
+                          **{c: pa.float64() for c in lanci}},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        ids = pd.DataFrame({c: batch.column(c).to_numpy(zero_copy_only=False) for c in ID_COLS})
+        vals = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in lanci]) \
+            if lanci else np.empty((batch.num_rows, 0))
+        yield ids, vals
+
+
+def _numeri(vals: pd.DataFrame, prima_riga: int) -> pd.DataFrame:
+    """Celle lette come testo → numeri (virgola o punto decimale). ``prima_riga``
+    è il numero di riga nel file della prima riga del blocco, per l'errore."""
+    testo = vals.apply(lambda col: col.str.strip())
+    num = testo.apply(lambda col: pd.to_numeric(col.str.replace(",", ".", regex=False),
+                                                errors="coerce"))
+    errati = (num.isna() & testo.notna() & (testo != "")).to_numpy()
+    if errati.any():
+        r, c = np.argwhere(errati)[0]
+        raise ValueError(f"valore non numerico {testo.iat[r, c]!r} alla riga {prima_riga + r} "
+                         f"del file, lancio {vals.columns[c]}")
+    return num
+
+
+def _blocchi_pandas(src, header, lanci, sep, skiprows, encoding, testo=False):
+    """Blocchi con ``pd.read_csv(chunksize=...)``; con ``testo`` i lanci sono
+    letti come stringhe e convertiti da ``_numeri``."""
+    dtype = {c: str for c in ID_COLS}
+    dtype.update({c: str if testo else np.float64 for c in lanci})
+    reader = pd.read_csv(_rewind(src), sep=sep, skiprows=skiprows + 1, header=None,
+                         names=list(header), usecols=ID_COLS + lanci, dtype=dtype,
+                         decimal=",", encoding=encoding, chunksize=CHUNK_RIGHE)
+    riga = skiprows + 2                       # riga del file (da 1) del primo dato
+    for chunk in reader:
+        vals = chunk[lanci]
+        if testo:
+            vals = _numeri(vals, riga)
+        riga += len(chunk)
+        yield chunk[ID_COLS].reset_index(drop=True), vals.to_numpy(dtype=np.float64)
+
+
+def _sparse(blocchi, lanci) -> pd.DataFrame:
+    parti, n_righe = [], 0
+    for ids, vals in blocchi:
+        r, c = np.nonzero(np.nan_to_num(vals, nan=0.0))
+        if len(r):
+            parte = ids.iloc[r].reset_index(drop=True)
+            parte["_col"] = c
+            parte["_row"] = r + n_righe
+            parte["value"] = vals[r, c]
+            parti.append(parte)
+        n_righe += len(ids)
+    if not parti:
+        return pd.DataFrame(columns=OUT_COLS)
+
+    out = pd.concat(parti, ignore_index=True)
+    # Stesso ordine del melt: lancio per lancio, poi righe del file
+    out = out.sort_values(["_col", "_row"], kind="stable").reset_index(drop=True)
+    out["variable"] = np.asarray(lanci, dtype=object)[out["_col"].to_numpy()]
+    out["Articolo"] = out["Articolo"].astype(str).str.replace(" ", "", regex=False)
+    if np.all(np.mod(out["value"].to_numpy(), 1) == 0):
+        out["value"] = out["value"].astype(np.int64)
+    return out[OUT_COLS]
+
+
+def leggi_mancanti(file, sep: str = ";", skiprows: int = 1,
+                   encoding: str = "utf-8") -> pd.DataFrame:
+    """
+    Legge il CSV dei mancanti e restituisce solo le triple non nulle
+    (articolo, lancio, quantità) con ragione sociale e descrizione.
+    Le celle vuote valgono zero; una cella non numerica solleva ``ValueError``.
+    """
+    src = _sorgente(file)
+    header = pd.read_csv(_rewind(src), sep=sep, skiprows=skiprows, nrows=0,
+                         encoding=encoding).columns
+    mancanti = [c for c in ID_COLS if c not in header]
+    if mancanti:
+        raise ValueError(f"Colonne mancanti nel file: {', '.join(mancanti)}")
+    lanci = [c for c in header[PRIMA_COLONNA_LANCI:] if c not in COLONNE_ESCLUSE]
+
+    if pa_csv is not None:
+        try:
+            return _sparse(_blocchi_pyarrow(src, header, lanci, sep, skiprows, encoding), lanci)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass                              # punto decimale o valori non numerici
+    try:
+        return _sparse(_blocchi_pandas(src, header, lanci, sep, skiprows, encoding), lanci)
+    except ValueError:
+        pass
+    # lettura come testo: accetta entrambi i separatori decimali e indica la cella errata
+    return _sparse(_blocchi_pandas(src, header, lanci, sep, skiprows, encoding, testo=True),
+                   lanci)
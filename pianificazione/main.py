@@ -1,23 +1,45 @@
 import streamlit as st
 import pandas as pd
+import sys
 from io import BytesIO
+from pathlib import Path
+
+from allocazione import alloca_mancanti
+from bom_grafo import BomGraph
+from bom_store import BomStore
+from dove_usato import IndiceImpieghi
+from ingestione import leggi_mancanti
+from pipeline import elabora
+from proiezione import proiezione_lanci
+
+BOM_DB = Path(__file__).parent / 'bom_store.sqlite'
+
+# Modulo di profilazione condiviso con le altre app (cartella del repository)
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:                 # lo script gira a ogni rerun: una sola voce
+    sys.path.insert(0, ROOT)
+from profilazione import profilatore
 
 st.set_page_config(layout='wide')
+prof = profilatore('pianificazione')
 
 st.title('Elaborazione colli producibili')
 
 #FUNZIONI ================================================================
 
-def upload_multiplo(messaggio):
-    path_list = st.sidebar.file_uploader(messaggio,accept_multiple_files=True)
-    if not path_list:
-            st.stop()
-    df_list = []
-    for path in path_list:
-            df = pd.read_excel(path)
-            df['mese']=int(str(path.name)[:2])
-            df_list.append(df)
-    return df_list
+@st.cache_resource
+def get_bom_store():
+    return BomStore(BOM_DB)
+
+# Esplosione multilivello calcolata una volta per versione dell'archivio BOM
+@st.cache_resource(max_entries=2)
+def get_grafo(versione):
+    return BomGraph(get_bom_store().bom())
+
+# Indice inverso componente → colli → reparto, stessa versione del grafo
+@st.cache_resource(max_entries=2)
+def get_impieghi(versione):
+    return IndiceImpieghi(get_grafo(versione).esplosione, get_bom_store().reparti())
 
 def scarica_excel(df, filename):
     output = BytesIO()
@@ -35,86 +57,142 @@ def scarica_excel(df, filename):
 
 #CARICAMENTO DATI===========================================================
 
-df_list =  upload_multiplo('Carica file da accodare')
-bom = pd.concat(df_list)
+# Le BOM mensili restano nell'archivio locale: vanno caricate solo quando
+# arriva un mese nuovo (o un file aggiornato), i mancanti ogni giorno
+prof.fase('load', 'archivio BOM')
+bom_store = get_bom_store()
+# la chiave cambia dopo una rimozione, così i file ancora nell'uploader non la annullano
+nuovi_file = st.sidebar.file_uploader('Aggiorna BOM mensili', accept_multiple_files=True,
+                                      key=f"bom_upload_{st.session_state.get('bom_upload', 0)}")
+if nuovi_file:
+    barra = st.sidebar.progress(0.0, text='Lettura BOM...')
+    try:
+        esiti = bom_store.aggiorna(nuovi_file, progress=lambda f, t: barra.progress(f, text=t))
+    except ValueError as e:
+        st.sidebar.error(str(e))
+        esiti = []
+    barra.empty()
+    for nome, esito, secondi in esiti:
+        st.sidebar.caption(f'{nome}: {esito}' + (f' ({secondi:.1f} s)' if secondi else ''))
+if bom_store.vuoto:
+    st.sidebar.info('Archivio BOM vuoto: caricare i file mensili')
+    prof.chiudi(interrotto=True)
+    st.stop()
+with st.sidebar.expander('BOM in archivio'):
+    archivio = bom_store.file()
+    st.dataframe(archivio, hide_index=True)
+    da_rimuovere = st.selectbox('Rimuovi BOM', archivio['file'], index=None, placeholder='Scegli un file')
+    if st.button('Rimuovi dall\'archivio', disabled=da_rimuovere is None):
+        bom_store.rimuovi(da_rimuovere)
+        st.session_state['bom_upload'] = st.session_state.get('bom_upload', 0) + 1
+        prof.chiudi(interrotto=True)
+        st.rerun()
 
 path_mancanti = st.sidebar.file_uploader('Caricare Mancanti')
 if not path_mancanti:
+    prof.chiudi(interrotto=True)
     st.stop()   
-df_mancanti = pd.read_csv(path_mancanti, sep=';', skiprows=1)#,on_bad_lines='skip')
+confronto_esatto = st.sidebar.checkbox('Confronto esatto dei codici', value=False,
+                                       help='Se disattivo un codice BOM è associato se contiene il codice mancante')
+# solo le celle non nulle (articolo, lancio, quantità), già in formato lungo
+prof.annota(file=path_mancanti.name, byte=path_mancanti.size, esatto=confronto_esatto)
+prof.fase('load', 'mancanti')
+try:
+    df_mancanti = leggi_mancanti(path_mancanti, sep=';', skiprows=1)
+except ValueError as e:
+    st.error(f'File mancanti non valido: {e}')
+    prof.chiudi(interrotto=True)
+    st.stop()
 
 
 #ELABORAZIONE ===============================================================
 
-colonne = df_mancanti.columns
-df_mancanti['Articolo'] =  [articolo.replace(' ','') for articolo in df_mancanti.Articolo.astype(str)]
-df_mancanti = df_mancanti.melt(id_vars=["Ragione sociale","Articolo","Descrizione"], value_vars=colonne[14:])
-df_mancanti = df_mancanti[(df_mancanti.value!=0) & (df_mancanti.variable != 'Fabbisogni Totale')].reset_index(drop=True)
-
-df_colli = df_mancanti[[codice[:2] == '3N' for codice in df_mancanti.Articolo]]
-df_componenti = df_mancanti[[codice[:2] != '3N' for codice in df_mancanti.Articolo]]
-df_componenti['Articolo'] = [articolo.replace(' ','') for articolo in df_componenti.Articolo.astype(str)]
-
-#elaborazione BOM
-bom['CI'] = bom['QUANTI'] / bom['QTA_PADRE']
-bom_reparti = bom[['COLLO','COD_REPARTO','DES_REPARTO']].drop_duplicates()
-
-art_bom = list(bom.FILIO.unique())
-
-
-#dalla bom estraggo solo i componenti mancanti
-comp_mancanti = list(df_componenti.Articolo.unique())
-bom_comp_mancanti = bom[[any(codice in test for codice in comp_mancanti) for test in bom.FILIO]]
-bom_comp_mancanti = bom_comp_mancanti[['COLLO','FILIO','COD_REPARTO','DES_REPARTO','CI']].drop_duplicates()
-
-# Estraggo la lista dei colli 3N producibili con il loro reparto
-colli_con_mancanti = list(bom_comp_mancanti.COLLO.unique())
-
-df_colli_producibili = df_colli[[all(codice not in test for codice in colli_con_mancanti) for test in df_colli.Articolo]]
-df_colli_producibili = df_colli_producibili.merge(bom_reparti, how='left', left_on = 'Articolo', right_on='COLLO')
-
-df_colli_con_mancanti = df_colli[[any(codice in test for codice in colli_con_mancanti) for test in df_colli.Articolo]]
-
-# recupero i componenti
-df_colli_con_mancanti = df_colli_con_mancanti.merge(bom_comp_mancanti[['COLLO','FILIO','CI','COD_REPARTO','DES_REPARTO']], how='left', left_on='Articolo', right_on='COLLO')
-
-df_colli_con_mancanti.rename(columns={'value':'Colli_mancanti'}, inplace=True)
-df_colli_con_mancanti = df_colli_con_mancanti.merge(df_componenti[['Articolo','variable','value']], how='left', left_on=['FILIO','variable'], right_on=['Articolo','variable'])
-df_colli_con_mancanti = df_colli_con_mancanti[df_colli_con_mancanti.value.astype(str) != 'nan']
-
-df_colli_con_mancanti.rename(columns={
-      'Articolo_x':'Collo_3N',
-      'variable':'Lancio',
-      'FILIO':'Componente',
-      'value':'qty_mancante_componente'
-}, inplace=True)
-
-df_colli_con_mancanti = df_colli_con_mancanti[['Ragione sociale','COD_REPARTO','DES_REPARTO','Collo_3N','Descrizione','Lancio','Componente','CI','qty_mancante_componente']]
-
+#elaborazione BOM (CI e reparti già calcolati nell'archivio)
+prof.annota(righe_mancanti=len(df_mancanti))
+prof.fase('preprocess', 'esplosione BOM')
+bom_reparti = bom_store.reparti()
+
+#dalla bom esplosa estraggo i colli (a qualunque livello) bloccati dai componenti mancanti,
+#con CI cumulato lungo la distinta
+grafo = get_grafo(bom_store.versione)
+if grafo.cicli:
+    st.sidebar.warning(f'BOM con riferimenti circolari: {grafo.cicli} articoli esclusi dall\'esplosione')
+prof.fase('filter', 'colli bloccati')
+risultato = elabora(grafo, bom_reparti, df_mancanti, esatto=confronto_esatto)
+df_colli, df_componenti = risultato.colli, risultato.componenti
+bom_comp_mancanti, colli_bloccati = risultato.bom_comp_mancanti, risultato.colli_bloccati
+df_colli_producibili, df_colli_con_mancanti = risultato.producibili, risultato.con_mancanti
+
+prof.fase('render', 'colli producibili')
 st.divider()
 st.subheader(':green[Colli producibili]')
-df_colli_producibili['COD_REPARTO'] = df_colli_producibili['COD_REPARTO'].fillna('Non disponibile')
-df_colli_producibili['DES_REPARTO'] = df_colli_producibili['DES_REPARTO'].fillna('Non disponibile')
-df_colli_producibili.rename(columns={
-      'variable':'Lancio',
-      'value':'Colli_mancanti',
-     
-}, inplace=True)
-df_colli_producibili = df_colli_producibili[['Ragione sociale','Articolo','Descrizione','COD_REPARTO','DES_REPARTO','Lancio','Colli_mancanti']]
 df_colli_producibili
+prof.fase('export', 'colli producibili')
 scarica_excel(df_colli_producibili, 'Colli_producibili.xlsx')
 
+prof.fase('render', 'colli con mancanti')
 st.divider()
 st.subheader(':red[Colli con componenti mancanti]')
-
-anagrafica = df_componenti[['Articolo', 'Descrizione', 'Ragione sociale']].drop_duplicates()
-anagrafica.rename(columns={'Ragione sociale':'Fornitore', 'Descrizione':'Descrizione_componente'},inplace=True)
-
-df_colli_con_mancanti = df_colli_con_mancanti.merge(anagrafica, how='left', left_on='Componente', right_on='Articolo')
-df_colli_con_mancanti.drop(columns='Articolo', inplace=True)
 'qty_mancante_componente indica quanti pezzi mancano per quel container, un componente può andare su più 3N, per quello la quantità può essere molto più alta dei colli'
 df_colli_con_mancanti
+prof.fase('export', 'colli con mancanti')
 scarica_excel(df_colli_con_mancanti, 'Colli_con_mancanti.xlsx')
 
+st.divider()
+st.subheader(':orange[Colli producibili con allocazione dei mancanti]')
+'I componenti scarsi sono assegnati ai colli in ordine di lancio: Colli_producibili è il massimo realizzabile con la disponibilità residua (fabbisogno − mancante)'
+prof.fase('schedule', 'allocazione mancanti')
+df_allocazione = alloca_mancanti(df_colli[colli_bloccati], bom_comp_mancanti[['COLLO','FILIO','CI']], df_componenti)
+df_allocazione = df_allocazione.merge(bom_reparti, how='left', left_on='Articolo', right_on='COLLO')
+df_allocazione.rename(columns={'Articolo':'Collo_3N', 'variable':'Lancio'}, inplace=True)
+df_allocazione = df_allocazione[['COD_REPARTO','DES_REPARTO','Collo_3N','Lancio','Colli_richiesti','Colli_producibili','Componente_limitante']]
+prof.fase('render', 'allocazione mancanti')
+c1, c2 = st.columns(2)
+c1.metric('Colli richiesti (bloccati)', int(df_allocazione.Colli_richiesti.sum()))
+c2.metric('Colli comunque producibili', int(df_allocazione.Colli_producibili.sum()))
+df_allocazione
+prof.fase('export', 'allocazione mancanti')
+scarica_excel(df_allocazione, 'Allocazione_mancanti.xlsx')
 
-
+st.divider()
+st.subheader(':blue[Proiezione sui lanci]')
+'Lancio_producibile è il primo lancio in cui i pezzi in arrivo recuperano i mancanti arretrati di tutti i componenti del collo (vuoto: oltre l\'ultimo lancio del file)'
+prof.fase('schedule', 'proiezione sui lanci')
+ordine_lanci = pd.unique(df_mancanti.variable)
+df_proiezione = proiezione_lanci(df_colli[colli_bloccati], bom_comp_mancanti[['COLLO','FILIO','CI']], df_componenti, ordine_lanci=ordine_lanci)
+timeline = (df_proiezione.dropna(subset=['Lancio_producibile'])
+            .groupby('Lancio_producibile')['value'].sum()
+            .reindex(ordine_lanci, fill_value=0).cumsum())
+prof.fase('render', 'proiezione sui lanci')
+st.line_chart(timeline.rename('Colli bloccati recuperati (cumulato)'))
+df_proiezione = df_proiezione.merge(bom_reparti, how='left', left_on='Articolo', right_on='COLLO')
+df_proiezione.rename(columns={'Articolo':'Collo_3N', 'variable':'Lancio', 'value':'Colli_mancanti'}, inplace=True)
+df_proiezione = df_proiezione[['COD_REPARTO','DES_REPARTO','Collo_3N','Lancio','Colli_mancanti','Lancio_producibile','Lanci_di_ritardo','Componente_critico']]
+df_proiezione
+prof.fase('export', 'proiezione sui lanci')
+scarica_excel(df_proiezione, 'Proiezione_lanci.xlsx')
+
+prof.fase('filter', 'impatto componente')
+st.divider()
+st.subheader('Impatto di un componente in ritardo')
+impieghi = get_impieghi(bom_store.versione)
+ricerca = st.text_input('Codici componente', placeholder='uno o più codici, separati da virgola o spazio')
+if ricerca:
+    hit = impieghi.cerca(ricerca.replace(',', ' ').split())
+    hit = hit[hit.COLLO.str[:2] == '3N']   # i semilavorati intermedi non interessano
+    # lanci dei colli colpiti dai mancanti del giorno
+    lanci = df_colli[['Articolo','variable','value']].rename(
+        columns={'Articolo':'COLLO','variable':'Lancio','value':'Colli_mancanti'})
+    hit = hit.merge(lanci, how='left', on='COLLO')
+    if hit.empty:
+        st.info('Nessun collo usa questi componenti')
+    else:
+        c1, c2, c3 = st.columns(3)
+        c1.metric('Colli 3N', hit.COLLO.nunique())
+        c2.metric('Lanci', hit.Lancio.nunique())
+        c3.metric('Reparti', hit.COD_REPARTO.nunique())
+        hit = hit.rename(columns={'COLLO':'Collo_3N', 'LIVELLO':'Livello'})
+        hit
+        scarica_excel(hit, 'Impatto_componente.xlsx')
+
+prof.chiudi()
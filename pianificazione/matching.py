@@ -0,0 +1,92 @@
+"""
+Confronto tra codici articolo
+=============================
+Le selezioni "righe della BOM il cui FILIO contiene un componente mancante"
+e "colli 3N che contengono un collo con mancanti" erano doppi cicli Python
+(righe × codici). Qui:
+
+- il caso esatto è un hash join (``isin``) sui codici normalizzati;
+- per il confronto "contiene" (sottostringa, comportamento storico) i codici
+  sono compilati in un automa di Aho-Corasick e ogni testo distinto viene
+  scandito una sola volta, in tempo proporzionale alla sua lunghezza.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def normalizza_codici(valori) -> pd.Series:
+    """Codici come stringhe senza spazi, maiuscole."""
+    return (pd.Series(valori, copy=False).astype(str)
+            .str.replace(" ", "", regex=False).str.strip().str.upper())
+
+
+class AhoCorasick:
+    """Automa per sapere se un testo contiene almeno uno dei codici."""
+
+    def __init__(self, codici):
+        self.goto: list[dict] = [{}]
+        self.match: list[bool] = [False]
+        for cod in codici:
+            s = 0
+            for ch in cod:
+                nxt = self.goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[s][ch] = nxt
+                    self.goto.append({})
+                    self.match.append(False)
+                s = nxt
+            self.match[s] = True
+
+        # Link di fallimento in ampiezza; un nodo "matcha" se lo fa il suo fail
+        self.fail = [0] * len(self.goto)
+        coda = deque(self.goto[0].values())
+        while coda:
+            s = coda.popleft()
+            for ch, nxt in self.goto[s].items():
+                f = self.fail[s]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != nxt else 0
+                self.match[nxt] = self.match[nxt] or self.match[self.fail[nxt]]
+                coda.append(nxt)
+
+    def contiene(self, testo: str) -> bool:
+        if self.match[0]:                     # codice vuoto: contenuto in ogni testo
+            return True
+        goto, fail, match = self.goto, self.fail, self.match
+        s = 0
+        for ch in testo:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if match[s]:
+                return True
+        return False
+
+
+def contiene_codici(testi, codici, esatto: bool = False) -> np.ndarray:
+    """
+    Maschera booleana: ``testi[i]`` contiene almeno uno dei ``codici``
+    (equivale a ``any(c in t for c in codici)``). Con ``esatto=True`` il
+    confronto è di uguaglianza sui codici normalizzati.
+    """
+    testi = pd.Series(testi, copy=False)
+    if esatto:
+        return normalizza_codici(testi).isin(set(normalizza_codici(list(codici)))).to_numpy()
+
+    codici = {str(c) for c in codici}
+    testi = testi.astype(str)
+    trovati = testi.isin(codici).to_numpy().copy()  # uguale ⇒ anche contenuto
+    if not codici or trovati.all():
+        return trovati
+    automa = AhoCorasick(codici)
+    restanti = pd.unique(testi[~trovati])
+    esito = {t: automa.contiene(t) for t in restanti}
+    trovati[~trovati] = testi[~trovati].map(esito).to_numpy(dtype=bool)
+    return trovati
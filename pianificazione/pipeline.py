@@ -0,0 +1,180 @@
+"""
+Elaborazione colli producibili senza interfaccia
+================================================
+La stessa elaborazione della pagina Streamlit (``main.py``) come funzione,
+più un comando da riga di comando per il run automatico del mattino:
+
+    python pipeline.py --bom CARTELLA_BOM --mancanti Mancanti.csv \\
+        --out CARTELLA_OUT [--formato xlsx|csv|parquet] [--esatto]
+
+Gli Excel BOM della cartella (nome ``MM...`` o ``MM_AAAA...``) vengono
+sincronizzati in un archivio SQLite (di default
+``CARTELLA_OUT/bom_store.sqlite``): i file invariati non vengono riletti,
+quelli tolti dalla cartella escono dall'archivio. Vengono scritti ``Colli_producibili`` e ``Colli_con_mancanti``
+nel formato scelto.
+
+Ogni stabilimento è un processo a sé, con la propria cartella di uscita e il
+proprio archivio, quindi più stabilimenti possono girare in parallelo
+(``--max-workers`` limita i processi usati per leggere le BOM).
+
+Codici di uscita: 0 completato, 1 input non valido (colonne mancanti, nome
+file BOM senza mese, file o cartella inesistenti), 2 argomenti errati.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bom_grafo import BomGraph
+from bom_store import MAX_WORKERS, BomStore, mese_file
+from ingestione import leggi_mancanti
+from matching import contiene_codici
+
+FORMATI = ("xlsx", "csv", "parquet")
+ESTENSIONI_BOM = {".xlsx", ".xls", ".xlsm"}
+
+
+@dataclass
+class Elaborazione:
+    """Risultati (e passaggi intermedi riusati dalla pagina) di ``elabora``."""
+    colli: pd.DataFrame                # righe 3N del file mancanti
+    componenti: pd.DataFrame           # righe dei componenti mancanti
+    bom_comp_mancanti: pd.DataFrame    # legami collo → componente mancante
+    colli_bloccati: np.ndarray         # maschera su ``colli``
+    producibili: pd.DataFrame
+    con_mancanti: pd.DataFrame
+
+    def tabelle(self) -> dict[str, pd.DataFrame]:
+        return {"Colli_producibili": self.producibili,
+                "Colli_con_mancanti": self.con_mancanti}
+
+
+def elabora(grafo: BomGraph, bom_reparti: pd.DataFrame, df_mancanti: pd.DataFrame,
+            esatto: bool = False) -> Elaborazione:
+    """Classifica i colli 3N in producibili / con mancanti a partire dalla BOM esplosa."""
+    df_colli = df_mancanti[df_mancanti.Articolo.str[:2] == '3N']
+    df_componenti = df_mancanti[df_mancanti.Articolo.str[:2] != '3N'].copy()
+    df_componenti['Articolo'] = df_componenti.Articolo.astype(str).str.replace(' ', '', regex=False)
+
+    # colli (a qualunque livello) bloccati dai componenti mancanti, con CI cumulato
+    comp_mancanti = list(df_componenti.Articolo.unique())
+    bom_comp_mancanti = grafo.bloccati_da(comp_mancanti, esatto=esatto)
+    bom_comp_mancanti = bom_comp_mancanti.merge(bom_reparti, how='left', on='COLLO')
+    bom_comp_mancanti = bom_comp_mancanti[['COLLO','FILIO','COD_REPARTO','DES_REPARTO','CI','LIVELLO']].drop_duplicates()
+
+    # solo i colli 3N in cima alla distinta: i semilavorati intermedi, confrontati
+    # per contenimento, bloccherebbero colli che non li usano
+    colli_3n = bom_comp_mancanti.COLLO.astype(str).str[:2] == '3N'
+    colli_con_mancanti = list(bom_comp_mancanti.COLLO[colli_3n].unique())
+    colli_bloccati = contiene_codici(df_colli.Articolo, colli_con_mancanti, esatto=esatto)
+
+    # colli producibili con il loro reparto
+    producibili = df_colli[~colli_bloccati].merge(bom_reparti, how='left', left_on='Articolo', right_on='COLLO')
+    producibili['COD_REPARTO'] = producibili['COD_REPARTO'].fillna('Non disponibile')
+    producibili['DES_REPARTO'] = producibili['DES_REPARTO'].fillna('Non disponibile')
+    producibili = producibili.rename(columns={'variable':'Lancio', 'value':'Colli_mancanti'})
+    producibili = producibili[['Ragione sociale','Articolo','Descrizione','COD_REPARTO','DES_REPARTO','Lancio','Colli_mancanti']]
+
+    # colli con mancanti: recupero i componenti e le quantità mancanti del lancio
+    con_mancanti = df_colli[colli_bloccati].merge(
+        bom_comp_mancanti[['COLLO','FILIO','CI','LIVELLO','COD_REPARTO','DES_REPARTO']],
+        how='left', left_on='Articolo', right_on='COLLO')
+    con_mancanti = con_mancanti.rename(columns={'value':'Colli_mancanti'})
+    con_mancanti = con_mancanti.merge(df_componenti[['Articolo','variable','value']], how='left',
+                                      left_on=['FILIO','variable'], right_on=['Articolo','variable'])
+    con_mancanti = con_mancanti[con_mancanti.value.astype(str) != 'nan']
+    con_mancanti = con_mancanti.rename(columns={
+        'Articolo_x':'Collo_3N',
+        'variable':'Lancio',
+        'FILIO':'Componente',
+        'LIVELLO':'Livello',
+        'value':'qty_mancante_componente',
+    })
+    con_mancanti = con_mancanti[['Ragione sociale','COD_REPARTO','DES_REPARTO','Collo_3N','Descrizione','Lancio','Componente','Livello','CI','qty_mancante_componente']]
+
+    anagrafica = df_componenti[['Articolo', 'Descrizione', 'Ragione sociale']].drop_duplicates()
+    anagrafica = anagrafica.rename(columns={'Ragione sociale':'Fornitore', 'Descrizione':'Descrizione_componente'})
+    con_mancanti = con_mancanti.merge(anagrafica, how='left', left_on='Componente', right_on='Articolo')
+    con_mancanti = con_mancanti.drop(columns='Articolo')
+
+    return Elaborazione(df_colli, df_componenti, bom_comp_mancanti, colli_bloccati,
+                        producibili, con_mancanti)
+
+
+# ── Riga di comando ───────────────────────────────────────────────────────────
+def sincronizza_bom(store: BomStore, cartella: Path, max_workers: int = MAX_WORKERS):
+    """Allinea l'archivio agli Excel BOM della cartella; restituisce gli esiti."""
+    file = sorted(p for p in cartella.iterdir()
+                  if p.suffix.lower() in ESTENSIONI_BOM and not p.name.startswith('~$'))
+    if not file:
+        raise ValueError(f'nessun file BOM in {cartella}')
+    for p in file:
+        mese_file(p.name)                     # nomi senza mese: errore prima di toccare l'archivio
+    nomi = {p.name for p in file}
+    for vecchio in store.file()['file']:
+        if vecchio not in nomi:
+            store.rimuovi(vecchio)
+    return store.aggiorna(file, max_workers=max_workers)
+
+
+def esporta(tabelle: dict[str, pd.DataFrame], cartella: Path, formato: str) -> list[Path]:
+    cartella.mkdir(parents=True, exist_ok=True)
+    scritti = []
+    for nome, df in tabelle.items():
+        path = cartella / f'{nome}.{formato}'
+        if formato == 'xlsx':
+            with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+                df.to_excel(writer, sheet_name='Sheet1', index=False)
+        elif formato == 'csv':
+            df.to_csv(path, sep=';', index=False)
+        else:
+            df.to_parquet(path, index=False)
+        scritti.append(path)
+    return scritti
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Elaborazione colli producibili')
+    parser.add_argument('--bom', type=Path, required=True, help='cartella con gli Excel BOM mensili')
+    parser.add_argument('--mancanti', type=Path, required=True, help='CSV dei mancanti')
+    parser.add_argument('--out', type=Path, required=True, help='cartella di uscita')
+    parser.add_argument('--formato', choices=FORMATI, default='xlsx')
+    parser.add_argument('--archivio', type=Path, help='archivio SQLite delle BOM (default OUT/bom_store.sqlite)')
+    parser.add_argument('--esatto', action='store_true', help='confronto esatto dei codici')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                        help='processi per la lettura delle BOM')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        if not args.bom.is_dir():
+            raise ValueError(f'cartella BOM inesistente: {args.bom}')
+        # prima i mancanti: un file non valido esce senza toccare l'archivio
+        df_mancanti = leggi_mancanti(args.mancanti, sep=';', skiprows=1)
+        args.out.mkdir(parents=True, exist_ok=True)
+        store = BomStore(args.archivio or args.out / 'bom_store.sqlite')
+        for nome, esito, secondi in sincronizza_bom(store, args.bom, args.max_workers):
+            print(f'BOM {nome}: {esito}' + (f' ({secondi:.1f} s)' if secondi else ''))
+    except (ValueError, OSError) as e:
+        print(f'Errore di input: {e}', file=sys.stderr)
+        return 1
+
+    grafo = BomGraph(store.bom())
+    if grafo.cicli:
+        print(f'Attenzione: {grafo.cicli} articoli in riferimenti circolari esclusi', file=sys.stderr)
+    risultato = elabora(grafo, store.reparti(), df_mancanti, esatto=args.esatto)
+    for path in esporta(risultato.tabelle(), args.out, args.formato):
+        print(f'Scritto {path}')
+    print(f'Completato in {time.perf_counter() - t0:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Proiezione dei mancanti sui lanci
+=================================
+I lanci (colonne del file mancanti) sono in ordine di priorità. Per ogni
+componente mancante si costruiscono due matrici dense componente × lancio:
+
+- fabbisogno: Σ colli richiesti × CI dei colli di quel lancio;
+- copertura: fabbisogno − mancante del lancio (≥ 0), cioè i pezzi che per
+  quel lancio arrivano.
+
+Con le somme cumulate lungo i lanci, il fabbisogno di un collo del lancio L
+(insieme a tutti i lanci precedenti) è coperto al primo lancio L' ≥ L in cui
+la copertura cumulata raggiunge il fabbisogno cumulato fino a L: i pezzi che
+arrivano dopo vanno prima a recuperare i mancanti arretrati. Un collo
+diventa producibile al lancio più tardo tra quelli dei suoi componenti.
+
+La ricerca del primo lancio utile è un solo ``searchsorted`` sulle righe
+cumulate (non decrescenti) concatenate con un offset per componente, quindi
+resta vettoriale anche con centinaia di lanci.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+PROIEZIONE_COLS = ["Articolo", "variable", "value", "Lancio_producibile",
+                   "Lanci_di_ritardo", "Componente_critico"]
+
+
+def proiezione_lanci(colli: pd.DataFrame, legami: pd.DataFrame, componenti: pd.DataFrame,
+                     ordine_lanci=None) -> pd.DataFrame:
+    """
+    Lancio a partire dal quale ogni (collo, lancio) diventa producibile.
+
+    ``colli``: Articolo, variable (lancio), value (colli richiesti).
+    ``legami``: COLLO, FILIO, CI. ``componenti``: Articolo, variable, value
+    (quantità mancante). ``Lancio_producibile`` è vuoto se i mancanti non
+    sono recuperati entro l'ultimo lancio del file.
+    """
+    if ordine_lanci is None:
+        ordine_lanci = pd.unique(pd.concat([colli["variable"], componenti["variable"]]))
+    lanci = pd.Index(ordine_lanci)
+    n_lanci = len(lanci)
+
+    domanda = colli[["Articolo", "variable", "value"]].reset_index(drop=True)
+    l_dom = lanci.get_indexer(domanda["variable"])
+
+    corti = componenti["Articolo"].unique()
+    leg = legami.loc[legami["FILIO"].isin(corti) & (legami["CI"] > 0),
+                     ["COLLO", "FILIO", "CI"]].drop_duplicates(["COLLO", "FILIO"])
+    e = (domanda[["Articolo"]].reset_index(names="_riga")
+         .merge(leg, left_on="Articolo", right_on="COLLO"))
+    comp, nomi_comp = pd.factorize(e["FILIO"])
+    riga = e["_riga"].to_numpy()
+    l_leg = l_dom[riga]
+    n_comp = len(nomi_comp)
+
+    # Matrici componente × lancio
+    fabbisogno = np.zeros((n_comp, n_lanci))
+    np.add.at(fabbisogno, (comp, l_leg),
+              domanda["value"].to_numpy(dtype=np.float64)[riga] * e["CI"].to_numpy(dtype=np.float64))
+    mancante = np.zeros((n_comp, n_lanci))
+    m = componenti[componenti["Articolo"].isin(nomi_comp)]
+    np.add.at(mancante, (nomi_comp.get_indexer(m["Articolo"]), lanci.get_indexer(m["variable"])),
+              m["value"].to_numpy(dtype=np.float64))
+    cum_fabb = np.cumsum(fabbisogno, axis=1)
+    cum_cop = np.cumsum(np.maximum(fabbisogno - mancante, 0.0), axis=1)
+
+    # Primo lancio con copertura cumulata ≥ fabbisogno cumulato fino al lancio del collo
+    obiettivo = cum_fabb[comp, l_leg] - 1e-9
+    passo = max(cum_cop.max(initial=0.0), obiettivo.max(initial=0.0)) + 1.0
+    piatto = (cum_cop + passo * np.arange(n_comp)[:, None]).ravel()
+    pos = np.searchsorted(piatto, obiettivo + passo * comp, side="left") - comp * n_lanci
+    pos = np.maximum(pos, l_leg)                    # mai prima del lancio del collo
+
+    # Per ogni (collo, lancio) il componente che arriva per ultimo
+    fine = np.array(l_dom, copy=True)
+    critico = np.full(len(domanda), None, dtype=object)
+    if len(riga):
+        ordine = np.lexsort((-pos, riga))
+        primo = ordine[np.r_[True, riga[ordine][1:] != riga[ordine][:-1]]]
+        fine[riga[primo]] = pos[primo]
+        ritardo = pos[primo] > l_dom[riga[primo]]
+        critico[riga[primo][ritardo]] = np.asarray(nomi_comp, dtype=object)[comp[primo][ritardo]]
+
+    etichette = np.append(np.asarray(lanci, dtype=object), None)  # n_lanci → oltre l'orizzonte
+    out = domanda.copy()
+    out["Lancio_producibile"] = etichette[np.minimum(fine, n_lanci)]
+    out["Lanci_di_ritardo"] = pd.array(fine - l_dom, dtype="Int64")
+    out.loc[fine >= n_lanci, "Lanci_di_ritardo"] = pd.NA
+    out["Componente_critico"] = critico
+    return out[PROIEZIONE_COLS]
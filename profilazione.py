@@ -0,0 +1,249 @@
+"""
+Profilazione dei rerun Streamlit
+================================
+Modulo condiviso dalle app (come ``tempi_ciclo``) per capire quale blocco
+dello script è lento con il file di un certo utente: Streamlit riesegue
+tutto lo script a ogni interazione.
+
+Si attiva con la variabile d'ambiente ``IMPJ_PROFILAZIONE`` o con la chiave
+``profilazione`` dei secrets:
+
+- ``tempi`` (o ``1``): tempo e memoria (tracemalloc) di ogni fase;
+- ``cprofile``: in più il profilo cProfile dell'intero rerun;
+- ``campionamento``: profilo a campionamento con pyinstrument, se installato
+  (altrimenti cProfile).
+
+Disattivata (default) ogni chiamata ritorna subito.
+
+Lo script segna l'inizio di ogni fase con ``prof.fase('load')`` (nomi in
+``FASI``, con un dettaglio libero): una fase dura fino alla successiva o a
+``prof.chiudi()`` in fondo allo script. La tabella dei tempi è in un
+expander della sidebar e si aggiorna fase per fase.
+
+Prima di ogni ``st.stop()`` o ``st.rerun()`` lo script chiama
+``prof.chiudi(interrotto=True)``: tracemalloc e il profiler si fermano lì,
+non restano accesi in attesa di un rerun che può non arrivare mai.
+
+Ogni rerun aggiunge una riga JSON a ``log_profilazione/profilazione.jsonl``
+(cartella cambiabile con ``IMPJ_PROFILAZIONE_LOG``), con i profili accanto.
+Solo un rerun finito per un'eccezione resta aperto: viene scritto all'inizio
+del rerun successivo, con la fase interrotta senza tempo.
+
+tracemalloc rallenta le allocazioni Python ed è globale al processo: la
+profilazione serve per diagnosticare, non va lasciata accesa per tutti.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+ENV_MODALITA = "IMPJ_PROFILAZIONE"
+ENV_LOG = "IMPJ_PROFILAZIONE_LOG"
+LOG_DIR = Path(__file__).parent / "log_profilazione"
+FASI = ("load", "preprocess", "filter", "aggregate", "schedule", "export", "render")
+MODALITA = ("tempi", "cprofile", "campionamento")
+RIGHE_PROFILO = 30
+_MB = 1024 ** 2
+
+
+def modalita() -> str | None:
+    """Modalità richiesta da variabile d'ambiente o secrets (None: disattivata)."""
+    valore = os.environ.get(ENV_MODALITA)
+    if valore is None:
+        try:
+            valore = st.secrets.get("profilazione")
+        except Exception:                       # nessun secrets.toml
+            valore = None
+    valore = str(valore or "").strip().lower()
+    if valore in ("", "0", "false", "no", "off"):
+        return None
+    return valore if valore in MODALITA else "tempi"
+
+
+class Profilatore:
+    """Tempi e memoria per fase di un rerun, più l'eventuale profilo completo."""
+
+    def __init__(self, app: str, modalita: str | None = None, log_dir=None):
+        self.app = app
+        self.modalita = modalita
+        self.attivo = modalita is not None
+        self.fasi: list[dict] = []
+        self.contesto: dict = {}
+        self._corrente = None
+        self._chiuso = False
+        if not self.attivo:
+            return
+        self.log_dir = Path(log_dir or os.environ.get(ENV_LOG) or LOG_DIR)
+        self.ts = datetime.now().isoformat(timespec="seconds")
+        stato = st.session_state
+        self.sessione = stato.setdefault("_profilazione_sessione", uuid.uuid4().hex[:8])
+        self.rerun = stato["_profilazione_rerun"] = stato.get("_profilazione_rerun", 0) + 1
+
+        with st.sidebar.expander("⏱️ Profilazione del rerun"):
+            self._tabella = st.empty()
+            self._report = st.empty()
+        # tracemalloc e profiler restano accesi solo per questo rerun
+        self._traccia = not tracemalloc.is_tracing()
+        if self._traccia:
+            tracemalloc.start()
+        self._profiler = self._avvia_profiler()
+        self._t0 = time.perf_counter()
+
+    # ── Fasi ──────────────────────────────────────────────────────────────────
+    def fase(self, nome: str, dettaglio: str | None = None) -> None:
+        """Chiude la fase in corso e apre ``nome``."""
+        if not self.attivo or self._chiuso:
+            return
+        if self._chiudi_fase():
+            self._mostra_tabella()
+        base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._corrente = {"fase": nome, "dettaglio": dettaglio, "t": time.perf_counter(), "mem": base}
+
+    def annota(self, **valori) -> None:
+        """Contesto del rerun da riportare nel log (nome file, righe, parametri...)."""
+        if self.attivo:
+            self.contesto.update(valori)
+
+    def _chiudi_fase(self, interrotta: bool = False) -> bool:
+        c, self._corrente = self._corrente, None
+        if c is None:
+            return False
+        voce = {"fase": c["fase"], "dettaglio": c["dettaglio"],
+                "secondi": None if interrotta else round(time.perf_counter() - c["t"], 4)}
+        if tracemalloc.is_tracing() and not interrotta:
+            attuale, picco = tracemalloc.get_traced_memory()
+            voce["memoria_picco_mb"] = round((picco - c["mem"]) / _MB, 2)
+            voce["memoria_netta_mb"] = round((attuale - c["mem"]) / _MB, 2)
+        self.fasi.append(voce)
+        return True
+
+    # ── Profilo completo ──────────────────────────────────────────────────────
+    def _avvia_profiler(self):
+        if self.modalita == "campionamento":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.modalita = "cprofile"
+            else:
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+        if self.modalita == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:                  # un altro profiler è già attivo
+                return None
+            return profiler
+        return None
+
+    def _ferma_profiler(self) -> tuple[str | None, str | None]:
+        """(file salvato, testo per la sidebar)."""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None, None
+        base = self.log_dir / f"{self.app}_{self.sessione}_{self.rerun:04d}"
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            testo = io.StringIO()
+            stats = pstats.Stats(profiler, stream=testo)
+            stats.sort_stats("cumulative").print_stats(RIGHE_PROFILO)
+            file = base.with_suffix(".prof")
+            stats.dump_stats(file)
+            return file.name, testo.getvalue()
+        profiler.stop()
+        file = base.with_suffix(".html")
+        file.write_text(profiler.output_html(), encoding="utf-8")
+        return file.name, profiler.output_text()
+
+    def _scarta_profiler(self) -> None:
+        profiler, self._profiler = self._profiler, None
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            elif profiler is not None:
+                profiler.stop()
+        except Exception:                       # profiler legato al thread del rerun finito
+            pass
+
+    # ── Chiusura ──────────────────────────────────────────────────────────────
+    def chiudi(self, interrotto: bool = False) -> None:
+        """
+        Fine del rerun: log JSON, tabella finale e profilo nella sidebar. Con
+        ``interrotto`` lo script si ferma prima del fondo (subito prima di
+        ``st.stop()`` o ``st.rerun()``); i tempi restano validi.
+        """
+        self._chiudi(interrotto, in_ritardo=False)
+
+    def _chiudi(self, interrotto: bool, in_ritardo: bool) -> None:
+        """``in_ritardo``: chiusura dal rerun successivo di un rerun finito per un'eccezione."""
+        if not self.attivo or self._chiuso:
+            return
+        self._chiuso = True
+        if st.session_state.get("_profilatore") is self:
+            del st.session_state["_profilatore"]
+        self._chiudi_fase(interrotta=in_ritardo)
+        totale = None if in_ritardo else round(time.perf_counter() - self._t0, 4)
+        if self._traccia:
+            tracemalloc.stop()
+
+        file_profilo = testo_profilo = errore = None
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            if in_ritardo:
+                # il rerun è finito da un pezzo (tempo d'attesa incluso): il profilo non vale
+                self._scarta_profiler()
+            else:
+                file_profilo, testo_profilo = self._ferma_profiler()
+            if self.fasi:
+                record = {"ts": self.ts, "app": self.app, "sessione": self.sessione,
+                          "rerun": self.rerun, "modalita": self.modalita,
+                          "interrotto": interrotto, "totale_s": totale, "fasi": self.fasi,
+                          "contesto": self.contesto, "profilo": file_profilo}
+                with open(self.log_dir / "profilazione.jsonl", "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:                    # es. cartella in sola lettura sul cloud
+            errore = f"Log di profilazione non scritto: {e}"
+
+        if not in_ritardo:
+            self._mostra_tabella(totale, errore)
+            if testo_profilo:
+                self._report.code(testo_profilo, language=None)
+
+    def _mostra_tabella(self, totale: float | None = None, errore: str | None = None) -> None:
+        with self._tabella.container():
+            st.dataframe(pd.DataFrame(self.fasi).dropna(axis=1, how="all"), hide_index=True)
+            st.caption(f"Sessione {self.sessione}, rerun {self.rerun}"
+                       + (f": {totale:.2f} s" if totale is not None else ""))
+            if errore:
+                st.warning(errore)
+
+
+def profilatore(app: str) -> Profilatore:
+    """
+    Profilatore del rerun corrente (da creare subito dopo ``st.set_page_config``).
+    Se il rerun precedente è finito senza ``chiudi`` (eccezione) viene chiuso
+    e scritto nel log qui.
+    """
+    precedente = st.session_state.get("_profilatore")
+    if precedente is not None:
+        precedente._chiudi(interrotto=True, in_ritardo=True)
+    prof = Profilatore(app, modalita())
+    if prof.attivo:
+        st.session_state["_profilatore"] = prof
+    return prof
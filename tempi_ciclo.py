@@ -0,0 +1,95 @@
+"""
+Tempi ciclo per reparto
+=======================
+Modulo condiviso da Sviluppo_ore e Planning_git per passare da colli a ore.
+
+Il tempo ciclo (minuti/collo) di ogni reparto viene da
+``config_cycle_times.json`` ([{"Reparto", "Tempo Ciclo (min/collo)"}]); i
+reparti non configurati usano il tempo ciclo di default dell'app (quello
+ricavato da colli/giorno e operatori).
+
+La tabella viene compilata una volta per versione della configurazione in
+un tipo categoriale (i reparti) più un vettore di ore/collo allineato ai
+codici, con il default in ultima posizione: il codice -1 dei reparti
+sconosciuti o vuoti cade proprio lì. Le ore di qualunque numero di righe
+sono quindi un solo ``take`` più una moltiplicazione.
+
+Le app importano il modulo aggiungendo la cartella del repository a
+``sys.path``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CONFIG_CYCLE_TIMES = Path(__file__).parent / "config_cycle_times.json"
+COL_REPARTO = "Reparto"
+COL_TEMPO = "Tempo Ciclo (min/collo)"
+TEMPO_CICLO_DEFAULT_MIN = 12.5
+
+
+class TempiCiclo:
+    """Lookup reparto → ore/collo compilato."""
+
+    def __init__(self, voci: tuple[tuple[str, float], ...], default_ore: float):
+        self.voci = voci
+        self.default_ore = float(default_ore)
+        self.dtype = pd.CategoricalDtype([r for r, _ in voci])
+        self.ore_collo_lookup = np.append(
+            np.array([m / 60 for _, m in voci], dtype=np.float64), self.default_ore)
+        self.versione = hashlib.sha1(
+            json.dumps([voci, self.default_ore]).encode()).hexdigest()[:12]
+
+    def _codici(self, reparti) -> np.ndarray:
+        return pd.Categorical(pd.Series(reparti, copy=False).astype(str), dtype=self.dtype).codes
+
+    def ore_collo(self, reparti) -> np.ndarray:
+        """Ore per collo riga per riga (default per reparti assenti o vuoti)."""
+        return self.ore_collo_lookup.take(self._codici(reparti))
+
+    def configurati(self, reparti) -> np.ndarray:
+        """Maschera delle righe con un tempo ciclo di reparto (non il default)."""
+        return self._codici(reparti) >= 0
+
+    def ore(self, qta, reparti=None) -> np.ndarray:
+        """Ore necessarie per ``qta`` colli dei rispettivi reparti (senza
+        reparti: tutte al tempo ciclo di default)."""
+        qta = np.asarray(qta, dtype=np.float64)
+        if reparti is None:
+            return qta * self.default_ore
+        return qta * self.ore_collo(reparti)
+
+
+@lru_cache(maxsize=16)
+def _compila(voci: tuple[tuple[str, float], ...], default_ore: float) -> TempiCiclo:
+    return TempiCiclo(voci, default_ore)
+
+
+def tempi_ciclo(tabella, default_ore: float) -> TempiCiclo:
+    """
+    Lookup compilato dalla tabella dei tempi ciclo (lista di record o
+    DataFrame con colonne Reparto / Tempo Ciclo (min/collo), anche ``None``),
+    riusato finché configurazione e default non cambiano.
+    """
+    voci: tuple = ()
+    if tabella is not None:
+        df = pd.DataFrame(tabella)
+        if COL_REPARTO in df.columns and COL_TEMPO in df.columns:
+            df = df.dropna(subset=[COL_REPARTO, COL_TEMPO]).drop_duplicates(COL_REPARTO, keep="last")
+            voci = tuple((str(r), float(m)) for r, m in zip(df[COL_REPARTO], df[COL_TEMPO]))
+    return _compila(voci, float(default_ore))
+
+
+def carica_config(path=CONFIG_CYCLE_TIMES) -> list[dict] | None:
+    """Tempi ciclo salvati (``None`` se il file non c'è o non è leggibile)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None